@@ -0,0 +1,58 @@
+"""
+Compares the throughput of the JSON backends on orders.json and orders.jsonl.
+
+Usage (from the root of the repository):
+    python -m benchmarks.json_backends [--orders 100000] [--seed 42]
+"""
+import argparse
+import tempfile
+import time
+
+from data.project.handler import JSONHandler
+from data.project.jsonbackend import available_backends
+from data.project.model import DeliveryDataset, Order
+
+
+def measure(action) -> float:
+    """
+    Runs an action and returns its duration.
+    :param action: the action
+    :return: the elapsed seconds
+    """
+    start = time.perf_counter()
+    action()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=100000, help="the number of orders")
+    parser.add_argument("--seed", type=int, default=42, help="the seed of the dataset")
+    args = parser.parse_args()
+
+    dataset = DeliveryDataset.generate(100, 20, 20, args.orders, seed=args.seed, pooled=True)
+    orders = dataset.orders
+
+    print(f"{'backend':<24}{'write .json':>14}{'read .json':>14}{'write .jsonl':>14}{'read .jsonl':>14}  (rows/s)")
+    with tempfile.TemporaryDirectory() as path:
+        write = measure(lambda: JSONHandler.write_entity(orders, path, pretty=True))
+        read = measure(lambda: JSONHandler.read_entity(Order, path))
+        print(f"{'json (dict, indent=2)':<24}{len(orders) / write:>14,.0f}{len(orders) / read:>14,.0f}")
+
+        original = JSONHandler.backend
+        try:
+            for name, backend in available_backends().items():
+                JSONHandler.backend = backend
+                results = [
+                    measure(lambda: JSONHandler.write_entity(orders, path)),
+                    measure(lambda: JSONHandler.read_entity(Order, path)),
+                    measure(lambda: JSONHandler.write_entities(Order, orders, path)),
+                    measure(lambda: JSONHandler.read_lines(Order, path)),
+                ]
+                print(f"{name:<24}" + "".join(f"{len(orders) / seconds:>14,.0f}" for seconds in results))
+        finally:
+            JSONHandler.backend = original
+
+
+if __name__ == "__main__":
+    main()
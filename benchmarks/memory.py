@@ -0,0 +1,70 @@
+"""
+Measures the memory taken by orders read back from a CSV document: the former __dict__ based dataclass, the slotted
+Order class without interning, and Order.from_sequence (slotted, with interned repeated strings).
+
+Usage (from the root of the repository):
+    python -m benchmarks.memory [--orders 1000000] [--seed 42]
+"""
+import argparse
+import csv
+import gc
+import os
+import tempfile
+import tracemalloc
+from dataclasses import fields, make_dataclass
+from typing import Callable
+
+from data.project.handler import CSVHandler
+from data.project.model import DeliveryDataset, Order
+
+DictOrder = make_dataclass("DictOrder", [(f.name, f.type) for f in fields(Order)])
+
+
+def measure(file_path: str, build: Callable[[list[str]], object]) -> int:
+    """
+    Reads the orders of a CSV document and returns the memory held by the built objects (including their strings).
+    :param file_path: the path of the document
+    :param build: the function which builds an object from a row
+    :return: the number of bytes
+    """
+    gc.collect()
+    tracemalloc.start()
+    with open(file_path, "r", newline="", encoding="utf-8") as file:
+        reader = csv.reader(file, delimiter=";")
+        next(reader)
+        orders = [build(row) for row in reader]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del orders
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=1000000, help="the number of orders")
+    parser.add_argument("--seed", type=int, default=42, help="the seed of the dataset")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        dataset = DeliveryDataset.generate(1000, 100, 100, args.orders, seed=args.seed, pooled=True)
+        CSVHandler.write_entity(dataset.orders, path)
+        del dataset
+        file_path = os.path.join(path, Order.collection_name() + ".csv")
+
+        def plain(row: list[str]) -> list:
+            return [row[0], int(row[1]), row[2], row[3], row[4], int(row[5]), row[6], row[7], row[8], row[9]]
+
+        results = [
+            ("dataclass with __dict__", measure(file_path, lambda row: DictOrder(*plain(row)))),
+            ("slotted dataclass", measure(file_path, lambda row: Order(*plain(row)))),
+            ("slotted + interned", measure(file_path, Order.from_sequence)),
+        ]
+
+    baseline = results[0][1]
+    print(f"{'representation':<26}{'total MiB':>12}{'bytes/row':>12}{'saving':>10}")
+    for name, size in results:
+        print(f"{name:<26}{size / 2 ** 20:>12,.1f}{size / args.orders:>12,.0f}{1 - size / baseline:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Runs the benchmark suite: the generation of seeded datasets at several scales, the write and read path of every
+handler (SQLite as the SQL target) and every query. For every case the best duration of the repeats, the throughput
+(rows/s, and bytes/s where files are written) and the peak traced memory of a separate run are recorded. The results
+are saved as JSON, so a later run can be compared with them.
+
+Usage (from the root of the repository):
+    python -m benchmarks.run [--scales 1k,100k,1M] [--seed 42] [--repeat 3] [--only csv] [--output results.json]
+                             [--compare previous.json] [--threshold 0.1] [--xlsx-max-orders 100000]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import numpy as np
+
+from data.project.database import SQLitePool
+from data.project.handler import CSVHandler, JSONHandler, NPZHandler, SQLHandler, SnapshotHandler, XLSXHandler
+from data.project.model import ColumnarDeliveryDataset, Courier, DeliveryDataset, Order, Person, Restaurant
+from data.project.pipeline import convert, open_endpoint
+from data.project.query import count_by, group_by
+from data.project.validation import validate
+
+SCALES = {"1k": 1000, "10k": 10000, "100k": 100000, "1M": 1000000}
+
+# XLSX documents are streamed through write-only and read-only workbooks, so their memory stays flat, but openpyxl
+# still serializes and parses every cell as XML (about 6k rows/s written and 4k rows/s read): at 1M orders a single
+# repeat would take about 8 minutes, so by default they are only benchmarked up to this number of orders
+# (see --xlsx-max-orders)
+XLSX_MAX_ORDERS = 100000
+
+
+@dataclass
+class Result:
+    """
+    The measurement of a case at a scale.
+    """
+    scale: str
+    case: str
+    rows: int
+    seconds: float
+    rows_per_second: float
+    peak_mib: float
+    bytes: Optional[int] = None
+    bytes_per_second: Optional[float] = None
+
+
+@dataclass
+class Case:
+    """
+    A benchmarked operation. prepare runs once before the measurement (e.g. it writes the files which are read) and
+    setup before every run; neither is measured. If a path is given, its size gives the bytes/s of the case.
+    """
+    name: str
+    rows: int
+    action: Callable[[], object]
+    path: Optional[str] = None
+    prepare: Callable[[], None] = lambda: None
+    setup: Callable[[], None] = lambda: None
+
+
+def folder_size(path: str) -> int:
+    """
+    Returns the total size of the files in a folder (or of a file).
+    :param path: the path
+    :return: the number of bytes
+    """
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def measure(scale: str, case: Case, repeat: int) -> Result:
+    """
+    Runs a case repeat times for its best duration, then once more under tracemalloc for its peak memory.
+    :param scale: the name of the scale
+    :param case: the case
+    :param repeat: the number of timed runs
+    :return: the result
+    """
+    case.prepare()
+    best = float("inf")
+    for _ in range(repeat):
+        case.setup()
+        gc.collect()
+        start = time.perf_counter()
+        case.action()
+        best = min(best, time.perf_counter() - start)
+
+    case.setup()
+    gc.collect()
+    tracemalloc.start()
+    case.action()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    size = folder_size(case.path) if case.path is not None else None
+    return Result(scale, case.name, case.rows, best, case.rows / best, peak / 2 ** 20, size,
+                  size / best if size is not None else None)
+
+
+def cases(dataset: DeliveryDataset, orders: int, path: str, seed: int,
+          xlsx_max_orders: int = XLSX_MAX_ORDERS) -> list[Case]:
+    """
+    Returns the cases of a scale: generation, the write and read path of every format, conversions, validation and
+    queries. A read case writes its files first if the write case did not run (see --only).
+    :param dataset: the dataset of the scale
+    :param orders: the number of orders
+    :param path: a temporary folder
+    :param seed: the seed of the dataset
+    :param xlsx_max_orders: the largest number of orders whose XLSX cases are included
+    :return: the cases
+    """
+    rows = sum(len(collection) for collection in dataset.entities().values())
+    counts = (len(dataset.people), len(dataset.couriers), len(dataset.restaurants), len(dataset.orders))
+    pool = SQLitePool(os.path.join(path, "dataset.sqlite"))
+    columnar = ColumnarDeliveryDataset.from_dataset(dataset)
+    types = DeliveryDataset.entity_types()
+
+    writers = {
+        "csv": lambda folder: CSVHandler.write_dataset(dataset, folder),
+        "json": lambda folder: JSONHandler.write_dataset(dataset, folder, lines=False),
+        "jsonl": lambda folder: JSONHandler.write_dataset(dataset, folder, lines=True),
+        "xlsx": lambda folder: XLSXHandler.write_dataset(dataset, folder),
+        "npz": lambda folder: NPZHandler.write_dataset(dataset, folder),
+        "snapshot": lambda folder: SnapshotHandler.write_dataset(dataset, folder),
+        "sqlite": lambda folder: SQLHandler.write_dataset(dataset, pool, bulk=True),
+    }
+    readers = {
+        "csv": lambda folder: CSVHandler.read_dataset(DeliveryDataset, folder),
+        "json": lambda folder: JSONHandler.read_dataset(DeliveryDataset, folder),
+        "jsonl": lambda folder: JSONHandler.read_dataset(DeliveryDataset, folder),
+        "xlsx": lambda folder: XLSXHandler.read_dataset(DeliveryDataset, folder),
+        "npz": lambda folder: NPZHandler.read_dataset(DeliveryDataset, folder),
+        "snapshot": read_snapshot,
+        "sqlite": lambda folder: SQLHandler.read_dataset(DeliveryDataset, pool),
+    }
+    if orders > xlsx_max_orders:
+        del writers["xlsx"], readers["xlsx"]
+
+    written = set()
+    folders = dict()
+    for name in [name for name in writers if name != "sqlite"] + ["converted"]:
+        folders[name] = os.path.join(path, name)
+        os.makedirs(folders[name], exist_ok=True)
+    folders["sqlite"] = os.path.join(path, "dataset.sqlite")
+
+    def write(name: str) -> None:
+        writers[name](folders[name])
+        written.add(name)
+
+    def ensure(name: str) -> None:
+        if name not in written:
+            write(name)
+
+    result = [Case("generate", rows, lambda: DeliveryDataset.generate(*counts, seed=seed, pooled=True))]
+    for name in writers:
+        result.append(Case(f"write {name}", rows, lambda name=name: write(name), folders[name]))
+        result.append(Case(f"read {name}", rows, lambda name=name: readers[name](folders[name]), folders[name],
+                           prepare=lambda name=name: ensure(name)))
+
+    result.extend([
+        Case("write sqlite (executemany)", rows, lambda: SQLHandler.write_dataset(dataset, pool), folders["sqlite"]),
+        Case("convert csv to sqlite", rows, lambda: convert(open_endpoint("csv", folders["csv"]),
+                                                           open_endpoint("mysql", pool=pool), types),
+             folders["sqlite"], prepare=lambda: ensure("csv")),
+        Case("convert sqlite to jsonl", rows, lambda: convert(open_endpoint("mysql", pool=pool),
+                                                             open_endpoint("json", folders["converted"]), types),
+             folders["converted"], prepare=lambda: ensure("sqlite")),
+        Case("validate", rows, lambda: validate(dataset)),
+        # the aggregations of the shell's queries (visualization.py) on the columnar view the shell queries, without
+        # drawing the charts
+        Case("query-1 couriers by delivery method", len(dataset.couriers),
+             lambda: count_by(columnar, Courier, "delivery_method")),
+        Case("query-2 clients by gender", len(dataset.people), lambda: count_by(columnar, Person, "male")),
+        Case("query-3 restaurants by profile", len(dataset.restaurants),
+             lambda: count_by(columnar, Restaurant, "profile")),
+        # the list dataset caches its encoded tables with the indexes, so they are dropped to measure the encoding
+        Case("group orders by restaurant", len(dataset.orders),
+             lambda: group_by(dataset, Order, "restaurant_name", [("count", None)]), setup=dataset.invalidate_indexes),
+        Case("group orders by restaurant (columnar)", len(dataset.orders),
+             lambda: group_by(columnar, Order, "restaurant_name", [("count", None)])),
+        Case("orders with restaurant", len(dataset.orders), dataset.orders_with_restaurant,
+             setup=dataset.invalidate_indexes),
+        Case("couriers with order counts", len(dataset.orders), dataset.couriers_with_order_counts,
+             setup=dataset.invalidate_indexes),
+    ])
+
+    return result
+
+
+def read_snapshot(path: str) -> None:
+    """
+    Opens the snapshot files of a dataset and materializes every entity.
+    :param path: the path of the files
+    :return: nothing
+    """
+    dataset = SnapshotHandler.read_dataset(DeliveryDataset, path)
+    for collection in dataset.entities().values():
+        for _ in collection:
+            pass
+        collection.close()
+
+
+def metadata(seed: int, repeat: int) -> dict:
+    """
+    Returns the description of the environment of a run.
+    :param seed: the seed of the datasets
+    :param repeat: the number of timed runs per case
+    :return: the description
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": seed,
+        "repeat": repeat,
+    }
+
+
+def compare(results: list[Result], previous: dict, threshold: float) -> bool:
+    """
+    Prints the change of every case's duration relative to a previous run.
+    :param results: the results of this run
+    :param previous: the saved previous run
+    :param threshold: the relative slowdown which counts as a regression
+    :return: True if no case regressed
+    """
+    before = {(r["scale"], r["case"]): r for r in previous["results"]}
+    print(f"\ncompared with {previous['meta'].get('commit')} ({previous['meta'].get('date')}):")
+    print(f"{'scale':<6}{'case':<40}{'before s':>10}{'after s':>10}{'change':>9}")
+    ok = True
+    for result in results:
+        old = before.get((result.scale, result.case))
+        if old is None:
+            continue
+        change = result.seconds / old["seconds"] - 1
+        regressed = change > threshold
+        ok = ok and not regressed
+        print(f"{result.scale:<6}{result.case:<40}{old['seconds']:>10.4f}{result.seconds:>10.4f}{change:>+9.0%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1k,100k", help=f"comma separated numbers of orders ({', '.join(SCALES)})")
+    parser.add_argument("--seed", type=int, default=42, help="the seed of the datasets")
+    parser.add_argument("--repeat", type=int, default=3, help="the number of timed runs per case")
+    parser.add_argument("--only", default=None, help="a regular expression selecting the cases")
+    parser.add_argument("--output", default=None, help="the JSON file of the results (benchmarks/results/<date>.json "
+                                                       "by default)")
+    parser.add_argument("--compare", default=None, help="a previous JSON file of results")
+    parser.add_argument("--threshold", type=float, default=0.1, help="the relative slowdown reported as a regression")
+    parser.add_argument("--xlsx-max-orders", type=int, default=XLSX_MAX_ORDERS,
+                        help="the largest scale (number of orders) of the XLSX cases")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            previous = json.load(file)
+
+    results = []
+    print(f"{'scale':<6}{'case':<40}{'seconds':>10}{'rows/s':>14}{'MiB/s':>10}{'peak MiB':>10}")
+    for scale in args.scales.split(","):
+        orders = SCALES[scale]
+        dataset = DeliveryDataset.generate(max(100, orders // 100), max(20, orders // 1000),
+                                           max(20, orders // 1000), orders, seed=args.seed, pooled=True)
+        with tempfile.TemporaryDirectory() as path:
+            for case in cases(dataset, orders, path, args.seed, args.xlsx_max_orders):
+                if args.only is not None and not re.search(args.only, case.name):
+                    continue
+                result = measure(scale, case, args.repeat)
+                results.append(result)
+                throughput = f"{result.bytes_per_second / 2 ** 20:>10.1f}" if result.bytes_per_second else f"{'':>10}"
+                print(f"{scale:<6}{case.name:<40}{result.seconds:>10.4f}{result.rows_per_second:>14,.0f}"
+                      f"{throughput}{result.peak_mib:>10.1f}")
+        del dataset
+
+    output = args.output
+    if output is None:
+        folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+        os.makedirs(folder, exist_ok=True)
+        output = os.path.join(folder, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump({"meta": metadata(args.seed, args.repeat), "results": [asdict(r) for r in results]}, file,
+                  indent=2)
+    print(f"results saved to {output}")
+
+    if previous is not None and not compare(results, previous, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable, Type, Union
+
+from data.project.base import Dataset, Entity
+from data.project.handler import CSVHandler, JSONHandler, NPZHandler, SQLHandler, SnapshotHandler, XLSXHandler, \
+    batched
+from data.project.pipeline import Endpoint
+
+_END = object()
+
+
+class _Failure:
+    """
+    Carries an exception of the event loop to a writer thread.
+    """
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class AsyncHandler:
+    """
+    The asynchronous counterpart of a handler class (e.g. AsyncHandler(CSVHandler)). The blocking calls of the
+    handler run in the worker threads of the event loop's default executor, so the loop keeps serving other tasks,
+    and several datasets can be read or written concurrently (e.g. with asyncio.gather). The number of concurrent
+    calls is bounded by the executor (see loop.set_default_executor).
+    """
+
+    def __init__(self, handler: type):
+        """
+        Wraps a handler class.
+        :param handler: the class (CSVHandler, JSONHandler, XLSXHandler, NPZHandler, SnapshotHandler or SQLHandler)
+        """
+        self.handler = handler
+
+    async def read_dataset(self, dataset_type: Type[Dataset], *args: Any, **kwargs: Any) -> Dataset:
+        """
+        Reads a dataset (see the read_dataset method of the handler for the arguments).
+        :param dataset_type: the type of the dataset
+        :return: the instance
+        """
+        return await asyncio.to_thread(self.handler.read_dataset, dataset_type, *args, **kwargs)
+
+    async def write_dataset(self, dataset: Dataset, *args: Any, **kwargs: Any) -> None:
+        """
+        Writes a dataset (see the write_dataset method of the handler for the arguments). The dataset must not be
+        changed until the write is finished.
+        :param dataset: the dataset instance
+        :return: nothing
+        """
+        await asyncio.to_thread(self.handler.write_dataset, dataset, *args, **kwargs)
+
+
+class AsyncChangesHandler(AsyncHandler):
+    """
+    The asynchronous counterpart of a handler class which can also write the changes of a dataset (CSVHandler,
+    JSONHandler and SQLHandler).
+    """
+
+    def __init__(self, handler: type):
+        """
+        Wraps a handler class.
+        :param handler: the class, which must have a write_changes method
+        """
+        if not hasattr(handler, "write_changes"):
+            raise TypeError(f"{handler.__name__} cannot write the changes of a dataset")
+        super().__init__(handler)
+
+    async def write_changes(self, dataset: Dataset, *args: Any, **kwargs: Any) -> dict[Type[Entity], int]:
+        """
+        Brings the stored dataset up to date (see the write_changes method of the handler for the arguments).
+        :param dataset: the dataset instance
+        :return: the number of written entries by type
+        """
+        return await asyncio.to_thread(self.handler.write_changes, dataset, *args, **kwargs)
+
+
+AsyncCSVHandler = AsyncChangesHandler(CSVHandler)
+AsyncJSONHandler = AsyncChangesHandler(JSONHandler)
+AsyncXLSXHandler = AsyncHandler(XLSXHandler)
+AsyncNPZHandler = AsyncHandler(NPZHandler)
+AsyncSnapshotHandler = AsyncHandler(SnapshotHandler)
+AsyncSQLHandler = AsyncChangesHandler(SQLHandler)
+
+
+async def aiter_entities(entities: Iterable[Entity], batch_size: int = 1000) -> AsyncIterator[list[Entity]]:
+    """
+    Turns a blocking iterable (e.g. the iter_entities of a handler) into an asynchronous generator of batches. Every
+    batch is read in a worker thread, so parsing, file and database reads do not block the event loop.
+    :param entities: the entries
+    :param batch_size: the number of entries per batch
+    :return: the asynchronous iterator of batches
+    """
+
+    batches = batched(entities, batch_size)
+    try:
+        while True:
+            batch = await asyncio.to_thread(next, batches, _END)
+            if batch is _END:
+                return
+            yield batch
+    finally:
+        # releases the resources of a lazy reader (e.g. the connection of a database cursor)
+        close = getattr(entities, "close", None)
+        if close is not None:
+            await asyncio.to_thread(close)
+
+
+async def awrite_entities(write: Callable[[Iterable[Entity]], int], batches: AsyncIterable[list[Entity]],
+                          queue_size: int = 4) -> int:
+    """
+    Feeds batches produced on the event loop to a blocking writer (e.g. the write_entities of a handler), which runs
+    in a worker thread. The batches pass through a bounded queue: when the writer falls behind, the producer waits
+    without blocking the loop. An exception of the producer is raised in the writer (which stops) and then here.
+    :param write: the function which consumes an iterable of entries and returns their number
+    :param batches: the batches of entries
+    :param queue_size: the maximal number of batches waiting in the queue
+    :return: the number returned by the writer
+    """
+
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue(maxsize=queue_size)
+
+    def consume() -> Iterable[Entity]:
+        while True:
+            item = asyncio.run_coroutine_threadsafe(items.get(), loop).result()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield from item
+
+    writer = asyncio.ensure_future(asyncio.to_thread(write, consume()))
+
+    async def put(item: object) -> None:
+        putting = asyncio.ensure_future(items.put(item))
+        await asyncio.wait({putting, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if not putting.done():
+            putting.cancel()
+            await writer
+            raise RuntimeError("the writer stopped before consuming every entry")
+
+    try:
+        async for batch in batches:
+            await put(batch)
+        await put(_END)
+    except BaseException as error:
+        if not writer.done():
+            # the writer only takes from the queue, so there is room for the failure once it is emptied
+            while not items.empty():
+                items.get_nowait()
+            items.put_nowait(_Failure(error))
+            await asyncio.wait({writer})
+        if not writer.cancelled():
+            writer.exception()
+        raise
+
+    return await writer
+
+
+def aread_collection(endpoint: Endpoint, entity_type: Type[Entity],
+                     batch_size: int = 1000) -> AsyncIterator[list[Entity]]:
+    """
+    Reads a collection of any format lazily, as an asynchronous generator of batches.
+    :param endpoint: the endpoint (see pipeline.open_endpoint)
+    :param entity_type: the type of entries
+    :param batch_size: the number of entries per batch
+    :return: the asynchronous iterator of batches
+    """
+    return aiter_entities(endpoint.read(entity_type), batch_size)
+
+
+async def awrite_collection(endpoint: Endpoint, entity_type: Type[Entity],
+                            batches: Union[AsyncIterable[list[Entity]], Iterable[Entity]],
+                            queue_size: int = 4) -> int:
+    """
+    Writes a collection of any format from batches produced on the event loop (or from a blocking iterable, which is
+    read in worker threads). The endpoint must have been prepared (see Endpoint.prepare), and closed afterwards.
+    :param endpoint: the endpoint (see pipeline.open_endpoint)
+    :param entity_type: the type of entries
+    :param batches: the batches of entries
+    :param queue_size: the maximal number of batches waiting to be written
+    :return: the number of written entries
+    """
+
+    if not isinstance(batches, AsyncIterable):
+        batches = aiter_entities(batches)
+    return await awrite_entities(lambda entities: endpoint.write(entity_type, entities), batches, queue_size)
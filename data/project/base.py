@@ -1,40 +1,62 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Type
+from operator import attrgetter
+from typing import Any, Iterable, Sequence, Type
+
+from data.project.schema import Field, create_table_statement, row_codec
 
 
 class Entity(ABC):
     """
-    A class that represents a type which can be managed with our library.
+    A class that represents a type which can be managed with our library. The fields of the type are declared by its
+    schema, from which the conversions, the field lists and the CREATE TABLE statement are derived.
     """
 
+    # lets the subclasses be slotted (an empty __slots__ keeps the base class from adding a __dict__)
+    __slots__ = ()
+
     @staticmethod
     @abstractmethod
-    def from_sequence(seq: list[str]) -> Entity:
+    def schema() -> list[Field]:
+        """
+        Returns the declaration of the fields, in the order of the constructor's arguments.
+        :return: the list of fields
+        """
+        pass
+
+    @classmethod
+    def from_sequence(cls, seq: Sequence) -> Entity:
         """
-        Returns an instance from a sequence of string values.
+        Returns an instance from a sequence of string (or already typed) values.
         :param seq: the sequence of values
         :return: the instance
         """
-        pass
+        return row_codec(cls).decode(seq)
 
-    @abstractmethod
     def to_sequence(self) -> list[str]:
         """
         Returns a sequence of string values that describe the state of the type.
         :return: the sequence of values
         """
-        pass
+        return row_codec(type(self)).encode(self)
 
-    @staticmethod
-    @abstractmethod
-    def field_names() -> list[str]:
+    @classmethod
+    def field_names(cls) -> list[str]:
         """
         Returns the list of field (attribute) names.
         :return: the list of names
         """
-        pass
+        return list(row_codec(cls).names)
+
+    @classmethod
+    def field_types(cls) -> list[type]:
+        """
+        Returns the list of field types, in the order of the field names. An Enum type marks a field which holds the
+        name of one of its members (a low-cardinality, categorical field).
+        :return: the list of types
+        """
+        return [f.type for f in row_codec(cls).schema]
 
     @staticmethod
     @abstractmethod
@@ -45,14 +67,206 @@ class Entity(ABC):
         """
         pass
 
-    @staticmethod
-    @abstractmethod
-    def create_table() -> str:
+    @classmethod
+    def primary_key(cls) -> str:
+        """
+        Returns the name of the field which identifies the entity (the field marked as primary key, or the first one).
+        :return: the name
+        """
+        return next((f.name for f in row_codec(cls).schema if f.primary_key), row_codec(cls).names[0])
+
+    @classmethod
+    def foreign_keys(cls) -> dict[str, Type[Entity]]:
+        """
+        Returns the fields which refer to other entities (by their primary key).
+        :return: the dictionary of the referenced types by field name
+        """
+        return {f.name: f.references for f in row_codec(cls).schema if f.references is not None}
+
+    def __reduce__(self) -> tuple:
+        # pickles an entity as its type and its values, which is several times faster than the state dictionary of a
+        # slotted dataclass (entities are pickled when they are returned by worker processes)
+        return type(self), row_codec(type(self)).values(self)
+
+    @classmethod
+    def create_table(cls) -> str:
         """
         Returns a CREATE TABLE SQL statement which creates the table.
         :return: the statement
         """
-        pass
+        return create_table_statement(cls)
+
+
+class TrackedList(list):
+    """
+    A list of entities which records its changes since the last mark_clean: the keys of the appended (new) entities,
+    of the entities marked as changed (or removed and appended again), and of the removed entities. Every mutating
+    list method is tracked, so a collection can be edited freely (pop, del, slice assignment...); an entity modified
+    in place has to be reported with touch. A list which has not been marked clean yet is new as a whole, so nothing
+    is recorded until then. The version is increased by every change, including reordering.
+    """
+
+    def __init__(self, entity_type: Type[Entity], entities: Iterable[Entity] = ()):
+        super().__init__(entities)
+        self.entity_type = entity_type
+        self.version = 0
+        self.fresh = True
+        self.new: dict[Any, Entity] = dict()
+        self.changed: dict[Any, Entity] = dict()
+        self.removed: dict[Any, None] = dict()
+        self._key = attrgetter(entity_type.primary_key())
+
+    def __reduce__(self) -> tuple:
+        # the default reduction of a list subclass appends the elements before the attributes are restored
+        return type(self), (self.entity_type, list(self)), self.__dict__
+
+    def _added(self, entities: Iterable[Entity]) -> None:
+        self.version += 1
+        if self.fresh:
+            return
+        for entity in entities:
+            key = self._key(entity)
+            if key in self.removed:
+                del self.removed[key]
+                self.changed[key] = entity
+            elif key in self.changed:
+                self.changed[key] = entity
+            else:
+                self.new[key] = entity
+
+    def _removed(self, entities: Iterable[Entity]) -> None:
+        self.version += 1
+        if self.fresh:
+            return
+        for entity in entities:
+            key = self._key(entity)
+            if self.new.pop(key, None) is None:
+                self.changed.pop(key, None)
+                self.removed[key] = None
+
+    def append(self, entity: Entity) -> None:
+        super().append(entity)
+        self._added((entity,))
+
+    def extend(self, entities: Iterable[Entity]) -> None:
+        entities = list(entities)
+        super().extend(entities)
+        self._added(entities)
+
+    def __iadd__(self, entities: Iterable[Entity]) -> TrackedList:
+        self.extend(entities)
+        return self
+
+    def __imul__(self, count: int) -> TrackedList:
+        entities = list(self)
+        super().__imul__(count)
+        if count <= 0:
+            self._removed(entities)
+        else:
+            self._added(entities * (count - 1))
+        return self
+
+    def insert(self, position: int, entity: Entity) -> None:
+        super().insert(position, entity)
+        self._added((entity,))
+
+    def pop(self, position: int = -1) -> Entity:
+        entity = super().pop(position)
+        self._removed((entity,))
+        return entity
+
+    def remove(self, entity: Entity) -> None:
+        super().remove(entity)
+        self._removed((entity,))
+
+    def clear(self) -> None:
+        entities = list(self)
+        super().clear()
+        self._removed(entities)
+
+    def __delitem__(self, position: Any) -> None:
+        entities = self[position] if isinstance(position, slice) else [self[position]]
+        super().__delitem__(position)
+        self._removed(entities)
+
+    def __setitem__(self, position: Any, value: Any) -> None:
+        if isinstance(position, slice):
+            entities, value = self[position], list(value)
+        else:
+            entities = [self[position]]
+        super().__setitem__(position, value)
+        self._removed(entities)
+        self._added(value if isinstance(position, slice) else (value,))
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        super().sort(*args, **kwargs)
+        self.version += 1
+
+    def reverse(self) -> None:
+        super().reverse()
+        self.version += 1
+
+    def touch(self, entity: Entity) -> None:
+        """
+        Records that an entity of the list has been modified in place.
+        :param entity: the entity
+        :return: nothing
+        """
+        self.version += 1
+        if self.fresh:
+            return
+        key = self._key(entity)
+        if key not in self.new:
+            self.changed[key] = entity
+
+    def stored_keys(self) -> set:
+        """
+        Returns the keys which are in the storage: the keys of the elements which are not new, and the removed keys.
+        :return: the set of keys
+        """
+        if self.fresh:
+            return set()
+        keys = {self._key(entity) for entity in self}
+        keys.difference_update(self.new)
+        keys.update(self.removed)
+        return keys
+
+    def replaces(self, stored: set) -> None:
+        """
+        Takes over the storage of a replaced list: the elements whose key is stored are changed, the others new, and
+        the stored keys which are not in this list removed.
+        :param stored: the stored keys of the replaced list (see stored_keys)
+        :return: nothing
+        """
+        if not stored:
+            return
+        self.fresh = False
+        self.new.clear()
+        self.changed.clear()
+        for entity in self:
+            key = self._key(entity)
+            (self.changed if key in stored else self.new)[key] = entity
+        self.removed = dict.fromkeys(key for key in stored if key not in self.changed)
+        self.version += 1
+
+    def changes(self) -> tuple[list[Entity], list[Entity], list]:
+        """
+        Returns the changes since the last mark_clean.
+        :return: the new entities, the changed entities and the removed keys
+        """
+        if self.fresh:
+            return list(self), [], []
+        return list(self.new.values()), list(self.changed.values()), list(self.removed)
+
+    def mark_clean(self) -> None:
+        """
+        Tells the list that its current state is stored.
+        :return: nothing
+        """
+        self.fresh = False
+        self.new.clear()
+        self.changed.clear()
+        self.removed.clear()
 
 
 class Dataset(ABC):
@@ -88,6 +302,22 @@ class Dataset(ABC):
         """
         pass
 
+    def changes(self) -> dict[Type[Entity], tuple[list[Entity], list[Entity], list]]:
+        """
+        Returns the entities which have to be written and the keys which have to be deleted to bring the stored copy
+        of the dataset up to date (see mark_clean). The default is that every entity is new.
+        :return: the dictionary of the new entities, the changed entities and the removed keys by type
+        """
+        return {entity_type: (list(entities), [], []) for entity_type, entities in self.entities().items()}
+
+    def mark_clean(self) -> None:
+        """
+        Tells the dataset that its current state has been read from or written to a storage, so changes() is
+        relative to this state. The default does nothing.
+        :return: nothing
+        """
+        pass
+
     @staticmethod
     @abstractmethod
     def generate(**kwargs):
@@ -97,3 +327,24 @@ class Dataset(ABC):
         :return: the instance
         """
         pass
+
+
+def dependency_levels(entity_types: list[Type[Entity]]) -> list[list[Type[Entity]]]:
+    """
+    Groups entity types into levels, so that every type refers only to types of earlier levels. The types of a level
+    can be written at the same time.
+    :param entity_types: the types
+    :return: the list of levels
+    """
+    levels = []
+    done: set[Type[Entity]] = set()
+    remaining = list(entity_types)
+    while remaining:
+        level = [t for t in remaining if all(r in done or r not in entity_types for r in t.foreign_keys().values())]
+        if not level:
+            raise ValueError("the foreign keys of the entity types form a cycle")
+        levels.append(level)
+        done.update(level)
+        remaining = [t for t in remaining if t not in done]
+
+    return levels
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from abc import ABC
+from collections.abc import Sequence
+from enum import Enum
+from operator import attrgetter
+from typing import Iterable, Iterator, Type, Union
+
+import numpy as np
+
+from data.project.base import Dataset, Entity
+from data.project.schema import row_codec
+
+
+def is_categorical(field_type: type) -> bool:
+    """
+    Tells whether a field type is stored as a dictionary-encoded column.
+    :param field_type: the type of the field
+    :return: the answer
+    """
+    return isinstance(field_type, type) and issubclass(field_type, Enum)
+
+
+def code_dtype(count: int) -> np.dtype:
+    """
+    Returns the smallest unsigned integer type which can hold the codes of a dictionary of the given size.
+    :param count: the number of categories
+    :return: the type
+    """
+    return np.min_scalar_type(max(count - 1, 0))
+
+
+class ColumnarTable(Sequence):
+    """
+    Stores the entities of one type column by column, as typed NumPy arrays. Integers are kept as int64, booleans as
+    bool, categorical (Enum typed) fields as codes into a dictionary and any other field as an object array. The None
+    values of integer and boolean columns are stored as zeros and flagged in a separate null mask.
+
+    The table behaves like a read-only list of entities, so it can be passed to every handler as it is.
+    """
+
+    def __init__(self, entity_type: Type[Entity], columns: dict[str, np.ndarray],
+                 categories: dict[str, list[str]] = None, masks: dict[str, np.ndarray] = None):
+        """
+        Creates a table from already encoded columns.
+        :param entity_type: the type of the entities
+        :param columns: the arrays by field name (categorical fields hold codes)
+        :param categories: the dictionaries of the categorical fields by field name
+        :param masks: the boolean arrays which flag the None values of the numeric columns by field name (only the
+                      columns which contain None have one)
+        """
+        self.entity_type = entity_type
+        self.columns = columns
+        self.categories = categories if categories is not None else dict()
+        self.masks = masks if masks is not None else dict()
+
+        lengths = {len(column) for column in columns.values()}
+        assert len(lengths) <= 1, "every column must have the same length"
+        self._length = lengths.pop() if lengths else 0
+
+    @staticmethod
+    def from_entities(entity_type: Type[Entity], entities: Iterable[Entity], fields: list[str] = None) -> ColumnarTable:
+        """
+        Encodes a collection of entities.
+        :param entity_type: the type of the entities
+        :param entities: the entities
+        :param fields: if given, only these fields are encoded (such a projected table cannot rebuild entities)
+        :return: the table
+        """
+        if isinstance(entities, ColumnarTable) and entities.entity_type is entity_type:
+            return entities if fields is None else entities.project(fields)
+
+        names = fields if fields is not None else entity_type.field_names()
+        types = dict(zip(entity_type.field_names(), entity_type.field_types()))
+        values: list[list] = [[] for _ in names]
+        getter = attrgetter(*names)
+        for entity in entities:
+            row = getter(entity)
+            for column, value in zip(values, row if len(names) > 1 else (row,)):
+                column.append(value)
+
+        columns = dict()
+        categories = dict()
+        masks = dict()
+        for name, column in zip(names, values):
+            field_type = types[name]
+            if is_categorical(field_type):
+                columns[name], categories[name] = ColumnarTable.encode(column, [m.name for m in field_type])
+            elif field_type is int or field_type is bool:
+                mask = np.array([value is None for value in column], dtype=np.bool_)
+                if mask.any():
+                    masks[name] = mask
+                    column = [value if value is not None else 0 for value in column]
+                columns[name] = np.array(column, dtype=np.int64 if field_type is int else np.bool_)
+            else:
+                columns[name] = np.array(column, dtype=object)
+
+        return ColumnarTable(entity_type, columns, categories, masks)
+
+    @staticmethod
+    def encode(values: list[str], known: list[str] = None) -> tuple[np.ndarray, list[str]]:
+        """
+        Dictionary-encodes a list of values. Known values get the first codes in the given order, so codes of the
+        same Enum are stable between tables.
+        :param values: the values
+        :param known: the values expected in advance
+        :return: the codes and the dictionary
+        """
+        index: dict[str, int] = {value: code for code, value in enumerate(known if known is not None else [])}
+        codes = [index.setdefault(value, len(index)) for value in values]
+        return np.array(codes, dtype=code_dtype(len(index))), list(index)
+
+    def project(self, fields: list[str]) -> ColumnarTable:
+        """
+        Returns a table which contains only the given columns (sharing the arrays of this one).
+        :param fields: the names of the fields
+        :return: the table
+        """
+        return ColumnarTable(self.entity_type, {name: self.columns[name] for name in fields},
+                             {name: self.categories[name] for name in fields if name in self.categories},
+                             {name: self.masks[name] for name in fields if name in self.masks})
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Returns the decoded values of a column (an object array with None values if the column has a null mask).
+        :param name: the name of the field
+        :return: the array of values
+        """
+        if name in self.categories:
+            return np.array(self.categories[name], dtype=object)[self.columns[name]]
+        if name in self.masks:
+            column = self.columns[name].astype(object)
+            column[self.masks[name]] = None
+            return column
+        return self.columns[name]
+
+    def codes(self, name: str) -> tuple[np.ndarray, list[str]]:
+        """
+        Returns the codes and the dictionary of a categorical column.
+        :param name: the name of the field
+        :return: the codes and the dictionary
+        """
+        return self.columns[name], self.categories[name]
+
+    def rows(self, start: int = 0, stop: int = None) -> Iterator[list]:
+        """
+        Returns the decoded rows in a range, as lists of Python values in the order of the field names.
+        :param start: the first position
+        :param stop: the position after the last one
+        :return: the iterator of rows
+        """
+        stop = stop if stop is not None else self._length
+        names = self.entity_type.field_names()
+        block = 4096
+        for offset in range(start, stop, block):
+            end = min(offset + block, stop)
+            parts = [self.column(name)[offset:end].tolist() for name in names]
+            for row in zip(*parts):
+                yield list(row)
+
+    def to_entities(self) -> list[Entity]:
+        """
+        Materializes the entities.
+        :return: the list of entities
+        """
+        return list(self)
+
+    def nbytes(self) -> int:
+        """
+        Returns the size of the arrays (without the Python objects referenced by object arrays).
+        :return: the number of bytes
+        """
+        return sum(column.nbytes for column in self.columns.values()) + sum(mask.nbytes for mask in self.masks.values())
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Entity]:
+        return map(row_codec(self.entity_type).decode, self.rows())
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[Entity, ColumnarTable]:
+        if isinstance(item, slice):
+            return ColumnarTable(self.entity_type, {name: column[item] for name, column in self.columns.items()},
+                                 self.categories, {name: mask[item] for name, mask in self.masks.items()})
+
+        position = item + self._length if item < 0 else item
+        if not 0 <= position < self._length:
+            raise IndexError("table index out of range")
+        return self.entity_type.from_sequence(next(self.rows(position, position + 1)))
+
+
+class ColumnarDataset(Dataset, ABC):
+    """
+    Represents a data set whose entities are stored in ColumnarTable instances instead of lists of objects.
+    """
+
+    def __init__(self, tables: dict[Type[Entity], ColumnarTable]):
+        self.tables = tables
+
+    def entities(self) -> dict[Type[Entity], list[Entity]]:
+        return dict(self.tables)
+
+    def table(self, entity_type: Type[Entity]) -> ColumnarTable:
+        """
+        Returns the table of an entity type.
+        :param entity_type: the type
+        :return: the table
+        """
+        return self.tables[entity_type]
+
+    @classmethod
+    def from_dataset(cls, dataset: Dataset) -> ColumnarDataset:
+        """
+        Encodes a list based dataset.
+        :param dataset: the dataset instance
+        :return: the instance
+        """
+        return cls.from_sequence([dataset.entities()[entity_type] for entity_type in cls.entity_types()])
+
+    def nbytes(self) -> int:
+        """
+        Returns the size of the arrays of all tables.
+        :return: the number of bytes
+        """
+        return sum(table.nbytes() for table in self.tables.values())
@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Iterator, Type
+
+import mysql.connector
+
+from data.project.base import Entity
+
+
+def split_statements(script: str) -> list[str]:
+    """
+    Splits a script into its statements at the semicolons which are not inside a quoted string or identifier.
+    :param script: the script
+    :return: the list of statements (without the semicolons, empty statements left out)
+    """
+    statements = []
+    start = 0
+    quote = None
+    position = 0
+    while position < len(script):
+        character = script[position]
+        if quote is not None:
+            if character == "\\" and quote != "`":
+                position += 1
+            elif character == quote:
+                quote = None
+        elif character in "'\"`":
+            quote = character
+        elif character == ";":
+            statements.append(script[start:position])
+            start = position + 1
+        position += 1
+    statements.append(script[start:])
+
+    return [statement.strip() for statement in statements if statement.strip()]
+
+
+class Dialect(ABC):
+    """
+    Describes the differences between the SQL databases supported by SQLHandler.
+    """
+
+    placeholder = "%s"
+    supports_load_data = False
+    concurrent_writes = True
+
+    def create_table(self, entity_type: Type[Entity]) -> str:
+        """
+        Returns the CREATE TABLE statement of an entity type, adjusted to the database.
+        :param entity_type: the type
+        :return: the statement
+        """
+        return entity_type.create_table()
+
+    @abstractmethod
+    def upsert_clause(self, entity_type: Type[Entity]) -> str:
+        """
+        Returns the clause which turns an INSERT statement of an entity type into an upsert: a row whose primary key
+        already exists updates the existing row.
+        :param entity_type: the type
+        :return: the clause
+        """
+        pass
+
+    @abstractmethod
+    def execute_script(self, cursor: Any, script: str) -> None:
+        """
+        Executes a script which may consist of multiple statements.
+        :param cursor: the cursor
+        :param script: the script
+        :return: nothing
+        """
+        pass
+
+    @abstractmethod
+    def set_checks(self, cursor: Any, enabled: bool) -> None:
+        """
+        Switches the foreign key (and unique) checks of the session on or off.
+        :param cursor: the cursor of the session
+        :param enabled: the new state
+        :return: nothing
+        """
+        pass
+
+    def cursor(self, connection: Any, streaming: bool = False) -> Any:
+        """
+        Opens a cursor.
+        :param connection: the connection
+        :param streaming: tells whether rows should be fetched from the server on demand instead of all at once
+        :return: the cursor
+        """
+        return connection.cursor()
+
+    def close_cursor(self, connection: Any, cursor: Any) -> None:
+        """
+        Closes a cursor, even if its rows have not all been fetched (e.g. the reader stopped early), so the connection
+        can be used again.
+        :param connection: the connection
+        :param cursor: the cursor
+        :return: nothing
+        """
+        cursor.close()
+
+
+class MySQLDialect(Dialect):
+    """
+    The dialect of MySQL and MariaDB.
+    """
+
+    placeholder = "%s"
+    supports_load_data = True
+
+    def create_table(self, entity_type: Type[Entity]) -> str:
+        return entity_type.create_table().rstrip().rstrip(";") + " ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"
+
+    def upsert_clause(self, entity_type: Type[Entity]) -> str:
+        return " ON DUPLICATE KEY UPDATE " + ", ".join(
+            f"{name} = VALUES({name})" for name in entity_type.field_names() if name != entity_type.primary_key())
+
+    def execute_script(self, cursor: Any, script: str) -> None:
+        # the multi argument of cursor.execute was removed from mysql-connector
+        for statement in split_statements(script):
+            cursor.execute(statement)
+
+    def set_checks(self, cursor: Any, enabled: bool) -> None:
+        cursor.execute(f"SET FOREIGN_KEY_CHECKS = {int(enabled)}")
+        cursor.execute(f"SET UNIQUE_CHECKS = {int(enabled)}")
+
+    def cursor(self, connection: Any, streaming: bool = False) -> Any:
+        return connection.cursor(buffered=False) if streaming else connection.cursor()
+
+    def close_cursor(self, connection: Any, cursor: Any) -> None:
+        # the unread rows of an unbuffered cursor would make close fail with "Unread result found" and leave the
+        # connection unusable for the next borrower of the pool
+        if getattr(connection, "unread_result", False):
+            connection.consume_results()
+        cursor.close()
+
+
+class SQLiteDialect(Dialect):
+    """
+    The dialect of SQLite.
+    """
+
+    placeholder = "?"
+    supports_load_data = False
+    # a database file has a single writer, and connections of a shared in-memory database fail instead of waiting
+    concurrent_writes = False
+
+    def create_table(self, entity_type: Type[Entity]) -> str:
+        # every table has a text primary key, so the implicit rowid would only be an extra index
+        return entity_type.create_table().rstrip().rstrip(";") + " WITHOUT ROWID;"
+
+    def upsert_clause(self, entity_type: Type[Entity]) -> str:
+        return f" ON CONFLICT ({entity_type.primary_key()}) DO UPDATE SET " + ", ".join(
+            f"{name} = excluded.{name}" for name in entity_type.field_names() if name != entity_type.primary_key())
+
+    def execute_script(self, cursor: Any, script: str) -> None:
+        cursor.executescript(script)
+
+    def set_checks(self, cursor: Any, enabled: bool) -> None:
+        cursor.execute(f"PRAGMA foreign_keys = {'ON' if enabled else 'OFF'}")
+
+
+class ConnectionPool(ABC):
+    """
+    Lends database connections to SQLHandler, so that independent tables can be processed on separate connections.
+    """
+
+    def __init__(self, dialect: Dialect, size: int):
+        self.dialect = dialect
+        self.size = size
+
+    @abstractmethod
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Borrows a connection for the duration of a with block.
+        :return: the connection
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """
+        Closes the idle connections of the pool.
+        :return: nothing
+        """
+        pass
+
+
+class MySQLPool(ConnectionPool):
+    """
+    A pool of at most size MySQL connections. Unlike the pooling of mysql.connector, which raises PoolError when
+    every connection is lent, a borrower waits for a connection to be returned.
+    """
+
+    def __init__(self, size: int = 5, **config):
+        """
+        Creates the pool.
+        :param size: the number of connections
+        :param config: the arguments of the connections (host, user, passwd, database...)
+        """
+        super().__init__(MySQLDialect(), size)
+        self.config = config
+
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._available = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        with self._available:
+            try:
+                connection = self._idle.get_nowait()
+                if not connection.is_connected():
+                    connection.reconnect()
+            except queue.Empty:
+                connection = mysql.connector.connect(**self.config)
+
+            try:
+                yield connection
+            finally:
+                try:
+                    connection.rollback()
+                    self._idle.put(connection)
+                except mysql.connector.Error:
+                    # e.g. the unread rows of an interrupted query: the connection is not reused
+                    connection.close()
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+
+class SQLitePool(ConnectionPool):
+    """
+    A pool of SQLite connections to a database file. ":memory:" creates a private in-memory database, which is
+    shared by the connections of the pool and lives as long as the pool.
+    """
+
+    _counter = 0
+
+    def __init__(self, path: str = ":memory:", size: int = 5):
+        """
+        Creates the pool.
+        :param path: the path of the database file
+        :param size: the maximal number of idle connections kept open
+        """
+        super().__init__(SQLiteDialect(), size)
+
+        if path == ":memory:":
+            SQLitePool._counter += 1
+            self.uri = f"file:data_project_{id(self)}_{SQLitePool._counter}?mode=memory&cache=shared"
+        else:
+            self.uri = f"file:{path}"
+
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        # keeps an in-memory database alive while the pool exists
+        self._keeper = self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.uri, uri=True, check_same_thread=False, timeout=60)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._open()
+
+        try:
+            yield connection
+        finally:
+            connection.rollback()
+            if self._idle.qsize() < self.size:
+                self._idle.put(connection)
+            else:
+                connection.close()
+
+    def close(self) -> None:
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+        self._keeper.close()
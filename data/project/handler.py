@@ -1,13 +1,130 @@
+import contextvars
 import csv
+import gzip
+import io
 import json
 import os
-from typing import Type
+import re
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from itertools import islice
+from operator import itemgetter
+from typing import IO, Callable, Iterable, Iterator, Sequence, Type, TypeVar, Union
 
+import numpy as np
 import openpyxl
-from mysql.connector import MySQLConnection
 from openpyxl import Workbook
 
-from data.project.base import Entity, Dataset
+from data.project import instrumentation
+from data.project.base import Entity, Dataset, dependency_levels
+from data.project.columnar import ColumnarDataset, ColumnarTable
+from data.project.database import ConnectionPool
+from data.project.instrumentation import BYTES_WRITTEN, ROWS_READ, ROWS_WRITTEN
+from data.project.jsonbackend import JSONBackend, get_backend
+from data.project.schema import row_codec
+from data.project.snapshot import SnapshotTable, write_snapshot
+from data.project.validation import ValidationError, validate as validate_dataset
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """
+    Splits an iterable into lists of at most the given size, consuming it lazily.
+    :param items: the items
+    :param size: the maximal size of a batch
+    :return: the iterator of batches
+    """
+    assert size > 0
+
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def map_parallel(function: Callable[[T], R], items: list[T], workers: int = 1, processes: bool = False) -> list[R]:
+    """
+    Applies a function to every item and returns the results in the same order. If more than one worker is given,
+    the items are processed by a pool of threads (or processes, when the work is CPU-bound and the function and the
+    items can be pickled).
+    :param function: the function
+    :param items: the items
+    :param workers: the number of items processed at the same time
+    :param processes: tells whether a process pool should be used instead of a thread pool
+    :return: the list of results
+    """
+    workers = workers if workers is not None else 1
+    if workers <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+
+    if processes:
+        with ProcessPoolExecutor(max_workers=min(workers, len(items))) as executor:
+            return list(executor.map(function, items))
+
+    # every thread runs in a copy of the caller's context, so the handlers report to the caller's measurement
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, function, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def open_file(file_path: str, mode: str) -> IO:
+    """
+    Opens a file, which is gzip-compressed if its name ends with .gz. Text files are UTF-8 encoded.
+    :param file_path: the path and name of the file
+    :param mode: "r", "w" or "a", optionally followed by "b"
+    :return: the file object
+    """
+    if "b" in mode:
+        return gzip.open(file_path, mode) if file_path.endswith(".gz") else open(file_path, mode)
+    if file_path.endswith(".gz"):
+        return gzip.open(file_path, mode + "t", encoding="utf-8", newline="")
+    return open(file_path, mode, encoding="utf-8", newline="")
+
+
+def line_ranges(file_path: str, parts: int, start: int = 0, quotechar: str = None) -> list[tuple[int, int]]:
+    """
+    Splits a file into at most the given number of byte ranges of similar size, each starting at a line boundary.
+    :param file_path: the path and name of the file
+    :param parts: the number of ranges
+    :param start: the position of the first range (e.g. after a heading)
+    :param quotechar: if given, a line break between an odd and an even number of quote characters (i.e. inside a
+                      quoted CSV field) is not a boundary; the file is read through once to count the quotes
+    :return: the list of (first position, position after the last one) pairs
+    """
+    size = os.path.getsize(file_path)
+    quote = quotechar.encode() if quotechar is not None else None
+    boundaries = [start]
+    with open(file_path, "rb") as file:
+        for i in range(1, parts):
+            position = max(start + (size - start) * i // parts, boundaries[-1])
+            if position >= size:
+                break
+            if quote is None:
+                file.seek(position)
+                file.readline()
+            else:
+                # the previous boundary is outside of any quoted field, so the parity of the quotes since then tells
+                # whether a line break is one
+                file.seek(boundaries[-1])
+                quotes = 0
+                while file.tell() < position:
+                    quotes += file.read(min(1 << 24, position - file.tell())).count(quote)
+                line = file.readline()
+                quotes += line.count(quote)
+                while quotes % 2 == 1 and line:
+                    line = file.readline()
+                    quotes += line.count(quote)
+            boundaries.append(min(file.tell(), size))
+
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
 
 
 class CSVHandler:
@@ -17,27 +134,151 @@ class CSVHandler:
 
     @staticmethod
     def read_entity(entity_type: Type[Entity], path: str, file_name: str = None,
-                    extension: str = ".csv", delimiter: str = ";") -> list[Entity]:
+                    extension: str = ".csv", delimiter: str = ";", workers: int = 1) -> list[Entity]:
         """
-        Reads entries from a CSV document.
+        Reads entries from a CSV document. If more than one worker is given, the document is split into byte ranges
+        at row boundaries (line breaks inside quoted fields are skipped), which are parsed by a pool of processes.
         :param entity_type: the type of entries
         :param path: the path of the document
         :param file_name: the name of the document
         :param extension: the extension of the document
         :param delimiter: the delimiter
+        :param workers: the number of processes
         :return: the list of elements
         """
         file_name = file_name if file_name is not None else entity_type.collection_name()
         extension = extension if extension is not None else ".csv"
         delimiter = delimiter if delimiter is not None else ";"
+        workers = workers if workers is not None else 1
+
+        if workers <= 1:
+            return list(CSVHandler.iter_entities(entity_type, path, file_name=file_name, extension=extension,
+                                                 delimiter=delimiter))
+
+        file_path = os.path.join(path, file_name + extension)
+        with open(file_path, "rb") as file:
+            file.readline()
+            start = file.tell()
+
+        ranges = line_ranges(file_path, workers, start=start, quotechar='"')
+        with instrumentation.stage("parse"):
+            chunks = map_parallel(partial(CSVHandler.read_range, entity_type, file_path, delimiter=delimiter), ranges,
+                                  workers, True)
+        entities = [entity for chunk in chunks for entity in chunk]
+        instrumentation.count(ROWS_READ, len(entities))
+        instrumentation.count_bytes(file_path)
+        return entities
+
+    @staticmethod
+    def read_range(entity_type: Type[Entity], file_path: str, byte_range: tuple[int, int],
+                   delimiter: str = ";") -> list[Entity]:
+        """
+        Reads the entries of a CSV document which lie in a byte range starting at a row boundary.
+        :param entity_type: the type of entries
+        :param file_path: the path and name of the document
+        :param byte_range: the first position and the position after the last one
+        :param delimiter: the delimiter
+        :return: the list of elements
+        """
+
+        start, end = byte_range
+        with open(file_path, "r", newline="", encoding="utf-8") as file:
+            heading = next(csv.reader(file, delimiter=delimiter))
+
+        with open(file_path, "rb") as file:
+            file.seek(start)
+            data = file.read(end - start)
+
+        decode = CSVHandler.row_decoder(entity_type, heading)
+        return [decode(row) for row in csv.reader(io.StringIO(data.decode("utf-8"), newline=""), delimiter=delimiter)]
+
+    @staticmethod
+    def row_decoder(entity_type: Type[Entity], heading: list[str]) -> Callable[[list[str]], Entity]:
+        """
+        Returns the function which builds an entity from a row of a CSV document, whose columns are in the order of
+        the heading.
+        :param entity_type: the type of entries
+        :param heading: the names of the columns
+        :return: the function
+        """
+
+        codec = row_codec(entity_type)
+        positions = [heading.index(name) for name in codec.names]
+        if positions == list(range(len(positions))):
+            return codec.decode
 
-        with open(os.path.join(path, file_name + extension), "r", encoding="utf-8") as file:
-            rows = csv.DictReader(file, delimiter=delimiter)
-            return [entity_type.from_sequence([row[n] for n in entity_type.field_names()]) for row in rows]
+        reorder = itemgetter(*positions)
+        return lambda row: codec.decode(reorder(row))
+
+    @staticmethod
+    def iter_entities(entity_type: Type[Entity], path: str, file_name: str = None, extension: str = ".csv",
+                      delimiter: str = ";", batch_size: int = None) -> Iterator[Union[Entity, list[Entity]]]:
+        """
+        Reads entries from a CSV document lazily, so only the current row (or batch) is kept in memory.
+        :param entity_type: the type of entries
+        :param path: the path of the document
+        :param file_name: the name of the document
+        :param extension: the extension of the document
+        :param delimiter: the delimiter
+        :param batch_size: if given, lists of at most this many entries are yielded instead of single entries
+        :return: the iterator of elements (or batches)
+        """
+        file_name = file_name if file_name is not None else entity_type.collection_name()
+        extension = extension if extension is not None else ".csv"
+        delimiter = delimiter if delimiter is not None else ";"
+
+        def entities() -> Iterator[Entity]:
+            file_path = os.path.join(path, file_name + extension)
+            with instrumentation.stage("open"):
+                file = open(file_path, "r", newline="", encoding="utf-8")
+            instrumentation.count_bytes(file_path)
+            with file:
+                rows = csv.reader(file, delimiter=delimiter)
+                heading = next(rows, None)
+                if heading is None:
+                    return
+
+                yield from instrumentation.timed_map(CSVHandler.row_decoder(entity_type, heading), rows)
+
+        return entities() if batch_size is None else batched(entities(), batch_size)
+
+    @staticmethod
+    def iter_rows(entity_type: Type[Entity], path: str, file_name: str = None, extension: str = ".csv",
+                  delimiter: str = ";") -> Iterator[Union[list[str], dict[str, str]]]:
+        """
+        Reads the rows of a CSV document lazily without decoding them, so a row which cannot be decoded does not stop
+        the reader (see validation.validate). Rows are lists of texts in the order of the fields, or dictionaries by
+        column name if the heading lacks a field.
+        :param entity_type: the type of entries
+        :param path: the path of the document
+        :param file_name: the name of the document
+        :param extension: the extension of the document
+        :param delimiter: the delimiter
+        :return: the iterator of rows
+        """
+        file_name = file_name if file_name is not None else entity_type.collection_name()
+        extension = extension if extension is not None else ".csv"
+        delimiter = delimiter if delimiter is not None else ";"
+
+        file_path = os.path.join(path, file_name + extension)
+        with open(file_path, "r", newline="", encoding="utf-8") as file:
+            rows = csv.reader(file, delimiter=delimiter)
+            heading = next(rows, None)
+            if heading is None:
+                return
+
+            names = entity_type.field_names()
+            if not all(name in heading for name in names):
+                yield from (dict(zip(heading, row)) for row in rows)
+            elif heading[:len(names)] == names and len(heading) == len(names):
+                yield from rows
+            else:
+                reorder = itemgetter(*[heading.index(name) for name in names])
+                yield from (list(reorder(row)) if len(row) == len(heading) else row for row in rows)
 
     @staticmethod
     def write_entity(entities: list[Entity], path: str, file_name: str = None,
-                     extension: str = ".csv", delimiter: str = ";") -> None:
+                     extension: str = ".csv", delimiter: str = ";", append: bool = False) -> None:
         """
         Writes entries to a CSV document.
         :param entities: the entries
@@ -45,50 +286,116 @@ class CSVHandler:
         :param file_name: the name of the document
         :param extension: the extension of the document
         :param delimiter: the delimiter
+        :param append: tells whether the entries should be appended to an existing document
         :return: nothing
         """
-        file_name = file_name if file_name is not None else entities[0].collection_name()
+        CSVHandler.write_entities(type(entities[0]), entities, path, file_name=file_name, extension=extension,
+                                  delimiter=delimiter, append=append)
+
+    @staticmethod
+    def write_entities(entity_type: Type[Entity], entities: Iterable[Entity], path: str, file_name: str = None,
+                       extension: str = ".csv", delimiter: str = ";", append: bool = False) -> int:
+        """
+        Writes entries to a CSV document from any iterable (e.g. a generator), row by row.
+        :param entity_type: the type of entries
+        :param entities: the entries
+        :param path: the path of the document
+        :param file_name: the name of the document
+        :param extension: the extension of the document
+        :param delimiter: the delimiter
+        :param append: tells whether the entries should be appended to an existing document (without a heading)
+        :return: the number of written entries
+        """
+        file_name = file_name if file_name is not None else entity_type.collection_name()
         extension = extension if extension is not None else ".csv"
         delimiter = delimiter if delimiter is not None else ";"
 
-        with open(os.path.join(path, file_name + extension), "w", newline="", encoding="utf-8") as file:
-            writer = csv.DictWriter(file, fieldnames=entities[0].field_names(), delimiter=delimiter)
-            writer.writeheader()
+        file_path = os.path.join(path, file_name + extension)
+        append = append and os.path.exists(file_path) and os.path.getsize(file_path) > 0
+        before = os.path.getsize(file_path) if append else 0
+
+        count = 0
+        with instrumentation.stage("open"):
+            file = open(file_path, "a" if append else "w", newline="", encoding="utf-8")
+        with file, instrumentation.stage("serialize"):
+            writer = csv.writer(file, delimiter=delimiter)
+            if not append:
+                writer.writerow(entity_type.field_names())
+            values = row_codec(entity_type).values
             for entity in entities:
-                writer.writerow(entity.__dict__)
+                writer.writerow(values(entity))
+                count += 1
+
+        instrumentation.count(ROWS_WRITTEN, count)
+        instrumentation.count_bytes(file_path, BYTES_WRITTEN, before)
+        return count
 
     @staticmethod
-    def read_dataset(dataset_type: Type[Dataset], path: str) -> Dataset:
+    def read_dataset(dataset_type: Type[Dataset], path: str, workers: int = 1, processes: bool = False) -> Dataset:
         """
         Reads a dataset from multiple CSV documents.
         :param dataset_type: the type of the dataset
         :param path: the path of the documents
+        :param workers: the number of documents read at the same time
+        :param processes: tells whether the documents should be read by processes instead of threads
         :return: the instance
         """
-        return dataset_type.from_sequence(
-            [
-                CSVHandler.read_entity(entity_type, path, file_name=entity_type.collection_name())
-                for entity_type in dataset_type.entity_types()
-            ]
+        dataset = dataset_type.from_sequence(
+            map_parallel(partial(CSVHandler.read_entity, path=path), dataset_type.entity_types(), workers, processes)
         )
+        dataset.mark_clean()
+        return dataset
 
     @staticmethod
-    def write_dataset(dataset: Dataset, path: str) -> None:
+    def write_dataset(dataset: Dataset, path: str, workers: int = 1, processes: bool = False) -> None:
         """
         Writes a dataset to multiple CSV documents.
         :param dataset: the dataset instance
         :param path: the path of the documents
+        :param workers: the number of documents written at the same time
+        :param processes: tells whether the documents should be written by processes instead of threads
         :return: nothing
         """
-        for entity_type in dataset.entity_types():
-            CSVHandler.write_entity(dataset.entities()[entity_type], path, file_name=entity_type.collection_name())
+        map_parallel(partial(CSVHandler.write_entity, path=path),
+                     [dataset.entities()[entity_type] for entity_type in dataset.entity_types()], workers, processes)
+        dataset.mark_clean()
+
+    @staticmethod
+    def write_changes(dataset: Dataset, path: str) -> dict[Type[Entity], int]:
+        """
+        Brings the CSV documents of a dataset up to date (see Dataset.changes). New entities are appended to the
+        documents; a collection with changed or removed entities (or without a document) is written again as a whole.
+        :param dataset: the dataset instance
+        :param path: the path of the documents
+        :return: the number of written entries by type
+        """
+        counts = dict()
+        for entity_type, (new, changed, removed) in dataset.changes().items():
+            exists = os.path.exists(os.path.join(path, entity_type.collection_name() + ".csv"))
+            if changed or removed or not exists:
+                counts[entity_type] = CSVHandler.write_entities(entity_type, dataset.entities()[entity_type], path)
+            else:
+                counts[entity_type] = CSVHandler.write_entities(entity_type, new, path, append=True)
+
+        dataset.mark_clean()
+        return counts
 
 
 class JSONHandler:
     """
-    A class that handles JSON documents.
+    A class that handles JSON documents, either as one array per document (.json) or as JSON Lines (.jsonl, one
+    object per line, optionally gzip-compressed), which can be read and written incrementally. Documents are encoded
+    and decoded by the fastest installed JSON library, unless another backend is assigned.
     """
 
+    # collections of at least this size are written as JSON Lines by write_dataset, unless told otherwise
+    LINES_THRESHOLD = 100000
+
+    # the extensions of the documents of a collection, in the order of preference of find_extension
+    EXTENSIONS = [".jsonl", ".jsonl.gz", ".json"]
+
+    backend: JSONBackend = get_backend()
+
     @staticmethod
     def read_entity(entity_type: Type[Entity], path: str, file_name: str = None,
                     extension: str = ".json") -> list[Entity]:
@@ -104,62 +411,362 @@ class JSONHandler:
         file_name = file_name if file_name is not None else entity_type.collection_name()
         extension = extension if extension is not None else ".json"
 
-        with open(os.path.join(path, file_name + extension), "r", encoding="utf-8") as file:
-            return [entity_type.from_sequence([raw_entity[name] for name in entity_type.field_names()]) for
-                    raw_entity in json.load(file)]
+        file_path = os.path.join(path, file_name + extension)
+        decode = row_codec(entity_type).decode_mapping
+        with instrumentation.stage("open"), open(file_path, "rb") as file:
+            data = file.read()
+        instrumentation.count_bytes(file_path)
+
+        with instrumentation.stage("parse"):
+            raw_entities = JSONHandler.backend.loads(data)
+        with instrumentation.stage("construct"):
+            entities = [decode(raw_entity) for raw_entity in raw_entities]
+        instrumentation.count(ROWS_READ, len(entities))
+        return entities
 
     @staticmethod
     def write_entity(entities: list[Entity], path: str, file_name: str = None, extension: str = ".json",
-                     pretty: bool = True) -> None:
+                     pretty: bool = False) -> None:
         """
-        Writes entries to a CSV document.
+        Writes entries to a JSON document.
         :param entities: the entries
         :param path: the path of the document
         :param file_name: the name of the document
         :param extension: the extension of the document
-        :param pretty: tells whether the file should be indented or not
+        :param pretty: tells whether the file should be indented or not (compact documents are written much faster)
         :return: nothing
         """
 
         file_name = file_name if file_name is not None else entities[0].collection_name()
-        extension = extension if extension is not None else ".csv"
-        pretty = pretty if pretty is not None else True
+        extension = extension if extension is not None else ".json"
+        pretty = pretty if pretty is not None else False
+
+        file_path = os.path.join(path, file_name + extension)
+        if pretty:
+            codec = row_codec(type(entities[0]))
+            with instrumentation.stage("open"):
+                file = open(file_path, "w", newline="", encoding="utf-8")
+            with file, instrumentation.stage("serialize"):
+                json.dump([dict(zip(codec.names, codec.values(entity))) for entity in entities], file, indent=2)
+        else:
+            encode = JSONHandler.backend.entity_encoder(type(entities[0]))
+            with instrumentation.stage("open"):
+                file = open(file_path, "wb")
+            with file, instrumentation.stage("serialize"):
+                file.write(b"[")
+                for position, entity in enumerate(entities):
+                    if position > 0:
+                        file.write(b",\n")
+                    file.write(encode(entity))
+                file.write(b"]")
 
-        with open(os.path.join(path, file_name + extension), "w", newline="", encoding="utf-8") as file:
-            json.dump([entity.__dict__ for entity in entities], file, indent=2 if pretty else 0)
+        JSONHandler.remove_siblings(path, file_name, extension)
+        instrumentation.count(ROWS_WRITTEN, len(entities))
+        instrumentation.count_bytes(file_path, BYTES_WRITTEN)
 
     @staticmethod
-    def read_dataset(dataset_type: Type[Dataset], path: str) -> Dataset:
+    def iter_entities(entity_type: Type[Entity], path: str, file_name: str = None, extension: str = ".jsonl",
+                      batch_size: int = None) -> Iterator[Union[Entity, list[Entity]]]:
+        """
+        Reads entries from a JSON Lines document lazily. A document whose extension ends with .gz is decompressed
+        on the fly.
+        :param entity_type: the type of entries
+        :param path: the path of the document
+        :param file_name: the name of the document
+        :param extension: the extension of the document
+        :param batch_size: if given, lists of at most this many entries are yielded instead of single entries
+        :return: the iterator of elements (or batches)
+        """
+
+        file_name = file_name if file_name is not None else entity_type.collection_name()
+        extension = extension if extension is not None else ".jsonl"
+
+        def entities() -> Iterator[Entity]:
+            loads = JSONHandler.backend.loads
+            decode = row_codec(entity_type).decode_mapping
+            file_path = os.path.join(path, file_name + extension)
+            with instrumentation.stage("open"):
+                file = open_file(file_path, "rb")
+            instrumentation.count_bytes(file_path)
+            with file:
+                yield from instrumentation.timed_map(decode, (loads(line) for line in file if line.strip()))
+
+        return entities() if batch_size is None else batched(entities(), batch_size)
+
+    @staticmethod
+    def iter_rows(entity_type: Type[Entity], path: str, file_name: str = None,
+                  extension: str = None) -> Iterator[Union[bytes, dict]]:
+        """
+        Reads the rows of a JSON or JSON Lines document lazily without decoding them into entities, so a row which
+        cannot be decoded does not stop the reader (see validation.validate). The lines of a JSON Lines document are
+        returned as they are; a JSON document is parsed as a whole, and its objects are returned.
+        :param entity_type: the type of entries
+        :param path: the path of the document
+        :param file_name: the name of the document
+        :param extension: the extension of the document (see find_extension by default)
+        :return: the iterator of rows
+        """
+
+        file_name = file_name if file_name is not None else entity_type.collection_name()
+        extension = extension if extension is not None else JSONHandler.find_extension(entity_type, path)
+
+        file_path = os.path.join(path, file_name + extension)
+        if extension == ".json":
+            with open(file_path, "rb") as file:
+                yield from JSONHandler.backend.loads(file.read())
+            return
+
+        with open_file(file_path, "rb") as file:
+            yield from (line for line in file if line.strip())
+
+    @staticmethod
+    def read_lines(entity_type: Type[Entity], path: str, file_name: str = None, extension: str = ".jsonl",
+                   workers: int = 1) -> list[Entity]:
+        """
+        Reads entries from a JSON Lines document. An uncompressed document is split into byte ranges at line
+        boundaries, which are parsed by a pool of processes if more than one worker is given.
+        :param entity_type: the type of entries
+        :param path: the path of the document
+        :param file_name: the name of the document
+        :param extension: the extension of the document
+        :param workers: the number of processes
+        :return: the list of elements
+        """
+
+        file_name = file_name if file_name is not None else entity_type.collection_name()
+        extension = extension if extension is not None else ".jsonl"
+        workers = workers if workers is not None else 1
+
+        if workers <= 1 or extension.endswith(".gz"):
+            return list(JSONHandler.iter_entities(entity_type, path, file_name=file_name, extension=extension))
+
+        file_path = os.path.join(path, file_name + extension)
+        ranges = line_ranges(file_path, workers)
+        with instrumentation.stage("parse"):
+            chunks = map_parallel(partial(JSONHandler.read_line_range, entity_type, file_path), ranges, workers, True)
+        entities = [entity for chunk in chunks for entity in chunk]
+        instrumentation.count(ROWS_READ, len(entities))
+        instrumentation.count_bytes(file_path)
+        return entities
+
+    @staticmethod
+    def read_line_range(entity_type: Type[Entity], file_path: str, byte_range: tuple[int, int]) -> list[Entity]:
+        """
+        Reads the entries of a JSON Lines document which lie in a byte range starting at a line boundary.
+        :param entity_type: the type of entries
+        :param file_path: the path and name of the document
+        :param byte_range: the first position and the position after the last one
+        :return: the list of elements
+        """
+
+        start, end = byte_range
+        with open(file_path, "rb") as file:
+            file.seek(start)
+            data = file.read(end - start)
+
+        loads = JSONHandler.backend.loads
+        decode = row_codec(entity_type).decode_mapping
+        return [decode(loads(line)) for line in data.splitlines() if line.strip()]
+
+    @staticmethod
+    def write_entities(entity_type: Type[Entity], entities: Iterable[Entity], path: str, file_name: str = None,
+                       extension: str = ".jsonl", compress: bool = False, append: bool = False) -> int:
+        """
+        Writes entries to a JSON Lines document from any iterable (e.g. a generator), one compact object per line.
+        :param entity_type: the type of entries
+        :param entities: the entries
+        :param path: the path of the document
+        :param file_name: the name of the document
+        :param extension: the extension of the document
+        :param compress: tells whether the document should be gzip-compressed (.gz is appended to the extension)
+        :param append: tells whether the entries should be appended to an existing document (a compressed document
+                       gets a new gzip member)
+        :return: the number of written entries
+        """
+
+        file_name = file_name if file_name is not None else entity_type.collection_name()
+        extension = extension if extension is not None else ".jsonl"
+        extension = extension + ".gz" if compress and not extension.endswith(".gz") else extension
+
+        file_path = os.path.join(path, file_name + extension)
+        before = os.path.getsize(file_path) if append and os.path.exists(file_path) else 0
+        encode = JSONHandler.backend.entity_encoder(entity_type)
+        count = 0
+        with instrumentation.stage("open"):
+            file = open_file(file_path, "ab" if append else "wb")
+        with file, instrumentation.stage("serialize"):
+            for entity in entities:
+                file.write(encode(entity))
+                file.write(b"\n")
+                count += 1
+
+        if not append:
+            JSONHandler.remove_siblings(path, file_name, extension)
+        instrumentation.count(ROWS_WRITTEN, count)
+        instrumentation.count_bytes(file_path, BYTES_WRITTEN, before)
+        return count
+
+    @staticmethod
+    def decode(entity_type: Type[Entity], raw_entity: dict) -> Entity:
         """
-        Reads a dataset from multiple JSON documents.
+        Returns an instance from a decoded JSON object.
+        :param entity_type: the type of the entry
+        :param raw_entity: the object
+        :return: the instance
+        """
+        return row_codec(entity_type).decode_mapping(raw_entity)
+
+    @staticmethod
+    def find_extension(entity_type: Type[Entity], path: str) -> str:
+        """
+        Returns the extension of the document of a collection (one of EXTENSIONS). Writing a document removes the
+        documents of the other formats (see remove_siblings), so there is only one; if several are left (e.g. by an
+        interrupted write), the first one in the order of EXTENSIONS is chosen.
+        :param entity_type: the type of entries
+        :param path: the path of the documents
+        :return: the extension (.json if there is no document)
+        """
+
+        return next((extension for extension in JSONHandler.EXTENSIONS
+                     if os.path.exists(os.path.join(path, entity_type.collection_name() + extension))), ".json")
+
+    @staticmethod
+    def remove_siblings(path: str, file_name: str, extension: str) -> None:
+        """
+        Removes the documents of a collection which have another extension than the one just written, so they cannot
+        be read instead of it.
+        :param path: the path of the documents
+        :param file_name: the name of the documents
+        :param extension: the extension of the written document
+        :return: nothing
+        """
+
+        if extension not in JSONHandler.EXTENSIONS:
+            return
+        for sibling in JSONHandler.EXTENSIONS:
+            sibling_path = os.path.join(path, file_name + sibling)
+            if sibling != extension and os.path.exists(sibling_path):
+                os.remove(sibling_path)
+
+    @staticmethod
+    def read_collection(entity_type: Type[Entity], path: str) -> list[Entity]:
+        """
+        Reads a collection from its document, whatever its format is.
+        :param entity_type: the type of entries
+        :param path: the path of the documents
+        :return: the list of elements
+        """
+
+        extension = JSONHandler.find_extension(entity_type, path)
+        if extension == ".json":
+            return JSONHandler.read_entity(entity_type, path, extension=extension)
+        return list(JSONHandler.iter_entities(entity_type, path, extension=extension))
+
+    @staticmethod
+    def write_collection(entities: list[Entity], path: str, lines: bool = None, compress: bool = False) -> None:
+        """
+        Writes a collection as a JSON document or as a JSON Lines document.
+        :param entities: the entries
+        :param path: the path of the documents
+        :param lines: tells whether JSON Lines should be written (None chooses it for large collections)
+        :param compress: tells whether JSON Lines documents should be gzip-compressed
+        :return: nothing
+        """
+
+        lines = lines if lines is not None else len(entities) >= JSONHandler.LINES_THRESHOLD
+        if lines:
+            JSONHandler.write_entities(type(entities[0]), entities, path, compress=compress)
+        else:
+            JSONHandler.write_entity(entities, path)
+
+    @staticmethod
+    def read_dataset(dataset_type: Type[Dataset], path: str, workers: int = 1, processes: bool = False) -> Dataset:
+        """
+        Reads a dataset from multiple JSON (or JSON Lines) documents.
         :param dataset_type: the type of the dataset
         :param path: the path of the documents
+        :param workers: the number of documents read at the same time
+        :param processes: tells whether the documents should be read by processes instead of threads
         :return: the instance
         """
-        return dataset_type.from_sequence(
-            [
-                JSONHandler.read_entity(entity_type, path, file_name=entity_type.collection_name())
-                for entity_type in dataset_type.entity_types()
-            ]
+        dataset = dataset_type.from_sequence(
+            map_parallel(partial(JSONHandler.read_collection, path=path), dataset_type.entity_types(), workers,
+                         processes)
         )
+        dataset.mark_clean()
+        return dataset
 
     @staticmethod
-    def write_dataset(dataset: Dataset, path: str) -> None:
+    def write_dataset(dataset: Dataset, path: str, workers: int = 1, processes: bool = False, lines: bool = None,
+                      compress: bool = False) -> None:
         """
-        Writes a dataset to multiple JSON documents.
+        Writes a dataset to multiple JSON (or JSON Lines) documents.
         :param dataset: the dataset instance
         :param path: the path of the documents
+        :param workers: the number of documents written at the same time
+        :param processes: tells whether the documents should be written by processes instead of threads
+        :param lines: tells whether JSON Lines should be written (None chooses it for collections of at least
+                      LINES_THRESHOLD entries)
+        :param compress: tells whether JSON Lines documents should be gzip-compressed
         :return: nothing
         """
-        for entity_type in dataset.entity_types():
-            JSONHandler.write_entity(dataset.entities()[entity_type], path, file_name=entity_type.collection_name())
+        map_parallel(partial(JSONHandler.write_collection, path=path, lines=lines, compress=compress),
+                     [dataset.entities()[entity_type] for entity_type in dataset.entity_types()], workers, processes)
+        dataset.mark_clean()
+
+    @staticmethod
+    def write_changes(dataset: Dataset, path: str, compress: bool = False) -> dict[Type[Entity], int]:
+        """
+        Brings the documents of a dataset up to date (see Dataset.changes). New entities are appended to the JSON
+        Lines documents; a collection with changed or removed entities (or without a document) is written again as a
+        whole. A JSON array document cannot be appended to, so it is replaced by a JSON Lines document on the first
+        incremental write.
+        :param dataset: the dataset instance
+        :param path: the path of the documents
+        :param compress: tells whether new JSON Lines documents should be gzip-compressed
+        :return: the number of written entries by type
+        """
+        counts = dict()
+        for entity_type, (new, changed, removed) in dataset.changes().items():
+            extension = JSONHandler.find_extension(entity_type, path)
+            exists = os.path.exists(os.path.join(path, entity_type.collection_name() + extension))
+            if not changed and not removed and exists and extension != ".json":
+                counts[entity_type] = JSONHandler.write_entities(entity_type, new, path, extension=extension,
+                                                                 append=True)
+            elif changed or removed or new or not exists:
+                counts[entity_type] = JSONHandler.write_entities(entity_type, dataset.entities()[entity_type], path,
+                                                                 compress=compress)
+            else:
+                counts[entity_type] = 0
+
+        dataset.mark_clean()
+        return counts
 
 
 class XLSXHandler:
     """
-    A class that handles XLSX documents.
+    A class that handles XLSX documents. Documents are written with write-only workbooks and read with read-only
+    ones, which stream rows instead of keeping every cell in memory. A collection which does not fit into a single
+    worksheet is continued on worksheets named <sheet name>_2, <sheet name>_3, etc.
     """
 
+    # the number of rows of a worksheet in Excel
+    MAX_ROWS = 1048576
+
+    @staticmethod
+    def sheet_names(workbook: openpyxl.Workbook, sheet_name: str) -> list[str]:
+        """
+        Returns the names of the worksheets which hold a collection.
+        :param workbook: the workbook instance
+        :param sheet_name: the name of the first worksheet
+        :return: the list of names
+        """
+
+        names = [sheet_name]
+        while f"{sheet_name}_{len(names) + 1}" in workbook.sheetnames:
+            names.append(f"{sheet_name}_{len(names) + 1}")
+        return names
+
     @staticmethod
     def read_entity(entity_type: Type[Entity], workbook: openpyxl.Workbook, sheet_name: str = None,
                     heading: bool = True) -> list[Entity]:
@@ -168,27 +775,37 @@ class XLSXHandler:
         :param entity_type: the type of entries
         :param workbook: the workbook instance
         :param sheet_name: the name of the worksheet
-        :param heading: tells whether a heading should be added to the worksheet
+        :param heading: tells whether a heading can be found in the worksheet
         :return: the list of elements
         """
 
-        sheet_name = sheet_name if sheet_name is not None else entity_type.collection_name()
-        heading = heading if heading is not None else True
+        return list(XLSXHandler.iter_entities(entity_type, workbook, sheet_name=sheet_name, heading=heading))
 
-        sheet = workbook[sheet_name]
-        entities = []
+    @staticmethod
+    def iter_entities(entity_type: Type[Entity], workbook: openpyxl.Workbook, sheet_name: str = None,
+                      heading: bool = True) -> Iterator[Entity]:
+        """
+        Reads entries from an XLSX document lazily, row by row, until the first row with an empty first cell.
+        :param entity_type: the type of entries
+        :param workbook: the workbook instance (preferably loaded with read_only=True)
+        :param sheet_name: the name of the worksheet
+        :param heading: tells whether a heading can be found in the worksheet
+        :return: the iterator of elements
+        """
 
-        row = 2 if heading else 1
-        while True:
-            cell = sheet.cell(row=row, column=1)
-            if cell.value is None:
-                break
+        sheet_name = sheet_name if sheet_name is not None else entity_type.collection_name()
+        heading = heading if heading is not None else True
+        width = len(entity_type.field_names())
 
-            values = [sheet.cell(row=row, column=pos).value for pos in range(1, len(entity_type.field_names()) + 1)]
-            entities.append(entity_type.from_sequence(values))
-            row += 1
+        def rows() -> Iterator[tuple]:
+            for name in XLSXHandler.sheet_names(workbook, sheet_name):
+                sheet = workbook[name]
+                for values in sheet.iter_rows(min_row=2 if heading else 1, max_col=width, values_only=True):
+                    if values[0] is None:
+                        break
+                    yield values
 
-        return entities
+        return instrumentation.timed_map(row_codec(entity_type).decode, rows())
 
     @staticmethod
     def write_entity(entities: list[Entity], workbook: openpyxl.Workbook, sheet_name: str = None,
@@ -198,23 +815,48 @@ class XLSXHandler:
         :param entities: the entries
         :param workbook: the workbook instance
         :param sheet_name: the name of the worksheet
-        :param heading: tells whether a heading can be found in the worksheet
+        :param heading: tells whether a heading should be added to the worksheet
         :return: nothing
         """
 
-        sheet_name = sheet_name if sheet_name is not None else entities[0].collection_name()
+        XLSXHandler.write_entities(type(entities[0]), entities, workbook, sheet_name=sheet_name, heading=heading)
+
+    @staticmethod
+    def write_entities(entity_type: Type[Entity], entities: Iterable[Entity], workbook: openpyxl.Workbook,
+                       sheet_name: str = None, heading: bool = True) -> int:
+        """
+        Appends entries to new worksheets of an XLSX document from any iterable, row by row.
+        :param entity_type: the type of entries
+        :param entities: the entries
+        :param workbook: the workbook instance (preferably created with write_only=True)
+        :param sheet_name: the name of the (first) worksheet
+        :param heading: tells whether a heading should be added to the worksheets
+        :return: the number of written entries
+        """
+
+        sheet_name = sheet_name if sheet_name is not None else entity_type.collection_name()
         heading = heading if heading is not None else True
+        values = row_codec(entity_type).values
+        capacity = XLSXHandler.MAX_ROWS - (1 if heading else 0)
 
-        sheet = workbook.create_sheet(sheet_name)
-        if heading:
-            for i in range(len(entities[0].field_names())):
-                sheet.cell(row=1, column=i + 1, value=entities[0].field_names()[i])
+        count = 0
+        with instrumentation.stage("serialize"):
+            for batch in batched(entities, capacity):
+                sheets = count // capacity
+                sheet = workbook.create_sheet(sheet_name if sheets == 0 else f"{sheet_name}_{sheets + 1}")
+                if heading:
+                    sheet.append(entity_type.field_names())
+                for entity in batch:
+                    sheet.append(list(values(entity)))
+                count += len(batch)
+        instrumentation.count(ROWS_WRITTEN, count)
 
-        row = 2 if heading else 1
-        for entity in entities:
-            for j in range(len(entities[0].field_names())):
-                sheet.cell(row=row, column=j + 1, value=entity.__dict__[entities[0].field_names()[j]])
-            row += 1
+        if count == 0:
+            sheet = workbook.create_sheet(sheet_name)
+            if heading:
+                sheet.append(entity_type.field_names())
+
+        return count
 
     @staticmethod
     def read_dataset(dataset_type: Type[Dataset], path: str) -> Dataset:
@@ -225,61 +867,553 @@ class XLSXHandler:
         :return: the instance
         """
 
-        wb = openpyxl.load_workbook(os.path.join(path, "dataset.xlsx"))
-        return dataset_type.from_sequence(
-            [
-                XLSXHandler.read_entity(entity_type, wb, sheet_name=entity_type.collection_name())
-                for entity_type in dataset_type.entity_types()
-            ]
-        )
+        file_path = os.path.join(path, "dataset.xlsx")
+        with instrumentation.stage("open"):
+            wb = openpyxl.load_workbook(file_path, read_only=True)
+        instrumentation.count_bytes(file_path)
+        try:
+            return dataset_type.from_sequence(
+                [
+                    XLSXHandler.read_entity(entity_type, wb, sheet_name=entity_type.collection_name())
+                    for entity_type in dataset_type.entity_types()
+                ]
+            )
+        finally:
+            wb.close()
 
     @staticmethod
-    def write_dataset(dataset: Dataset, path: str) -> None:
+    def write_dataset(dataset: Dataset, path: str, timestamp: datetime = None) -> None:
         """
         Writes a dataset to to an XLSX document.
         :param dataset: the dataset instance
         :param path: the path of the document
+        :param timestamp: if given, it is used as the creation and modification time of the document and of every
+                          member of the archive, so the same dataset always gives a byte-identical file
         :return: nothing
         """
 
-        wb = Workbook()
+        wb = Workbook(write_only=True)
         for entity_type in dataset.entity_types():
-            XLSXHandler.write_entity(dataset.entities()[entity_type], wb, sheet_name=entity_type.collection_name())
-        wb.remove(wb["Sheet"])
-        wb.save(os.path.join(path, "dataset.xlsx"))
+            XLSXHandler.write_entities(entity_type, dataset.entities()[entity_type], wb,
+                                       sheet_name=entity_type.collection_name())
+
+        file_path = os.path.join(path, "dataset.xlsx")
+        with instrumentation.stage("commit"):
+            if timestamp is None:
+                wb.save(file_path)
+            else:
+                wb.properties.created = timestamp
+                buffer = io.BytesIO()
+                wb.save(buffer)
+                XLSXHandler.pin_timestamps(buffer, file_path, timestamp)
+        instrumentation.count_bytes(file_path, BYTES_WRITTEN)
+
+    @staticmethod
+    def pin_timestamps(source: io.BytesIO, file_name: str, timestamp: datetime) -> None:
+        """
+        Copies a saved workbook to a file, replacing the modification time written by openpyxl and the times of the
+        archive members with the given one.
+        :param source: the saved workbook
+        :param file_name: the name of the target file
+        :param timestamp: the time
+        :return: nothing
+        """
+
+        modified = f"<dcterms:modified xsi:type=\"dcterms:W3CDTF\">{timestamp.strftime('%Y-%m-%dT%H:%M:%SZ')}" \
+                   f"</dcterms:modified>"
+        with zipfile.ZipFile(source, "r") as original, \
+                zipfile.ZipFile(file_name, "w", zipfile.ZIP_DEFLATED) as target:
+            for info in original.infolist():
+                data = original.read(info.filename)
+                if info.filename == "docProps/core.xml":
+                    data = re.sub(r"<dcterms:modified[^>]*>[^<]*</dcterms:modified>", modified,
+                                  data.decode("utf-8")).encode("utf-8")
+                member = zipfile.ZipInfo(info.filename, date_time=timestamp.timetuple()[:6])
+                member.compress_type = zipfile.ZIP_DEFLATED
+                target.writestr(member, data)
+
+
+class NPZHandler:
+    """
+    A class that handles binary, columnar documents. Every collection is stored in a folder as a ColumnarTable split
+    into row groups: compressed NumPy .npz bundles (one array per field, plus a <field>.null mask for the fields which
+    contain None in the group) described by a meta.json file, which holds the dictionaries of the categorical fields,
+    the fields with a null mask and the minimum and maximum of the numeric columns of every group.
+    """
+
+    ROW_GROUP_SIZE = 100000
+
+    OPERATORS: dict[str, Callable[[np.ndarray, object], np.ndarray]] = {
+        "==": lambda column, value: column == value,
+        "!=": lambda column, value: column != value,
+        "<": lambda column, value: column < value,
+        "<=": lambda column, value: column <= value,
+        ">": lambda column, value: column > value,
+        ">=": lambda column, value: column >= value,
+        "in": lambda column, value: np.isin(column, list(value)),
+    }
+
+    @staticmethod
+    def write_table(table: ColumnarTable, path: str, name: str = None) -> None:
+        """
+        Writes a columnar table to a folder.
+        :param table: the table
+        :param path: the path of the folder of the collections
+        :param name: the name of the collection's folder
+        :return: nothing
+        """
+
+        NPZHandler.write_entities(table.entity_type, table, path, name=name)
+
+    @staticmethod
+    def write_entities(entity_type: Type[Entity], entities: Iterable[Entity], path: str, name: str = None) -> int:
+        """
+        Writes entries to a columnar folder from any iterable (e.g. a generator), row group by row group, so only
+        the current group is kept in memory.
+        :param entity_type: the type of entries
+        :param entities: the entries (or a ColumnarTable)
+        :param path: the path of the folder of the collections
+        :param name: the name of the collection's folder
+        :return: the number of written entries
+        """
+
+        name = name if name is not None else entity_type.collection_name()
+        folder = os.path.join(path, name)
+        os.makedirs(folder, exist_ok=True)
+        for file_name in os.listdir(folder):
+            if file_name.startswith("group-") and file_name.endswith(".npz"):
+                os.remove(os.path.join(folder, file_name))
+
+        size = NPZHandler.ROW_GROUP_SIZE
+        categories: dict[str, list[str]] = dict()
+        if isinstance(entities, ColumnarTable):
+            tables = (entities[start:start + size] for start in range(0, len(entities), size))
+            categories = entities.categories
+        else:
+            tables = (ColumnarTable.from_entities(entity_type, batch) for batch in batched(entities, size))
+
+        groups = []
+        count = 0
+        dtypes = {field_name: np.dtype(column.dtype if column.dtype != object else str).str
+                  for field_name, column in ColumnarTable.from_entities(entity_type, []).columns.items()}
+        tables = iter(tables)
+        while True:
+            with instrumentation.stage("serialize"):
+                group = next(tables, None)
+                if group is None:
+                    break
+                columns = dict()
+                stats = dict()
+                nulls = []
+                for field_name, column in group.columns.items():
+                    if field_name in group.categories and group.categories is not categories:
+                        # the codes of a group are translated into the dictionary of the whole collection
+                        column, categories[field_name] = ColumnarTable.encode(group.column(field_name).tolist(),
+                                                                              categories.get(field_name))
+                    mask = group.masks.get(field_name)
+                    if column.dtype == object:
+                        mask = np.array([value is None for value in column], dtype=np.bool_)
+                        column = np.array(["" if value is None else value for value in column], dtype=str) \
+                            if mask.any() else column.astype(str)
+                    present = column if mask is None else column[~mask]
+                    if column.dtype.kind != "U" and len(present) > 0:
+                        stats[field_name] = [present.min().item(), present.max().item()]
+                    if mask is not None and mask.any():
+                        columns[f"{field_name}.null"] = mask
+                        nulls.append(field_name)
+                    columns[field_name] = column
+                    dtypes[field_name] = np.dtype(column.dtype if column.dtype.kind != "U" else str).str
+
+            file_name = f"group-{len(groups):05d}.npz"
+            with instrumentation.stage("commit"):
+                np.savez_compressed(os.path.join(folder, file_name), **columns)
+            instrumentation.count_bytes(os.path.join(folder, file_name), BYTES_WRITTEN)
+            groups.append({"file": file_name, "rows": len(group), "stats": stats, "nulls": nulls})
+            count += len(group)
+
+        meta = {
+            "collection": entity_type.collection_name(),
+            "rows": count,
+            "fields": entity_type.field_names() if not isinstance(entities, ColumnarTable) else list(entities.columns),
+            "dtypes": dtypes,
+            "categories": categories,
+            "groups": groups
+        }
+        with open(os.path.join(folder, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump(meta, file, indent=2)
+
+        instrumentation.count(ROWS_WRITTEN, count)
+        return count
+
+    @staticmethod
+    def read_table(entity_type: Type[Entity], path: str, name: str = None, columns: list[str] = None,
+                   filters: list[tuple[str, str, object]] = None, workers: int = 1) -> ColumnarTable:
+        """
+        Reads a columnar table from a folder. Only the requested columns are decompressed, and row groups whose
+        statistics show that no row can pass the filters are skipped.
+        :param entity_type: the type of entries
+        :param path: the path of the folder of the collections
+        :param name: the name of the collection's folder
+        :param columns: the fields to read (all if omitted; a projected table cannot rebuild entities)
+        :param filters: (field, operator, value) conditions which every returned row satisfies, where operator is
+                        one of ==, !=, <, <=, >, >=, in (values of categorical fields are given as strings)
+        :param workers: the number of row groups decompressed at the same time (by threads)
+        :return: the table
+        """
+
+        name = name if name is not None else entity_type.collection_name()
+        folder = os.path.join(path, name)
+        with instrumentation.stage("open"), open(os.path.join(folder, "meta.json"), "r", encoding="utf-8") as file:
+            meta = json.load(file)
+
+        columns = columns if columns is not None else meta["fields"]
+        filters = [NPZHandler.encode_filter(meta["categories"], f) for f in (filters if filters is not None else [])]
+        needed = list(dict.fromkeys(columns + [field_name for field_name, _, _ in filters]))
+
+        groups = [group for group in meta["groups"] if group["rows"] > 0 and
+                  all(NPZHandler.may_match(group["stats"].get(f[0]), f[1], f[2]) for f in filters)]
+
+        def load(group: dict) -> tuple[dict[str, np.ndarray], dict[str, np.ndarray]]:
+            with np.load(os.path.join(folder, group["file"])) as bundle:
+                arrays = {field_name: bundle[field_name] for field_name in needed}
+                nulls = {field_name: bundle[f"{field_name}.null"] for field_name in group.get("nulls", [])
+                         if field_name in arrays}
+            if filters:
+                # None never satisfies a condition
+                mask = np.ones(group["rows"], dtype=np.bool_)
+                for field_name, operator, value in filters:
+                    mask &= NPZHandler.OPERATORS[operator](arrays[field_name], value)
+                    if field_name in nulls:
+                        mask &= ~nulls[field_name]
+                arrays = {field_name: array[mask] for field_name, array in arrays.items()}
+                nulls = {field_name: null[mask] for field_name, null in nulls.items()}
+            return arrays, nulls
+
+        with instrumentation.stage("parse"):
+            parts = map_parallel(load, groups, workers)
+            result = dict()
+            masks = dict()
+            for field_name in columns:
+                arrays = [arrays[field_name] for arrays, _ in parts]
+                result[field_name] = np.concatenate(arrays) if arrays \
+                    else np.array([], dtype=meta["dtypes"][field_name])
+                if any(field_name in nulls for _, nulls in parts):
+                    mask = np.concatenate([nulls.get(field_name, np.zeros(len(arrays[field_name]), dtype=np.bool_))
+                                           for arrays, nulls in parts])
+                    if result[field_name].dtype.kind == "U":
+                        result[field_name] = result[field_name].astype(object)
+                        result[field_name][mask] = None
+                    else:
+                        masks[field_name] = mask
+        for group in groups:
+            instrumentation.count_bytes(os.path.join(folder, group["file"]))
+        instrumentation.count(ROWS_READ, len(next(iter(result.values()))) if result else 0)
+
+        return ColumnarTable(entity_type, result,
+                             {field_name: meta["categories"][field_name] for field_name in columns
+                              if field_name in meta["categories"]}, masks)
+
+    @staticmethod
+    def encode_filter(categories: dict[str, list[str]], condition: tuple[str, str, object]) -> tuple[str, str, object]:
+        """
+        Translates the values of a filter on a categorical field into codes.
+        :param categories: the dictionaries of the categorical fields
+        :param condition: the (field, operator, value) condition
+        :return: the condition on the stored values
+        """
+
+        field_name, operator, value = condition
+        if operator not in NPZHandler.OPERATORS:
+            raise ValueError(f"unknown operator: {operator}")
+        if field_name not in categories:
+            return condition
+
+        if operator not in ["==", "!=", "in"]:
+            raise ValueError(f"only equality can be tested on a categorical field: {field_name}")
+        codes = {category: code for code, category in enumerate(categories[field_name])}
+        if operator == "in":
+            return field_name, operator, [codes[v] for v in value if v in codes]
+        return field_name, operator, codes.get(value, -1)
+
+    @staticmethod
+    def may_match(stats: list, operator: str, value: object) -> bool:
+        """
+        Tells whether a row group may contain a row which satisfies a condition.
+        :param stats: the minimum and the maximum of the column in the group (None if unknown)
+        :param operator: the operator of the condition
+        :param value: the value of the condition
+        :return: the answer
+        """
+
+        if stats is None:
+            return True
+
+        low, high = stats
+        if operator == "==":
+            return low <= value <= high
+        if operator == "!=":
+            return not low == high == value
+        if operator == "<":
+            return low < value
+        if operator == "<=":
+            return low <= value
+        if operator == ">":
+            return high > value
+        if operator == ">=":
+            return high >= value
+        return any(low <= v <= high for v in value)
+
+    @staticmethod
+    def read_entity(entity_type: Type[Entity], path: str, name: str = None) -> list[Entity]:
+        """
+        Reads entries from a columnar folder.
+        :param entity_type: the type of entries
+        :param path: the path of the folder of the collections
+        :param name: the name of the collection's folder
+        :return: the list of elements
+        """
+
+        table = NPZHandler.read_table(entity_type, path, name=name)
+        with instrumentation.stage("construct"):
+            return table.to_entities()
+
+    @staticmethod
+    def write_entity(entities: list[Entity], path: str, name: str = None) -> None:
+        """
+        Writes entries to a columnar folder.
+        :param entities: the entries (or a ColumnarTable)
+        :param path: the path of the folder of the collections
+        :param name: the name of the collection's folder
+        :return: nothing
+        """
+
+        entity_type = entities.entity_type if isinstance(entities, ColumnarTable) else type(entities[0])
+        NPZHandler.write_table(ColumnarTable.from_entities(entity_type, entities), path, name=name)
+
+    @staticmethod
+    def read_dataset(dataset_type: Type[Dataset], path: str, workers: int = 1) -> Dataset:
+        """
+        Reads a dataset from columnar folders. A columnar dataset type gets the tables as they are, any other type
+        gets materialized entities.
+        :param dataset_type: the type of the dataset
+        :param path: the path of the folders
+        :param workers: the number of collections read at the same time
+        :return: the instance
+        """
+
+        tables = map_parallel(partial(NPZHandler.read_table, path=path), dataset_type.entity_types(), workers)
+        if issubclass(dataset_type, ColumnarDataset):
+            return dataset_type.from_sequence(tables)
+        return dataset_type.from_sequence([table.to_entities() for table in tables])
+
+    @staticmethod
+    def write_dataset(dataset: Dataset, path: str, workers: int = 1) -> None:
+        """
+        Writes a dataset to columnar folders.
+        :param dataset: the dataset instance
+        :param path: the path of the folders
+        :param workers: the number of collections written at the same time
+        :return: nothing
+        """
+
+        map_parallel(lambda entity_type: NPZHandler.write_table(
+            ColumnarTable.from_entities(entity_type, dataset.entities()[entity_type]), path),
+                     dataset.entity_types(), workers)
+
+
+class SnapshotHandler:
+    """
+    A class that handles snapshots: binary files (one per collection) which are memory-mapped on read, so a dataset
+    is opened in milliseconds whatever its size and its entities are materialized only when they are accessed.
+    """
+
+    EXTENSION = ".snap"
+
+    @staticmethod
+    def read_entity(entity_type: Type[Entity], path: str, file_name: str = None) -> SnapshotTable:
+        """
+        Opens a snapshot file.
+        :param entity_type: the type of entries
+        :param path: the path of the file's folder
+        :param file_name: the name of the file without extension
+        :return: the lazy list of elements
+        """
+
+        file_name = file_name if file_name is not None else entity_type.collection_name()
+        file_path = os.path.join(path, file_name + SnapshotHandler.EXTENSION)
+        with instrumentation.stage("open"):
+            table = SnapshotTable(entity_type, file_path)
+        instrumentation.count_bytes(file_path)
+        return table
+
+    @staticmethod
+    def write_entity(entities: list[Entity], path: str, file_name: str = None) -> None:
+        """
+        Writes entries to a snapshot file.
+        :param entities: the entries
+        :param path: the path of the file's folder
+        :param file_name: the name of the file without extension
+        :return: nothing
+        """
+
+        file_name = file_name if file_name is not None else type(entities[0]).collection_name()
+        os.makedirs(path, exist_ok=True)
+        SnapshotHandler.write_file(entities, os.path.join(path, file_name + SnapshotHandler.EXTENSION))
+
+    @staticmethod
+    def write_file(entities: Iterable[Entity], file_path: str) -> int:
+        """
+        Writes entries to a snapshot file (see snapshot.write_snapshot).
+        :param entities: the entries
+        :param file_path: the path of the file
+        :return: the number of written entries
+        """
+
+        with instrumentation.stage("serialize"):
+            count = write_snapshot(entities, file_path)
+        instrumentation.count(ROWS_WRITTEN, count)
+        instrumentation.count_bytes(file_path, BYTES_WRITTEN)
+        return count
+
+    @staticmethod
+    def read_dataset(dataset_type: Type[Dataset], path: str) -> Dataset:
+        """
+        Opens the snapshot files of a dataset.
+        :param dataset_type: the type of the dataset
+        :param path: the path of the files
+        :return: the instance, whose collections are SnapshotTable instances
+        """
+
+        return dataset_type.from_sequence(
+            [SnapshotHandler.read_entity(entity_type, path) for entity_type in dataset_type.entity_types()])
+
+    @staticmethod
+    def write_dataset(dataset: Dataset, path: str, workers: int = 1) -> None:
+        """
+        Writes a dataset to snapshot files.
+        :param dataset: the dataset instance
+        :param path: the path of the files
+        :param workers: the number of files written at the same time
+        :return: nothing
+        """
+
+        os.makedirs(path, exist_ok=True)
+        map_parallel(lambda item: SnapshotHandler.write_file(
+            item[1], os.path.join(path, item[0].collection_name() + SnapshotHandler.EXTENSION)),
+                     list(dataset.entities().items()), workers)
 
 
 class SQLHandler:
     """
-    A class that handles a MySQL connection.
+    A class that handles SQL databases (MySQL, or SQLite as a local stand-in) through a connection pool.
     """
 
+    # the characters escaped in the fields of a LOAD DATA file
+    LOAD_DATA_ESCAPES = str.maketrans({"\\": "\\\\", "\"": "\\\"", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
+
+    @staticmethod
+    def create_table(entity_type: Type[Entity], pool: ConnectionPool, table_name: str = None) -> None:
+        """
+        Drops the table of an entity type (if it exists), then creates it.
+        :param entity_type: the type of entries
+        :param pool: the connection pool
+        :param table_name: the name of the database table
+        :return: nothing
+        """
+
+        table_name = table_name if table_name is not None else entity_type.collection_name()
+
+        with pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+            pool.dialect.execute_script(cursor, pool.dialect.create_table(entity_type))
+            connection.commit()
+            cursor.close()
+
+    @staticmethod
+    def drop_tables(entity_types: list[Type[Entity]], pool: ConnectionPool) -> None:
+        """
+        Drops the tables of entity types (if they exist), the referring tables first.
+        :param entity_types: the types of entries, tables referred to first (as returned by Dataset.entity_types)
+        :param pool: the connection pool
+        :return: nothing
+        """
+
+        with pool.connection() as connection:
+            cursor = connection.cursor()
+            for entity_type in reversed(entity_types):
+                cursor.execute(f"DROP TABLE IF EXISTS {entity_type.collection_name()}")
+            connection.commit()
+            cursor.close()
+
     @staticmethod
-    def read_entity(entity_type: Type[Entity], connection: MySQLConnection, table_name: str = None) -> list[Entity]:
+    def read_entity(entity_type: Type[Entity], pool: ConnectionPool, table_name: str = None) -> list[Entity]:
         """
         Reads entries from a database table.
         :param entity_type: the type of entries
-        :param connection: the database connection
+        :param pool: the connection pool
         :param table_name: the name of the database table
         :return: the list of elements
         """
 
+        return list(SQLHandler.iter_entities(entity_type, pool, table_name=table_name))
+
+    @staticmethod
+    def iter_entities(entity_type: Type[Entity], pool: ConnectionPool, table_name: str = None,
+                      batch_size: int = None, columns: list[str] = None, where: str = None,
+                      params: Sequence = None) -> Iterator[Union[Entity, list]]:
+        """
+        Reads entries from a database table lazily. Rows are streamed through an unbuffered cursor and fetched
+        batch by batch, so the client holds at most one batch. A connection of the pool is borrowed until the
+        iterator is exhausted or closed; the rows left unread by a closed iterator are discarded first.
+        :param entity_type: the type of entries
+        :param pool: the connection pool
+        :param table_name: the name of the database table
+        :param batch_size: if given, lists of at most this many entries are yielded instead of single entries
+        :param columns: if given, only these columns are selected, and rows (lists of values in this order) are
+                        yielded instead of entries
+        :param where: an optional predicate (the part after WHERE) evaluated by the database, with placeholders of
+                      the pool's dialect
+        :param params: the values of the placeholders of the predicate
+        :return: the iterator of elements, rows or batches
+        """
+
         table_name = table_name if table_name is not None else entity_type.collection_name()
+        fetch_size = batch_size if batch_size is not None else 1000
 
-        cursor = connection.cursor()
-        cursor.execute("SELECT * FROM {table}"
-                       .format(table=table_name if table_name is not None else entity_type.collection_name()))
-        result = [entity_type.from_sequence(row) for row in cursor.fetchall()]
-        cursor.close()
-        return result
+        def rows() -> Iterator[Union[Entity, list]]:
+            statement = "SELECT {columns} FROM {table}".format(
+                columns=", ".join(columns if columns is not None else entity_type.field_names()),
+                table=table_name)
+            if where is not None:
+                statement += f" WHERE {where}"
+
+            def fetch(cursor) -> Iterator[tuple]:
+                while True:
+                    batch = cursor.fetchmany(fetch_size)
+                    if not batch:
+                        return
+                    yield from batch
+
+            decode = row_codec(entity_type).decode if columns is None else list
+            with pool.connection() as connection:
+                cursor = pool.dialect.cursor(connection, streaming=True)
+                try:
+                    with instrumentation.stage("open"):
+                        cursor.execute(statement, tuple(params) if params is not None else ())
+                    yield from instrumentation.timed_map(decode, fetch(cursor))
+                finally:
+                    pool.dialect.close_cursor(connection, cursor)
+
+        return rows() if batch_size is None else batched(rows(), batch_size)
 
     @staticmethod
-    def write_entity(entities: list[Entity], connection: MySQLConnection, table_name: str = None,
+    def write_entity(entities: list[Entity], pool: ConnectionPool, table_name: str = None,
                      create: bool = True) -> None:
         """
-        Writes entries to an XLSX document.
+        Writes entries to a database table.
         :param entities: the entries
-        :param connection: the database connection
+        :param pool: the connection pool
         :param table_name: the name of the database table
         :param create: tells whether the table should be created (and a previous instance should be dropped)
         :return: nothing
@@ -299,49 +1433,235 @@ class SQLHandler:
             return "INSERT INTO {table} ({columns}) VALUES ({values})".format(
                 table=entity_name,
                 columns=", ".join(field_names),
-                values=", ".join(["%s" for _ in field_names]))
+                values=", ".join([pool.dialect.placeholder for _ in field_names]))
 
-        cursor = connection.cursor()
         if create:
-            cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
-            for _ in cursor.execute(entities[0].create_table(), multi=True):
-                pass
+            SQLHandler.create_table(type(entities[0]), pool, table_name)
+
+        with pool.connection() as connection:
+            cursor = connection.cursor()
+            values = row_codec(type(entities[0])).values
+            with instrumentation.stage("serialize"):
+                rows = [values(entity) for entity in entities]
+            with instrumentation.stage("commit"):
+                cursor.executemany(get_insert_command(table_name, entities[0].field_names()), rows)
+                connection.commit()
+            cursor.close()
+
+        instrumentation.count(ROWS_WRITTEN, len(entities))
+
+    @staticmethod
+    def write_entities(entity_type: Type[Entity], entities: Iterable[Entity], pool: ConnectionPool,
+                       table_name: str = None, create: bool = True, batch_size: int = 1000,
+                       method: str = "insert", defer_checks: bool = False) -> int:
+        """
+        Writes entries to a database table from any iterable (e.g. a generator), batch by batch. Every batch is sent
+        as a single statement and committed on its own, so neither the client nor the server has to hold the whole
+        collection.
+        :param entity_type: the type of entries
+        :param entities: the entries
+        :param pool: the connection pool
+        :param table_name: the name of the database table
+        :param create: tells whether the table should be created (and a previous instance should be dropped)
+        :param batch_size: the number of rows per statement and transaction
+        :param method: "insert" sends multi-row INSERT statements, "upsert" sends multi-row INSERT statements which
+                       update the rows whose primary key already exists, "load" sends every batch through a temporary
+                       CSV file and LOAD DATA LOCAL INFILE (MySQL only, the connection needs allow_local_infile=True)
+        :param defer_checks: tells whether foreign key and unique checks should be switched off during the load
+        :return: the number of written entries
+        """
+
+        table_name = table_name if table_name is not None else entity_type.collection_name()
+        create = create if create is not None else True
+        batch_size = batch_size if batch_size is not None else 1000
+        method = method if method is not None else "insert"
+
+        if method not in ["insert", "upsert", "load"] or (method == "load" and not pool.dialect.supports_load_data):
+            raise ValueError(f"unsupported bulk load method: {method}")
+
+        columns = ", ".join(entity_type.field_names())
+        row = "({values})".format(values=", ".join([pool.dialect.placeholder for _ in entity_type.field_names()]))
+        clause = pool.dialect.upsert_clause(entity_type) if method == "upsert" else ""
+        values = row_codec(entity_type).values
+
+        if create:
+            SQLHandler.create_table(entity_type, pool, table_name)
+
+        count = 0
+        with pool.connection() as connection:
+            cursor = connection.cursor()
+            if defer_checks:
+                pool.dialect.set_checks(cursor, False)
 
-        cursor.executemany(get_insert_command(table_name, entities[0].field_names()),
-                           [entity.to_sequence() for entity in entities])
+            try:
+                for batch in batched(entities, batch_size):
+                    if method == "load":
+                        with instrumentation.stage("commit"):
+                            SQLHandler.load_batch(cursor, batch, table_name, columns)
+                            connection.commit()
+                    else:
+                        with instrumentation.stage("serialize"):
+                            parameters = [value for entity in batch for value in values(entity)]
+                        with instrumentation.stage("commit"):
+                            cursor.execute(f"INSERT INTO {table_name} ({columns}) VALUES "
+                                           + ", ".join([row] * len(batch)) + clause, parameters)
+                            connection.commit()
+                    count += len(batch)
+            finally:
+                if defer_checks:
+                    pool.dialect.set_checks(cursor, True)
+                cursor.close()
 
-        connection.commit()
-        cursor.close()
+        instrumentation.count(ROWS_WRITTEN, count)
+        return count
 
     @staticmethod
-    def read_dataset(dataset_type: Type[Dataset], connection: MySQLConnection) -> Dataset:
+    def load_batch(cursor, batch: list[Entity], table_name: str, columns: str) -> None:
         """
-        Reads a dataset from a MySQL database.
+        Loads a batch of entries with LOAD DATA LOCAL INFILE through a temporary CSV file (see load_data_row).
+        :param cursor: the cursor
+        :param batch: the entries
+        :param table_name: the name of the database table
+        :param columns: the comma separated list of columns
+        :return: nothing
+        """
+        values = row_codec(type(batch[0])).values
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", encoding="utf-8", delete=False) as file:
+            file.writelines(SQLHandler.load_data_row(values(entity)) for entity in batch)
+
+        try:
+            cursor.execute(f"LOAD DATA LOCAL INFILE '{file.name}' INTO TABLE {table_name} CHARACTER SET utf8mb4 "
+                           f"FIELDS TERMINATED BY ',' ENCLOSED BY '\"' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                           f"({columns})")
+        finally:
+            os.remove(file.name)
+
+    @staticmethod
+    def load_data_row(values: Sequence) -> str:
+        """
+        Returns a line of a LOAD DATA file: the fields are enclosed in double quotes and separated by commas, the
+        backslash escapes the special characters, NULL is written as an unquoted \\N (an empty field would be loaded
+        as an empty text or 0) and booleans as 1 or 0.
+        :param values: the typed values of a row
+        :return: the line
+        """
+        return ",".join("\\N" if value is None else
+                        f'"{int(value)}"' if type(value) is bool else
+                        '"' + str(value).translate(SQLHandler.LOAD_DATA_ESCAPES) + '"' for value in values) + "\n"
+
+    @staticmethod
+    def read_dataset(dataset_type: Type[Dataset], pool: ConnectionPool, workers: int = 1) -> Dataset:
+        """
+        Reads a dataset from a database.
         :param dataset_type: the type of the dataset
-        :param connection: the database connection
+        :param pool: the connection pool
+        :param workers: the number of tables read at the same time, each on its own connection (at most the size of
+                        the pool)
         :return: the instance
         """
 
-        return dataset_type.from_sequence(
-            [
-                SQLHandler.read_entity(entity_type, connection, table_name=entity_type.collection_name())
-                for entity_type in dataset_type.entity_types()
-            ]
+        dataset = dataset_type.from_sequence(
+            map_parallel(partial(SQLHandler.read_entity, pool=pool), dataset_type.entity_types(),
+                         min(workers, pool.size))
         )
+        dataset.mark_clean()
+        return dataset
 
     @staticmethod
-    def write_dataset(dataset: Dataset, connection: MySQLConnection) -> None:
+    def write_dataset(dataset: Dataset, pool: ConnectionPool, bulk: bool = False, batch_size: int = 1000,
+                      method: str = "insert", workers: int = 1, validate: bool = False, sample: int = None) -> None:
         """
-        Writes a dataset to to a MySQL database.
+        Writes a dataset to to a database. Tables are written level by level (see dependency_levels), so a table is
+        only loaded after the tables it refers to.
         :param dataset: the dataset instance
-        :param connection: the database connection
+        :param pool: the connection pool
+        :param bulk: tells whether the tables should be loaded in committed batches, with foreign key and unique
+                     checks switched off during the load
+        :param batch_size: the number of rows per batch in bulk mode
+        :param method: the bulk load method (see write_entities)
+        :param workers: the number of tables of a level written at the same time, each on its own connection (at
+                        most the size of the pool; ignored if the database does not support concurrent writers)
+        :param validate: tells whether the keys and types of the dataset should be checked before anything is changed
+                         in the database; a ValidationError is raised if they are violated
+        :param sample: the number of rows checked per collection in validation (see validation.validate)
         :return: nothing
         """
 
-        cursor = connection.cursor()
-        for entity_type in reversed(dataset.entity_types()):
-            cursor.execute(f"DROP TABLE IF EXISTS {entity_type.collection_name()}")
+        if validate:
+            report = validate_dataset(dataset, sample=sample)
+            if not report.ok:
+                raise ValidationError(report)
 
-        for entity_type in dataset.entity_types():
-            SQLHandler.write_entity(dataset.entities()[entity_type], connection,
-                                    table_name=entity_type.collection_name())
+        SQLHandler.drop_tables(dataset.entity_types(), pool)
+
+        def write(entity_type: Type[Entity]) -> None:
+            if bulk:
+                SQLHandler.write_entities(entity_type, dataset.entities()[entity_type], pool,
+                                          table_name=entity_type.collection_name(), batch_size=batch_size,
+                                          method=method, defer_checks=True)
+            else:
+                SQLHandler.write_entity(dataset.entities()[entity_type], pool,
+                                        table_name=entity_type.collection_name())
+
+        for level in dependency_levels(dataset.entity_types()):
+            map_parallel(write, level, min(workers, pool.size) if pool.dialect.concurrent_writes else 1)
+        dataset.mark_clean()
+
+    @staticmethod
+    def delete_keys(entity_type: Type[Entity], keys: Iterable, pool: ConnectionPool, table_name: str = None,
+                    batch_size: int = 1000) -> int:
+        """
+        Deletes rows of a database table by primary key, batch by batch. Every batch is sent as a single DELETE
+        statement and committed on its own.
+        :param entity_type: the type of entries
+        :param keys: the primary keys of the rows
+        :param pool: the connection pool
+        :param table_name: the name of the database table
+        :param batch_size: the number of keys per statement and transaction
+        :return: the number of deleted rows
+        """
+
+        table_name = table_name if table_name is not None else entity_type.collection_name()
+        batch_size = batch_size if batch_size is not None else 1000
+
+        count = 0
+        with pool.connection() as connection:
+            cursor = connection.cursor()
+            for batch in batched(keys, batch_size):
+                with instrumentation.stage("commit"):
+                    cursor.execute(f"DELETE FROM {table_name} WHERE {entity_type.primary_key()} IN ("
+                                   + ", ".join([pool.dialect.placeholder] * len(batch)) + ")", batch)
+                    connection.commit()
+                count += cursor.rowcount
+            cursor.close()
+
+        return count
+
+    @staticmethod
+    def write_changes(dataset: Dataset, pool: ConnectionPool, batch_size: int = 1000) -> dict[Type[Entity], int]:
+        """
+        Brings the tables of a dataset up to date (see Dataset.changes): the rows of the removed keys are deleted,
+        referring tables first, then the new and the changed entities are upserted, tables referred to first. The
+        tables must exist (see write_dataset).
+        :param dataset: the dataset instance
+        :param pool: the connection pool
+        :param batch_size: the number of rows per statement and transaction
+        :return: the number of written entries by type
+        """
+        changes = dataset.changes()
+        levels = dependency_levels(dataset.entity_types())
+        for level in reversed(levels):
+            for entity_type in level:
+                removed = changes[entity_type][2]
+                if removed:
+                    SQLHandler.delete_keys(entity_type, removed, pool, batch_size=batch_size)
+
+        counts = dict()
+        for level in levels:
+            for entity_type in level:
+                new, changed, _ = changes[entity_type]
+                counts[entity_type] = SQLHandler.write_entities(entity_type, new + changed, pool, create=False,
+                                                                batch_size=batch_size, method="upsert")
+
+        dataset.mark_clean()
+        return counts
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# the stages reported by the handlers, in the order they happen
+STAGES = ["open", "parse", "construct", "serialize", "commit"]
+
+# the counters of the handlers
+ROWS_READ = "rows read"
+ROWS_WRITTEN = "rows written"
+BYTES_READ = "bytes read"
+BYTES_WRITTEN = "bytes written"
+
+PROFILES = ["cpu", "memory"]
+
+
+@dataclass
+class Measurement:
+    """
+    The timers and counters of an operation (e.g. a shell command). The handlers add the time spent in their stages
+    (see STAGES) and count the rows and bytes they read or write. Stages running in several threads at the same
+    time are summed, so they may add up to more than the elapsed time.
+    """
+    name: str
+    started: float = field(default_factory=time.time)
+    seconds: float = 0.0
+    stages: dict[str, float] = field(default_factory=dict)
+    counters: dict[str, int] = field(default_factory=dict)
+    error: Optional[str] = None
+    profile: Optional[str] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        """
+        Adds time to a stage.
+        :param stage: the name of the stage
+        :param seconds: the elapsed seconds
+        :return: nothing
+        """
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def add(self, counter: str, value: int) -> None:
+        """
+        Increases a counter.
+        :param counter: the name of the counter (e.g. ROWS_READ)
+        :param value: the increment
+        :return: nothing
+        """
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def rate(self, counter: str) -> Optional[float]:
+        """
+        Returns a counter per elapsed second.
+        :param counter: the name of the counter
+        :return: the rate (None if the counter was not used)
+        """
+        if counter not in self.counters or self.seconds <= 0:
+            return None
+        return self.counters[counter] / self.seconds
+
+    def summary(self) -> str:
+        """
+        Returns a one line description of the measurement.
+        :return: the text
+        """
+        parts = [f"{self.name}: {self.seconds:.3f} s"]
+        for counter, value in self.counters.items():
+            # there is no rate while no time was measured (e.g. the operation is still running)
+            rate = self.rate(counter)
+            if counter.startswith("bytes"):
+                text = f"{value / 2 ** 20:,.1f} MiB {counter[len('bytes '):]}"
+                parts.append(text if rate is None else f"{text} ({rate / 2 ** 20:,.1f} MiB/s)")
+            else:
+                text = f"{value} {counter}"
+                parts.append(text if rate is None else f"{text} ({rate:,.0f}/s)")
+        stages = sorted(self.stages.items(), key=lambda item: STAGES.index(item[0]) if item[0] in STAGES else 99)
+        if stages:
+            parts.append(" ".join(f"{stage} {seconds:.3f} s" for stage, seconds in stages))
+        if self.error is not None:
+            parts.append(f"failed: {self.error}")
+        return ", ".join(parts)
+
+
+class Recorder:
+    """
+    Keeps the last finished measurements.
+    """
+
+    def __init__(self, size: int = 100):
+        self._measurements: deque[Measurement] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, measurement: Measurement) -> None:
+        """
+        Stores a finished measurement (the oldest one is dropped when the recorder is full).
+        :param measurement: the measurement
+        :return: nothing
+        """
+        with self._lock:
+            self._measurements.append(measurement)
+
+    def last(self, count: int = 10) -> list[Measurement]:
+        """
+        Returns the last measurements, the oldest first.
+        :param count: the maximal number of measurements
+        :return: the list
+        """
+        with self._lock:
+            return list(self._measurements)[-count:] if count > 0 else []
+
+    def clear(self) -> None:
+        """
+        Drops every measurement.
+        :return: nothing
+        """
+        with self._lock:
+            self._measurements.clear()
+
+
+recorder = Recorder()
+
+_current: ContextVar[Optional[Measurement]] = ContextVar("measurement", default=None)
+
+
+def current() -> Optional[Measurement]:
+    """
+    Returns the measurement of the running operation. The measurement is inherited by asyncio tasks and by the
+    threads of the handlers (see handler.map_parallel), but not by worker processes.
+    :return: the measurement (None outside of measure)
+    """
+    return _current.get()
+
+
+@contextmanager
+def measure(name: str, profile: str = None, top: int = 20) -> Iterator[Measurement]:
+    """
+    Measures an operation: the handlers called inside add their stages and counters to the measurement, which is
+    stored in the recorder at the end (even if the operation fails).
+    :param name: the name of the operation
+    :param profile: "cpu" captures a cProfile profile, "memory" the peak traced memory and the lines holding the
+                    most memory at the end (both slow the operation down); the report is stored in the profile
+                    attribute
+    :param top: the number of functions or allocation sites in the profile report
+    :return: the measurement
+    """
+    if profile is not None and profile not in PROFILES:
+        raise ValueError(f"unknown profile: {profile}")
+
+    measurement = Measurement(name)
+    token = _current.set(measurement)
+    profiler = cProfile.Profile() if profile == "cpu" else None
+    tracing = profile == "memory" and not tracemalloc.is_tracing()
+    if profiler is not None:
+        profiler.enable()
+    if tracing:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    try:
+        yield measurement
+    except BaseException as error:
+        measurement.error = f"{type(error).__name__}: {error}"
+        raise
+    finally:
+        measurement.seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+            measurement.profile = text.getvalue()
+        if tracing:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            lines = [f"peak traced memory: {peak / 2 ** 20:,.1f} MiB"]
+            lines.extend(str(statistic) for statistic in snapshot.statistics("lineno")[:top])
+            measurement.profile = "\n".join(lines)
+        _current.reset(token)
+        recorder.record(measurement)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Adds the time spent in a block to a stage of the current measurement (does nothing outside of measure).
+    :param name: the name of the stage
+    :return: nothing
+    """
+    measurement = _current.get()
+    if measurement is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        measurement.add_time(name, time.perf_counter() - start)
+
+
+def count(counter: str, value: int) -> None:
+    """
+    Increases a counter of the current measurement (does nothing outside of measure).
+    :param counter: the name of the counter
+    :param value: the increment
+    :return: nothing
+    """
+    measurement = _current.get()
+    if measurement is not None:
+        measurement.add(counter, value)
+
+
+def timed_map(function: Callable[[T], R], items: Iterable[T], source: str = "parse",
+              target: str = "construct", counter: str = ROWS_READ) -> Iterator[R]:
+    """
+    Maps lazily like map, but splits the time between pulling the items (e.g. parsing rows) and applying the
+    function (e.g. building entities) into two stages of the current measurement, and counts the results.
+    Outside of measure it is the plain map, so the handlers pay nothing when nobody is measuring.
+    :param function: the function
+    :param items: the items
+    :param source: the stage of pulling an item
+    :param target: the stage of applying the function
+    :param counter: the counter of the results
+    :return: the iterator of results
+    """
+    measurement = _current.get()
+    if measurement is None:
+        return map(function, items)
+
+    def results() -> Iterator[R]:
+        iterator = iter(items)
+        clock = time.perf_counter
+        pulling = applying = 0.0
+        rows = 0
+        try:
+            while True:
+                start = clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                middle = clock()
+                result = function(item)
+                pulling += middle - start
+                applying += clock() - middle
+                rows += 1
+                yield result
+        finally:
+            measurement.add_time(source, pulling)
+            measurement.add_time(target, applying)
+            measurement.add(counter, rows)
+
+    return results()
+
+
+def count_bytes(file_path: str, counter: str = BYTES_READ, before: int = 0) -> None:
+    """
+    Counts the size of a file (read or written) in the current measurement (does nothing outside of measure).
+    :param file_path: the path of the file
+    :param counter: the counter (BYTES_READ or BYTES_WRITTEN)
+    :param before: the size of the file before it was appended to
+    :return: nothing
+    """
+    if _current.get() is not None:
+        count(counter, os.path.getsize(file_path) - before)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+from abc import ABC, abstractmethod
+from dataclasses import fields, is_dataclass
+from json.encoder import encode_basestring_ascii
+from operator import attrgetter
+from typing import Any, Callable, Type, Union
+
+from data.project.base import Entity
+
+
+class JSONBackend(ABC):
+    """
+    Encodes and decodes JSON with a particular library.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """
+        Decodes a JSON document.
+        :param data: the document
+        :return: the decoded value
+        """
+        pass
+
+    @abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        """
+        Encodes a value as a compact, UTF-8 encoded JSON document.
+        :param value: the value
+        :return: the document
+        """
+        pass
+
+    def entity_encoder(self, entity_type: Type[Entity]) -> Callable[[Entity], bytes]:
+        """
+        Returns a function which encodes an entity as a JSON object without building a dictionary: the attribute
+        values are formatted into a template precomputed from the field names and types.
+        :param entity_type: the type of the entities
+        :return: the function
+        """
+        names = entity_type.field_names()
+        getter = attrgetter(*names)
+
+        def encode_bool(value: Any) -> str:
+            return "true" if value else "false"
+
+        def nullable(convert: Callable[[Any], str]) -> Callable[[Any], str]:
+            return lambda value: "null" if value is None else convert(value)
+
+        converters = []
+        for f in entity_type.schema():
+            if f.type is bool:
+                convert = encode_bool
+            elif f.type is int:
+                convert = str
+            else:
+                convert = encode_basestring_ascii
+            converters.append(nullable(convert) if f.nullable else convert)
+
+        template = "{" + ",".join(f"{encode_basestring_ascii(name)}:%s" for name in names) + "}"
+
+        def encode(entity: Entity) -> bytes:
+            return (template % tuple([convert(value) for convert, value in zip(converters, getter(entity))])).encode()
+
+        return encode
+
+
+class StandardBackend(JSONBackend):
+    """
+    The json module of the standard library.
+    """
+
+    name = "json"
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(",", ":")).encode()
+
+
+class UJSONBackend(JSONBackend):
+    """
+    The ujson library.
+    """
+
+    name = "ujson"
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._ujson.loads(data)
+
+    def dumps(self, value: Any) -> bytes:
+        return self._ujson.dumps(value, ensure_ascii=False).encode()
+
+
+class ORJSONBackend(JSONBackend):
+    """
+    The orjson library, which serializes dataclass entities natively.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._orjson.loads(data)
+
+    def dumps(self, value: Any) -> bytes:
+        return self._orjson.dumps(value)
+
+    def entity_encoder(self, entity_type: Type[Entity]) -> Callable[[Entity], bytes]:
+        if is_dataclass(entity_type) and [f.name for f in fields(entity_type)] == entity_type.field_names():
+            return self._orjson.dumps
+        return super().entity_encoder(entity_type)
+
+
+def available_backends() -> dict[str, JSONBackend]:
+    """
+    Returns the backends whose library is installed, fastest first.
+    :return: the dictionary of the backends by name
+    """
+    backends = dict()
+    for backend_type in [ORJSONBackend, UJSONBackend, StandardBackend]:
+        try:
+            backend = backend_type()
+        except ImportError:
+            continue
+        backends[backend.name] = backend
+
+    return backends
+
+
+def get_backend(name: str = None) -> JSONBackend:
+    """
+    Returns a backend.
+    :param name: the name of the backend (orjson, ujson or json); the fastest installed one if omitted
+    :return: the backend
+    """
+    backends = available_backends()
+    if name is None:
+        return next(iter(backends.values()))
+    if name not in backends:
+        raise ValueError(f"JSON backend is not available: {name}")
+    return backends[name]
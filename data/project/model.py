@@ -1,11 +1,17 @@
 from __future__ import annotations
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import field, dataclass
-import random
-from typing import Type, cast
+from typing import Any, Callable, Iterator, Optional, Type, Union, cast
+import numpy as np
 from faker import Faker
-from data.project.base import Dataset, Entity
+from data.project.base import Dataset, Entity, TrackedList
+from data.project.schema import Field
+from data.project.columnar import ColumnarDataset, ColumnarTable
+from data.project.pool import FakerPool
 from enum import Enum
-from uuid import uuid4
+from operator import attrgetter
+from uuid import UUID
 
 
 @dataclass
@@ -14,11 +20,40 @@ class DeliveryDataset(Dataset):
     couriers: list[Courier]
     restaurants: list[Restaurant]
     orders: list[Order]
+    # lazily built lookup structures, see index and references
+    _indexes: dict[tuple, tuple[int, int, dict]] = field(default_factory=dict, init=False, repr=False,
+                                                         compare=False)
+    # the untracked collections (e.g. snapshot tables) which are stored, see mark_clean
+    _clean: set[str] = field(default_factory=set, init=False, repr=False, compare=False)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name.startswith("_"):
+            super().__setattr__(name, value)
+            return
+
+        # lists are wrapped into tracked lists, which record their own changes (see changes and _cached)
+        previous = self.__dict__.get(name)
+        if isinstance(value, list) and not isinstance(value, TrackedList):
+            value = TrackedList(self.entity_types()[self.collection_names().index(name)], value)
+        if isinstance(previous, TrackedList) and isinstance(value, TrackedList) and value is not previous:
+            value.replaces(previous.stored_keys())
+        super().__setattr__(name, value)
+        if "_indexes" in self.__dict__:
+            self._indexes.clear()
+            self._clean.discard(name)
 
     @staticmethod
     def entity_types() -> list[Type[Entity]]:
         return [Person, Courier, Restaurant, Order]
 
+    @staticmethod
+    def collection_names() -> list[str]:
+        """
+        Returns the names of the collection attributes, in the order of entity_types.
+        :return: the list of names
+        """
+        return ["people", "couriers", "restaurants", "orders"]
+
     @staticmethod
     def from_sequence(entities: list[list[Entity]]) -> Dataset:
         return DeliveryDataset(
@@ -37,137 +72,644 @@ class DeliveryDataset(Dataset):
 
         return res
 
+    def add(self, entity: Entity) -> None:
+        """
+        Appends an entity to its collection. Appended entities are reported as new by changes().
+        :param entity: the entity
+        :return: nothing
+        """
+        self.entities()[type(entity)].append(entity)
+
+    def remove(self, entity: Entity) -> None:
+        """
+        Removes an entity from its collection. Its key is reported as removed by changes() (unless it was new).
+        :param entity: the entity
+        :return: nothing
+        """
+        self.entities()[type(entity)].remove(entity)
+
+    def mark_changed(self, *entities: Entity) -> None:
+        """
+        Records that entities of the dataset have been modified in place, so changes() reports them and the indexes
+        are rebuilt.
+        :param entities: the entities
+        :return: nothing
+        """
+        for entity in entities:
+            collection = self.entities()[type(entity)]
+            if isinstance(collection, TrackedList):
+                collection.touch(entity)
+        self.invalidate_indexes()
+
+    def changes(self) -> dict[Type[Entity], tuple[list[Entity], list[Entity], list]]:
+        """
+        Returns the entities appended (new) and changed, and the keys removed since the last mark_clean. The changes
+        are recorded by the collections (see TrackedList), whichever way they are edited; a collection which has been
+        replaced is compared with the stored keys of the previous one.
+        :return: the dictionary of the new entities, the changed entities and the removed keys by type
+        """
+        result = dict()
+        for name, entity_type in zip(self.collection_names(), self.entity_types()):
+            collection = getattr(self, name)
+            if isinstance(collection, TrackedList):
+                result[entity_type] = collection.changes()
+            else:
+                result[entity_type] = ([], [], []) if name in self._clean else (list(collection), [], [])
+
+        return result
+
+    def mark_clean(self) -> None:
+        for name in self.collection_names():
+            collection = getattr(self, name)
+            if isinstance(collection, TrackedList):
+                collection.mark_clean()
+            else:
+                self._clean.add(name)
+
+    def invalidate_indexes(self) -> None:
+        """
+        Drops the indexes. Editing or replacing a collection is detected automatically, but modifying an entity in
+        place must be followed by a call to this method (or to mark_changed).
+        :return: nothing
+        """
+        self._indexes.clear()
+
+    def _cached(self, key: tuple, entity_type: Type[Entity], build: Callable[[list[Entity]], dict]) -> dict:
+        collection = self.entities()[entity_type]
+        # tracked lists count their edits (see TrackedList); the other collections (e.g. snapshot tables) are read-only
+        signature = (id(collection), getattr(collection, "version", len(collection)))
+        cached = self._indexes.get(key)
+        if cached is None or cached[:2] != signature:
+            cached = signature + (build(collection),)
+            self._indexes[key] = cached
+        return cached[2]
+
+    def index(self, entity_type: Type[Entity]) -> dict[str, Entity]:
+        """
+        Returns the hash index of a collection by primary key. It is built on first use and kept until the dataset
+        changes.
+        :param entity_type: the type of the entities
+        :return: the dictionary of the entities by primary key
+        """
+        getter = attrgetter(entity_type.primary_key())
+        return self._cached(("index", entity_type), entity_type,
+                            lambda collection: {getter(entity): entity for entity in collection})
+
+    def references(self, entity_type: Type[Entity], field_name: str) -> dict[str, list[int]]:
+        """
+        Returns the hash index of a foreign key: the positions of the entities which refer to each key. It is built
+        on first use and kept until the dataset changes.
+        :param entity_type: the type of the referring entities
+        :param field_name: the name of the foreign key field
+        :return: the dictionary of the lists of positions by referred key
+        """
+        assert field_name in entity_type.foreign_keys(), f"{field_name} is not a foreign key of {entity_type.__name__}"
+        getter = attrgetter(field_name)
+
+        def build(collection: list[Entity]) -> dict[str, list[int]]:
+            positions: dict[str, list[int]] = dict()
+            for position, entity in enumerate(collection):
+                positions.setdefault(getter(entity), []).append(position)
+            return positions
+
+        return self._cached(("references", entity_type, field_name), entity_type, build)
+
+    def table(self, entity_type: Type[Entity], fields: list[str] = None) -> ColumnarTable:
+        """
+        Returns the columnar form of a collection (see query.table_of). It is built on first use and kept until the
+        collection changes, like the indexes.
+        :param entity_type: the type of the entities
+        :param fields: if given, only these fields are encoded
+        :return: the table
+        """
+        return self._cached(("table", entity_type, tuple(fields) if fields is not None else None), entity_type,
+                            lambda collection: ColumnarTable.from_entities(entity_type, collection, fields))
+
+    def get(self, entity_type: Type[Entity], key: str) -> Optional[Entity]:
+        """
+        Looks up an entity by primary key.
+        :param entity_type: the type of the entity
+        :param key: the primary key
+        :return: the entity (None if there is no such entity)
+        """
+        return self.index(entity_type).get(key)
+
+    def referring(self, entity_type: Type[Entity], field_name: str, key: str) -> list[Entity]:
+        """
+        Returns the entities which refer to a key, e.g. referring(Order, "courier_id", courier.courier_id).
+        :param entity_type: the type of the referring entities
+        :param field_name: the name of the foreign key field
+        :param key: the referred key
+        :return: the list of entities in collection order
+        """
+        collection = self.entities()[entity_type]
+        return [collection[position] for position in self.references(entity_type, field_name).get(key, [])]
+
+    def join(self, entity_type: Type[Entity], field_name: str) -> list[tuple[Entity, Optional[Entity]]]:
+        """
+        Pairs every entity with the entity referred by one of its foreign keys, in one pass over the collection.
+        :param entity_type: the type of the referring entities
+        :param field_name: the name of the foreign key field
+        :return: the list of pairs (the second item is None for a dangling reference)
+        """
+        index = self.index(entity_type.foreign_keys()[field_name])
+        getter = attrgetter(field_name)
+        return [(entity, index.get(getter(entity))) for entity in self.entities()[entity_type]]
+
+    def orders_with_restaurant(self) -> list[tuple[Order, Optional[Restaurant]]]:
+        """
+        Pairs every order with its restaurant.
+        :return: the list of pairs
+        """
+        return cast(list[tuple[Order, Optional[Restaurant]]], self.join(Order, "restaurant_id"))
+
+    def couriers_with_order_counts(self) -> list[tuple[Courier, int]]:
+        """
+        Pairs every courier with the number of their orders.
+        :return: the list of pairs in the order of the couriers
+        """
+        positions = self.references(Order, "courier_id")
+        return [(courier, len(positions.get(courier.courier_id, []))) for courier in self.couriers]
+
     @staticmethod
     def generate(
             count_of_people: int,
             count_of_couriers: int,
             count_of_restaurants: int,
-            count_of_orders: int) -> DeliveryDataset:
-
-        def generate_people(n: int, male_ratio: float = 0.5, locale: str = "en_US",
-                            unique: bool = False, min_age: int = 0, max_age: int = 100) -> list[Person]:
-            assert n > 0
-            assert 0 <= male_ratio <= 1
-            assert 0 <= min_age <= max_age
-
-            fake = Faker(locale)
-            people = []
-            for i in range(n):
-                male = random.random() < male_ratio
-                generator = fake if not unique else fake.unique
-                people.append(
-                    Person(
-                        id="P-" + (str(i).zfill(6)),
-                        name=generator.name_male() if male else generator.name_female(),
-                        age=random.randint(min_age, max_age),
-                        male=male,
-                        address=generator.address()
-                    )
-                )
-
-            return people
-
-        def generate_couriers(number_of_couriers: int, male_ratio: float = 0.5, locale: str = "hu_HU",
-                             unique: bool = False) -> list[Courier]:
-            assert number_of_couriers > 0
-            assert 0 < male_ratio < 1
-
-            fake = Faker(locale)
-            generator = fake.unique if unique else fake
-
-            delivery_methods: list[DeliveryMethod] = [DeliveryMethod.Bicycle, DeliveryMethod.Car,
-                                                      DeliveryMethod.Motorcycle]
-
-            couriers = []
-
-            for i in range(number_of_couriers):
-                male = random.random() < male_ratio
-                couriers.append(
-                    Courier(
-                        courier_id=str(uuid4()),
-                        name=generator.name_male() if male else generator.name_female(),
-                        age=random.randint(18, 40),
-                        male=male,
-                        delivery_method=str(random.choice(delivery_methods).name)
-                    )
-                )
-
-            return couriers
-
-        def generate_restaurants(number_of_restaurants: int,locale: str = "hu_HU",
-                                 unique: bool = False,) -> list[Restaurant]:
-            assert number_of_restaurants > 0
-
-            fake = Faker(locale)
-            generator = fake.unique if unique else fake
-
-            profiles: list[FoodType] = [FoodType.Soup, FoodType.Pizza, FoodType.HotDog,
-                                        FoodType.Hamburger, FoodType.Sausage]
-
-            restaurants = []
-
-            for i in range(number_of_restaurants):
-                restaurants.append(
-                    Restaurant(
-                        restaurant_id=str(uuid4()),
-                        name=f'{generator.company()} restaurant',
-                        address=generator.address(),
-                        phone_number=generator.phone_number(),
-                        profile=str(random.choice(profiles).name)
-                    )
-                )
-
-            return restaurants
-
-        def generate_orders(number_of_orders: int, people: list[Person], couriers: list[Courier],
-                            restaurants: list[Restaurant]) -> list[Order]:
-            assert number_of_orders > 0
-            assert len(people) > 0
-            assert len(couriers) > 0
-            assert len(restaurants) > 0
-
-            orders = []
-
-            for i in range(number_of_orders):
-                person = random.choice(people)
-                courier = random.choice(couriers)
-                restaurant = random.choice(restaurants)
-
-                amount_ordered = random.randint(1, 5)
-
-                prices: dict[str, int] = {
-                    FoodType.Soup.name: 7,
-                    FoodType.Pizza.name: 10,
-                    FoodType.HotDog.name: 5,
-                    FoodType.Hamburger.name: 8,
-                    FoodType.Sausage.name: 3
-                }
-
-                orders.append(
-                    Order(
-                        order_id=f"ORDER-{str(i).zfill(10)}",
-                        amount=amount_ordered,
-                        food_type=restaurant.profile,
-                        restaurant_id=restaurant.restaurant_id,
-                        restaurant_name=restaurant.name,
-                        delivery_fee=(prices.get(restaurant.profile) * amount_ordered),
-                        destination=person.address,
-                        client_name=person.name,
-                        client_id=person.id,
-                        courier_id=courier.courier_id
-                    )
-                )
-
-            return orders
-
-        people = generate_people(count_of_people)
-        couriers = generate_couriers(count_of_couriers)
-        restaurants = generate_restaurants(count_of_restaurants, unique=True)
-        orders = generate_orders(count_of_orders, people, couriers, restaurants)
-        return DeliveryDataset(people, couriers, restaurants, orders)
+            count_of_orders: int,
+            seed: Union[int, np.random.Generator] = None,
+            workers: int = 1,
+            pooled: bool = False) -> DeliveryDataset:
+        """
+        Generates a dataset. The id range of every entity type is split into chunks of GENERATION_CHUNK_SIZE rows,
+        and every chunk is generated with its own random generator derived from the seed and the chunk position.
+        Hence, the output depends only on the counts and the seed, whatever the number of workers is. The Faker
+        values of restaurants are unique in the whole collection (see make_unique).
+        :param count_of_people: the number of people
+        :param count_of_couriers: the number of couriers
+        :param count_of_restaurants: the number of restaurants
+        :param count_of_orders: the number of orders
+        :param seed: the seed of the random generators, or a generator which draws the seed (a random one is chosen
+                     if omitted); every random choice, including the UUIDs, depends only on it, so the same seed
+                     gives byte-identical files
+        :param workers: the number of processes which generate the chunks in parallel
+        :param pooled: tells whether names, addresses etc. should be sampled from cached FakerPool vocabularies
+                       instead of calling Faker for every row
+        :return: the instance
+        """
 
+        collections: dict[Type[Entity], list[Entity]] = dict()
 
-@dataclass
+        def collect(entity_type: Type[Entity], entities: Iterator[Entity]) -> None:
+            collections[entity_type] = list(entities)
+
+        DeliveryDataset.generate_stream(collect, count_of_people, count_of_couriers, count_of_restaurants,
+                                        count_of_orders, seed=seed, workers=workers, pooled=pooled)
+        return cast(DeliveryDataset, DeliveryDataset.from_sequence(
+            [collections[entity_type] for entity_type in DeliveryDataset.entity_types()]))
+
+    @staticmethod
+    def generate_stream(
+            consumer: Callable[[Type[Entity], Iterator[Entity]], Any],
+            count_of_people: int,
+            count_of_couriers: int,
+            count_of_restaurants: int,
+            count_of_orders: int,
+            seed: Union[int, np.random.Generator] = None,
+            workers: int = 1,
+            pooled: bool = False) -> None:
+        """
+        Generates a dataset like generate, but hands the entities of every type to a consumer (e.g. a handler's
+        write_entities) as a lazy iterator in the order of entity_types, instead of building the dataset. Only
+        people, couriers and restaurants are kept in memory, because orders refer to them.
+        :param consumer: the function which receives the type and the entities of every collection
+        :param count_of_people: the number of people
+        :param count_of_couriers: the number of couriers
+        :param count_of_restaurants: the number of restaurants
+        :param count_of_orders: the number of orders
+        :param seed: the seed of the random generators, or a generator which draws the seed
+        :param workers: the number of processes which generate the chunks in parallel
+        :param pooled: tells whether Faker values should be sampled from cached FakerPool vocabularies
+        :return: nothing
+        """
+        assert count_of_people > 0
+        assert count_of_couriers > 0
+        assert count_of_restaurants > 0
+        assert count_of_orders > 0
+        assert workers > 0
+
+        seed = dataset_seed(seed)
+
+        if pooled:
+            # build (or load) the vocabularies once, so the workers only read the cache
+            for locale, kinds in POOLED_KINDS.items():
+                for kind in kinds:
+                    get_pool(locale).values(kind)
+
+        def run(kind: int, count: int, references: tuple = ()) -> Iterator[Entity]:
+            tasks = [(kind, start, min(GENERATION_CHUNK_SIZE, count - start), count, seed, pooled)
+                     for start in range(0, count, GENERATION_CHUNK_SIZE)]
+            if workers == 1 or len(tasks) == 1:
+                set_generation_references(*references)
+                for task in tasks:
+                    yield from generate_chunk(*task)
+                return
+
+            # at most two chunks per worker are submitted ahead of the consumer, so a slow consumer does not make the
+            # finished chunks pile up in memory
+            with ProcessPoolExecutor(max_workers=workers, initializer=set_generation_references,
+                                     initargs=references) as executor:
+                pending = deque()
+                try:
+                    for task in tasks:
+                        pending.append(executor.submit(generate_chunk, *task))
+                        if len(pending) >= 2 * workers:
+                            yield from pending.popleft().result()
+                    while pending:
+                        yield from pending.popleft().result()
+                finally:
+                    for future in pending:
+                        future.cancel()
+
+        referenced = []
+        for kind, count in enumerate([count_of_people, count_of_couriers, count_of_restaurants]):
+            entities = list(run(kind, count))
+            if kind == 2:
+                make_unique(entities, ["name", "address", "phone_number"])
+            consumer(DeliveryDataset.entity_types()[kind], iter(entities))
+            referenced.append(entities)
+
+        consumer(Order, run(3, count_of_orders, tuple(referenced)))
+
+
+GENERATION_CHUNK_SIZE = 10000
+
+POOLED_KINDS: dict[str, list[str]] = {
+    "en_US": ["name_male", "name_female", "address"],
+    "hu_HU": ["name_male", "name_female", "company", "address", "phone_number"]
+}
+
+_fakers: dict[str, Faker] = dict()
+_pools: dict[str, FakerPool] = dict()
+_references: tuple = ()
+
+
+def dataset_seed(seed: Union[int, np.random.Generator] = None) -> int:
+    """
+    Returns the integer seed of a dataset.
+    :param seed: an integer seed, a generator which draws the seed, or None for a random seed
+    :return: the seed
+    """
+    if seed is None:
+        return np.random.SeedSequence().entropy
+    if isinstance(seed, np.random.Generator):
+        return int(seed.integers(2 ** 63))
+    return int(seed)
+
+
+def get_faker(locale: str, rng: np.random.Generator) -> Faker:
+    """
+    Returns the Faker instance of the current process for a locale, reseeded from a random generator.
+    :param locale: the locale
+    :param rng: the random generator
+    :return: the instance
+    """
+    if locale not in _fakers:
+        _fakers[locale] = Faker(locale)
+
+    fake = _fakers[locale]
+    fake.seed_instance(int(rng.integers(2 ** 32)))
+    fake.unique.clear()
+    return fake
+
+
+def make_unique(entities: list[Entity], field_names: list[str]) -> None:
+    """
+    Makes the values of fields unique in a collection. Faker's unique values are only unique within the chunk they
+    are generated for, so a value repeated in a later chunk gets a numbered suffix (e.g. "Kovács Kft. restaurant (2)"),
+    in the order of the entities, which keeps the result independent of the number of workers.
+    :param entities: the entities
+    :param field_names: the names of the fields
+    :return: nothing
+    """
+    for name in field_names:
+        values = {getattr(entity, name) for entity in entities}
+        if len(values) == len(entities):
+            continue
+
+        used = set()
+        for entity in entities:
+            value = getattr(entity, name)
+            if value in used:
+                number = 2
+                while f"{value} ({number})" in values or f"{value} ({number})" in used:
+                    number += 1
+                value = f"{value} ({number})"
+                setattr(entity, name, value)
+            used.add(value)
+
+
+def get_pool(locale: str) -> FakerPool:
+    """
+    Returns the FakerPool of the current process for a locale. The pool is independent of the seed of the dataset:
+    its vocabulary is always built with the default Faker seed (so one cache file serves every dataset), and the seed
+    of the dataset only chooses the values sampled from it.
+    :param locale: the locale
+    :return: the pool
+    """
+    if locale not in _pools:
+        _pools[locale] = FakerPool(locale)
+    return _pools[locale]
+
+
+class FakeValues:
+    """
+    Produces the Faker values of a chunk, either by calling Faker or by sampling the FakerPool of the locale.
+    """
+
+    def __init__(self, locale: str, rng: np.random.Generator, unique: bool = False, pooled: bool = False,
+                 seed: int = 0, start: int = 0, total: int = None):
+        """
+        Creates a source of values.
+        :param locale: the locale
+        :param rng: the random generator of the chunk
+        :param unique: tells whether every value of a kind must be different
+        :param pooled: tells whether the values should be sampled from a pool
+        :param seed: the seed of the dataset (orders unique pooled values across chunks)
+        :param start: the position of the first entity of the chunk
+        :param total: the number of entities in the whole collection
+        """
+        self.rng = rng
+        self.unique = unique
+        self.seed = seed
+        self.start = start
+        self.total = total
+        self.pool = get_pool(locale) if pooled else None
+        self.fake = get_faker(locale, rng) if not pooled else None
+
+    def get(self, kind: str, n: int, offset: int = 0) -> list[str]:
+        """
+        Returns values of a kind.
+        :param kind: the name of the Faker method
+        :param n: the number of values
+        :param offset: the position of the first value within the chunk (for unique pooled values)
+        :return: the list of values
+        """
+        if self.pool is None:
+            method = getattr(self.fake.unique if self.unique else self.fake, kind)
+            return [method() for _ in range(n)]
+        if self.unique:
+            total = self.total if self.total is not None else self.start + offset + n
+            return self.pool.sample_unique(kind, self.seed, self.start + offset, n, total)
+        return self.pool.sample(kind, self.rng, n)
+
+    def names(self, males: list[bool]) -> list[str]:
+        """
+        Returns male or female names.
+        :param males: tells for every name whether it should be male
+        :return: the list of names
+        """
+        count = sum(males)
+        male_names = iter(self.get("name_male", count))
+        female_names = iter(self.get("name_female", len(males) - count, offset=count))
+        return [next(male_names) if male else next(female_names) for male in males]
+
+
+def random_uuid(rng: np.random.Generator) -> str:
+    """
+    Returns a version 4 UUID built from a random generator.
+    :param rng: the random generator
+    :return: the UUID
+    """
+    return str(UUID(bytes=rng.bytes(16), version=4))
+
+
+def set_generation_references(*references: list[Entity]) -> None:
+    """
+    Stores the people, couriers and restaurants which generated orders refer to (a process pool initializer).
+    :param references: the lists of people, couriers and restaurants
+    :return: nothing
+    """
+    global _references
+    _references = references
+
+
+def generate_chunk(kind: int, start: int, n: int, total: int, seed: int, pooled: bool = False) -> list[Entity]:
+    """
+    Generates a chunk of entities with a random generator derived from the seed, the type and the first position,
+    so the result does not depend on which process generates it.
+    :param kind: the position of the entity type in DeliveryDataset.entity_types()
+    :param start: the position of the first entity
+    :param n: the number of entities
+    :param total: the number of entities in the whole collection
+    :param seed: the seed of the dataset
+    :param pooled: tells whether Faker values should be sampled from a FakerPool
+    :return: the list of entities
+    """
+    rng = np.random.default_rng([seed, kind, start])
+    options = dict(pooled=pooled, seed=seed, total=total)
+    if kind == 0:
+        return generate_people(start, n, rng, **options)
+    if kind == 1:
+        return generate_couriers(start, n, rng, **options)
+    if kind == 2:
+        return generate_restaurants(start, n, rng, unique=True, **options)
+    return generate_orders(start, n, rng, *_references)
+
+
+def generate_people(start: int, n: int, rng: np.random.Generator, male_ratio: float = 0.5, locale: str = "en_US",
+                    unique: bool = False, min_age: int = 0, max_age: int = 100, pooled: bool = False, seed: int = 0,
+                    total: int = None) -> list[Person]:
+    assert n > 0
+    assert 0 <= male_ratio <= 1
+    assert 0 <= min_age <= max_age
+
+    fake = FakeValues(locale, rng, unique=unique, pooled=pooled, seed=seed, start=start, total=total)
+    males = (rng.random(n) < male_ratio).tolist()
+    ages = rng.integers(min_age, max_age, endpoint=True, size=n).tolist()
+    names = fake.names(males)
+    addresses = fake.get("address", n)
+
+    people = []
+    for i in range(n):
+        people.append(
+            Person(
+                id="P-" + (str(start + i).zfill(6)),
+                name=names[i],
+                age=ages[i],
+                male=males[i],
+                address=addresses[i]
+            )
+        )
+
+    return people
+
+
+def generate_couriers(start: int, n: int, rng: np.random.Generator, male_ratio: float = 0.5, locale: str = "hu_HU",
+                      unique: bool = False, pooled: bool = False, seed: int = 0,
+                      total: int = None) -> list[Courier]:
+    assert n > 0
+    assert 0 < male_ratio < 1
+
+    fake = FakeValues(locale, rng, unique=unique, pooled=pooled, seed=seed, start=start, total=total)
+
+    delivery_methods: list[DeliveryMethod] = [DeliveryMethod.Bicycle, DeliveryMethod.Car,
+                                              DeliveryMethod.Motorcycle]
+    males = (rng.random(n) < male_ratio).tolist()
+    ages = rng.integers(18, 40, endpoint=True, size=n).tolist()
+    methods = rng.integers(len(delivery_methods), size=n).tolist()
+    names = fake.names(males)
+
+    couriers = []
+
+    for i in range(n):
+        couriers.append(
+            Courier(
+                courier_id=random_uuid(rng),
+                name=names[i],
+                age=ages[i],
+                male=males[i],
+                delivery_method=str(delivery_methods[methods[i]].name)
+            )
+        )
+
+    return couriers
+
+
+def generate_restaurants(start: int, n: int, rng: np.random.Generator, locale: str = "hu_HU",
+                         unique: bool = False, pooled: bool = False, seed: int = 0,
+                         total: int = None) -> list[Restaurant]:
+    assert n > 0
+
+    fake = FakeValues(locale, rng, unique=unique, pooled=pooled, seed=seed, start=start, total=total)
+
+    profiles: list[FoodType] = [FoodType.Soup, FoodType.Pizza, FoodType.HotDog,
+                                FoodType.Hamburger, FoodType.Sausage]
+    choices = rng.integers(len(profiles), size=n).tolist()
+    companies = fake.get("company", n)
+    addresses = fake.get("address", n)
+    phone_numbers = fake.get("phone_number", n)
+
+    restaurants = []
+
+    for i in range(n):
+        restaurants.append(
+            Restaurant(
+                restaurant_id=random_uuid(rng),
+                name=f'{companies[i]} restaurant',
+                address=addresses[i],
+                phone_number=phone_numbers[i],
+                profile=str(profiles[choices[i]].name)
+            )
+        )
+
+    return restaurants
+
+
+def generate_orders(start: int, n: int, rng: np.random.Generator, people: list[Person], couriers: list[Courier],
+                    restaurants: list[Restaurant]) -> list[Order]:
+    assert n > 0
+    assert len(people) > 0
+    assert len(couriers) > 0
+    assert len(restaurants) > 0
+
+    prices: dict[str, int] = {
+        FoodType.Soup.name: 7,
+        FoodType.Pizza.name: 10,
+        FoodType.HotDog.name: 5,
+        FoodType.Hamburger.name: 8,
+        FoodType.Sausage.name: 3
+    }
+
+    person_choices = rng.integers(len(people), size=n).tolist()
+    courier_choices = rng.integers(len(couriers), size=n).tolist()
+    restaurant_choices = rng.integers(len(restaurants), size=n).tolist()
+    amounts = rng.integers(1, 5, endpoint=True, size=n).tolist()
+
+    orders = []
+
+    for i in range(n):
+        person = people[person_choices[i]]
+        courier = couriers[courier_choices[i]]
+        restaurant = restaurants[restaurant_choices[i]]
+
+        amount_ordered = amounts[i]
+
+        orders.append(
+            Order(
+                order_id=f"ORDER-{str(start + i).zfill(10)}",
+                amount=amount_ordered,
+                food_type=restaurant.profile,
+                restaurant_id=restaurant.restaurant_id,
+                restaurant_name=restaurant.name,
+                delivery_fee=(prices.get(restaurant.profile) * amount_ordered),
+                destination=person.address,
+                client_name=person.name,
+                client_id=person.id,
+                courier_id=courier.courier_id
+            )
+        )
+
+    return orders
+
+
+class ColumnarDeliveryDataset(ColumnarDataset):
+    """
+    The columnar counterpart of DeliveryDataset: every collection is a ColumnarTable.
+    """
+
+    @staticmethod
+    def entity_types() -> list[Type[Entity]]:
+        return DeliveryDataset.entity_types()
+
+    @staticmethod
+    def from_sequence(entities: list[list[Entity]]) -> ColumnarDeliveryDataset:
+        return ColumnarDeliveryDataset(
+            {
+                entity_type: ColumnarTable.from_entities(entity_type, collection)
+                for entity_type, collection in zip(ColumnarDeliveryDataset.entity_types(), entities)
+            }
+        )
+
+    @staticmethod
+    def generate(
+            count_of_people: int,
+            count_of_couriers: int,
+            count_of_restaurants: int,
+            count_of_orders: int,
+            seed: Union[int, np.random.Generator] = None,
+            workers: int = 1,
+            pooled: bool = False) -> ColumnarDeliveryDataset:
+        return cast(ColumnarDeliveryDataset, ColumnarDeliveryDataset.from_dataset(
+            DeliveryDataset.generate(count_of_people, count_of_couriers, count_of_restaurants, count_of_orders,
+                                     seed=seed, workers=workers, pooled=pooled)))
+
+    def to_dataset(self) -> DeliveryDataset:
+        """
+        Materializes the entities into a list based dataset.
+        :return: the instance
+        """
+        return cast(DeliveryDataset, DeliveryDataset.from_sequence(
+            [self.tables[entity_type].to_entities() for entity_type in self.entity_types()]))
+
+    @property
+    def people(self) -> ColumnarTable:
+        return self.tables[Person]
+
+    @property
+    def couriers(self) -> ColumnarTable:
+        return self.tables[Courier]
+
+    @property
+    def restaurants(self) -> ColumnarTable:
+        return self.tables[Restaurant]
+
+    @property
+    def orders(self) -> ColumnarTable:
+        return self.tables[Order]
+
+
+@dataclass(slots=True)
 class Order(Entity):
     order_id: str = field(hash=True)
     amount: int = field(repr=True, compare=False)
@@ -181,45 +723,27 @@ class Order(Entity):
     courier_id: str = field(repr=True, compare=False)
 
     @staticmethod
-    def from_sequence(seq: list[str]) -> Order:
-        return Order(seq[0], int(seq[1]), seq[2], seq[3], seq[4], int(seq[5]), seq[6], seq[7], seq[8], seq[9])
-
-    def to_sequence(self) -> list[str]:
-        return [self.order_id, str(self.amount), str(self.food_type), self.restaurant_id, self.restaurant_name,
-                str(self.delivery_fee), self.destination, self.client_name, self.client_id, self.courier_id]
-
-    @staticmethod
-    def field_names() -> list[str]:
-        return ["order_id", "amount", "food_type", "restaurant_id", "restaurant_name", "delivery_fee", "destination",
-                "client_name", "client_id", "courier_id"]
+    def schema() -> list[Field]:
+        # the food types, restaurant and client names repeat across the orders, so they share one string object each
+        return [
+            Field("order_id", str, max_length=50, primary_key=True),
+            Field("amount", int),
+            Field("food_type", FoodType, max_length=50),
+            Field("restaurant_id", str, max_length=50, references=Restaurant),
+            Field("restaurant_name", str, max_length=100, intern=True),
+            Field("delivery_fee", int),
+            Field("destination", str, max_length=100),
+            Field("client_name", str, max_length=100, intern=True),
+            Field("client_id", str, max_length=100, references=Person),
+            Field("courier_id", str, max_length=50, references=Courier)
+        ]
 
     @staticmethod
     def collection_name() -> str:
         return "orders"
 
-    @staticmethod
-    def create_table() -> str:
-        return f"""
-        CREATE TABLE {Order.collection_name()} (
-            order_id VARCHAR(50) NOT NULL PRIMARY KEY,
-            amount INTEGER NOT NULL,
-            food_type VARCHAR(50) NOT NULL,
-            restaurant_id VARCHAR(50) NOT NULL,
-            restaurant_name VARCHAR(50) NOT NULL,
-            delivery_fee VARCHAR(50) NOT NULL,
-            destination VARCHAR(50) NOT NULL,
-            client_name VARCHAR(50) NOT NULL,
-            client_id VARCHAR(100) NOT NULL,
-            courier_id VARCHAR(50) NOT NULL,
-
-            FOREIGN KEY (courier_id) REFERENCES {Courier.collection_name()}(courier_id),
-            FOREIGN KEY (client_id) REFERENCES {Person.collection_name()}(id),
-            FOREIGN KEY (restaurant_id) REFERENCES {Restaurant.collection_name()}(restaurant_id)
-        );
-         """
-
 
-@dataclass
+@dataclass(slots=True)
 class Restaurant(Entity):
     restaurant_id: str = field(hash=True)
     name: str = field(repr=True, compare=False)
@@ -228,34 +752,21 @@ class Restaurant(Entity):
     profile: str = field(repr=True, compare=False)
 
     @staticmethod
-    def from_sequence(seq: list[str]) -> Restaurant:
-        return Restaurant(seq[0], seq[1], seq[2], seq[3], seq[4])
-
-    def to_sequence(self) -> list[str]:
-        return [self.restaurant_id, self.name, self.address, self.phone_number, self.profile]
-
-    @staticmethod
-    def field_names() -> list[str]:
-        return ["restaurant_id", "name", "address", "phone_number", "profile"]
+    def schema() -> list[Field]:
+        return [
+            Field("restaurant_id", str, max_length=50, primary_key=True),
+            Field("name", str, nullable=True, max_length=100),
+            Field("address", str, nullable=True, max_length=100),
+            Field("phone_number", str, nullable=True, max_length=50),
+            Field("profile", FoodType, nullable=True, max_length=50)
+        ]
 
     @staticmethod
     def collection_name() -> str:
         return "restaurants"
 
-    @staticmethod
-    def create_table() -> str:
-        return f"""
-        CREATE TABLE {Restaurant.collection_name()} (
-            restaurant_id VARCHAR(50) NOT NULL PRIMARY KEY,
-            name VARCHAR(100),
-            address VARCHAR(100),
-            phone_number VARCHAR(50),
-            profile VARCHAR(50)
-        );
-        """
-
 
-@dataclass
+@dataclass(slots=True)
 class Courier(Entity):
     courier_id: str = field(hash=True)
     name: str = field(repr=True, compare=False)
@@ -264,34 +775,21 @@ class Courier(Entity):
     delivery_method: str = field(repr=True, compare=False)
 
     @staticmethod
-    def from_sequence(seq: list[str]) -> Courier:
-        return Courier(seq[0], seq[1], int(seq[2]), bool(seq[3]), seq[4])
-
-    def to_sequence(self) -> list[str]:
-        return [self.courier_id, self.name, str(self.age), str(int(self.male)), self.delivery_method]
-
-    @staticmethod
-    def field_names() -> list[str]:
-        return ["courier_id", "name", "age", "male", "delivery_method"]
+    def schema() -> list[Field]:
+        return [
+            Field("courier_id", str, max_length=50, primary_key=True),
+            Field("name", str, nullable=True, max_length=100),
+            Field("age", int, nullable=True),
+            Field("male", bool, nullable=True),
+            Field("delivery_method", DeliveryMethod, nullable=True, max_length=50)
+        ]
 
     @staticmethod
     def collection_name() -> str:
         return "couriers"
 
-    @staticmethod
-    def create_table() -> str:
-        return f"""
-        CREATE TABLE {Courier.collection_name()} (
-            courier_id VARCHAR(50) NOT NULL PRIMARY KEY,
-            name VARCHAR(100),
-            age INTEGER,
-            male BOOLEAN,
-            delivery_method VARCHAR(50)
-        );
-        """
-
 
-@dataclass
+@dataclass(slots=True)
 class Person(Entity):
     id: str = field(hash=True)
     name: str = field(repr=True, compare=False)
@@ -300,32 +798,19 @@ class Person(Entity):
     male: bool = field(default=True, repr=True, compare=False)
 
     @staticmethod
-    def from_sequence(seq: list[str]) -> Person:
-        return Person(seq[0], seq[1], seq[2], int(seq[3]), bool(seq[4]))
-
-    def to_sequence(self) -> list[str]:
-        return [self.id, self.name, self.address, str(self.age), str(int(self.male))]
-
-    @staticmethod
-    def field_names() -> list[str]:
-        return ["id", "name", "address", "age", "male"]
+    def schema() -> list[Field]:
+        return [
+            Field("id", str, max_length=50, primary_key=True),
+            Field("name", str, nullable=True, max_length=100),
+            Field("address", str, nullable=True, max_length=100),
+            Field("age", int, nullable=True),
+            Field("male", bool, nullable=True)
+        ]
 
     @staticmethod
     def collection_name() -> str:
         return "people"
 
-    @staticmethod
-    def create_table() -> str:
-        return f"""
-        CREATE TABLE {Person.collection_name()} (
-            id VARCHAR(50) NOT NULL PRIMARY KEY,
-            name VARCHAR(100),
-            address VARCHAR(100),
-            age INTEGER,
-            male BOOLEAN
-        );
-        """
-
 
 class FoodType(Enum):
     Pizza = 'Pizza'
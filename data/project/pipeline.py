@@ -0,0 +1,369 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Callable, Iterable, Iterator, Type
+
+import openpyxl
+from openpyxl import Workbook
+
+from data.project.base import Entity, dependency_levels
+from data.project.database import ConnectionPool
+from data.project.handler import CSVHandler, JSONHandler, NPZHandler, SQLHandler, SnapshotHandler, XLSXHandler, \
+    batched
+from data.project.snapshot import write_snapshot
+
+FORMATS = ["csv", "json", "xlsx", "npz", "snapshot", "mysql"]
+
+
+class Endpoint(ABC):
+    """
+    A source or a target of a conversion: a place where the collections of a dataset are stored in some format.
+    Collections are read as iterators and written from iterators, so an endpoint never holds a whole collection
+    (except where the format itself needs it, see the subclasses).
+    """
+
+    def prepare(self, entity_types: list[Type[Entity]]) -> None:
+        """
+        Prepares the endpoint for writing the collections of the given types.
+        :param entity_types: the types, tables referred to first
+        :return: nothing
+        """
+        pass
+
+    @abstractmethod
+    def read(self, entity_type: Type[Entity]) -> Iterator[Entity]:
+        """
+        Reads a collection lazily.
+        :param entity_type: the type of entries
+        :return: the iterator of elements
+        """
+        pass
+
+    @abstractmethod
+    def write(self, entity_type: Type[Entity], entities: Iterable[Entity]) -> int:
+        """
+        Writes a collection from an iterable, consuming it as it goes.
+        :param entity_type: the type of entries
+        :param entities: the entries
+        :return: the number of written entries
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Finishes the writes and releases the resources of the endpoint.
+        :return: nothing
+        """
+        pass
+
+
+class CSVEndpoint(Endpoint):
+    """
+    CSV documents in a folder.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def prepare(self, entity_types: list[Type[Entity]]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+
+    def read(self, entity_type: Type[Entity]) -> Iterator[Entity]:
+        return CSVHandler.iter_entities(entity_type, self.path)
+
+    def write(self, entity_type: Type[Entity], entities: Iterable[Entity]) -> int:
+        return CSVHandler.write_entities(entity_type, entities, self.path)
+
+
+class JSONEndpoint(Endpoint):
+    """
+    JSON documents in a folder. Every collection is read from its document (a JSON document is parsed as a
+    whole, JSON Lines documents line by line) and written as JSON Lines.
+    """
+
+    def __init__(self, path: str, compress: bool = False):
+        self.path = path
+        self.compress = compress
+
+    def prepare(self, entity_types: list[Type[Entity]]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+
+    def read(self, entity_type: Type[Entity]) -> Iterator[Entity]:
+        extension = JSONHandler.find_extension(entity_type, self.path)
+        if extension == ".json":
+            return iter(JSONHandler.read_entity(entity_type, self.path))
+        return JSONHandler.iter_entities(entity_type, self.path, extension=extension)
+
+    def write(self, entity_type: Type[Entity], entities: Iterable[Entity]) -> int:
+        return JSONHandler.write_entities(entity_type, entities, self.path, compress=self.compress)
+
+
+class XLSXEndpoint(Endpoint):
+    """
+    The dataset.xlsx document of a folder. The workbook is opened read-only for reading, and written through a
+    write-only workbook, which is saved when the endpoint is closed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.workbook = None
+
+    def prepare(self, entity_types: list[Type[Entity]]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        self.workbook = Workbook(write_only=True)
+
+    def read(self, entity_type: Type[Entity]) -> Iterator[Entity]:
+        if self.workbook is None:
+            self.workbook = openpyxl.load_workbook(os.path.join(self.path, "dataset.xlsx"), read_only=True)
+        return XLSXHandler.iter_entities(entity_type, self.workbook)
+
+    def write(self, entity_type: Type[Entity], entities: Iterable[Entity]) -> int:
+        return XLSXHandler.write_entities(entity_type, entities, self.workbook)
+
+    def close(self) -> None:
+        if isinstance(self.workbook, Workbook) and self.workbook.write_only:
+            self.workbook.save(os.path.join(self.path, "dataset.xlsx"))
+        elif self.workbook is not None:
+            self.workbook.close()
+        self.workbook = None
+
+
+class NPZEndpoint(Endpoint):
+    """
+    Columnar folders. A collection is read as one columnar table (compact arrays, whose entities are built on
+    iteration) and written row group by row group.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def read(self, entity_type: Type[Entity]) -> Iterator[Entity]:
+        return iter(NPZHandler.read_table(entity_type, self.path))
+
+    def write(self, entity_type: Type[Entity], entities: Iterable[Entity]) -> int:
+        return NPZHandler.write_entities(entity_type, entities, self.path)
+
+
+class SnapshotEndpoint(Endpoint):
+    """
+    Snapshot files in a folder. Reading is lazy (the files are memory-mapped); writing keeps the encoded rows of a
+    collection until its file is written, because the offsets precede the rows.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tables = []
+
+    def prepare(self, entity_types: list[Type[Entity]]) -> None:
+        os.makedirs(self.path, exist_ok=True)
+
+    def read(self, entity_type: Type[Entity]) -> Iterator[Entity]:
+        table = SnapshotHandler.read_entity(entity_type, self.path)
+        self.tables.append(table)
+        return iter(table)
+
+    def write(self, entity_type: Type[Entity], entities: Iterable[Entity]) -> int:
+        return write_snapshot(entities, os.path.join(self.path, entity_type.collection_name()
+                                                     + SnapshotHandler.EXTENSION))
+
+    def close(self) -> None:
+        for table in self.tables:
+            table.close()
+        self.tables = []
+
+
+class SQLEndpoint(Endpoint):
+    """
+    The tables of a database. Rows are streamed through an unbuffered cursor, and written in committed multi-row
+    INSERT statements; the previous tables are dropped before the first one is written.
+    """
+
+    def __init__(self, pool: ConnectionPool, batch_size: int = 1000):
+        self.pool = pool
+        self.batch_size = batch_size
+
+    def prepare(self, entity_types: list[Type[Entity]]) -> None:
+        SQLHandler.drop_tables(entity_types, self.pool)
+
+    def read(self, entity_type: Type[Entity]) -> Iterator[Entity]:
+        return SQLHandler.iter_entities(entity_type, self.pool)
+
+    def write(self, entity_type: Type[Entity], entities: Iterable[Entity]) -> int:
+        return SQLHandler.write_entities(entity_type, entities, self.pool, batch_size=self.batch_size)
+
+
+def open_endpoint(name: str, path: str = None, pool: ConnectionPool = None) -> Endpoint:
+    """
+    Returns the endpoint of a format.
+    :param name: the name of the format (one of FORMATS)
+    :param path: the path of the folder (not needed by mysql)
+    :param pool: the connection pool (needed by mysql only)
+    :return: the endpoint
+    """
+
+    if name == "mysql":
+        if pool is None:
+            raise ValueError("a connection pool is needed by the mysql format")
+        return SQLEndpoint(pool)
+
+    endpoints = {"csv": CSVEndpoint, "json": JSONEndpoint, "xlsx": XLSXEndpoint, "npz": NPZEndpoint,
+                 "snapshot": SnapshotEndpoint}
+    if name not in endpoints:
+        raise ValueError(f"unknown format: {name}")
+    if path is None:
+        raise ValueError(f"a path is needed by the {name} format")
+    return endpoints[name](path)
+
+
+@dataclass
+class ConversionReport:
+    """
+    The number of converted rows and the elapsed seconds per collection.
+    """
+    rows: dict[str, int] = field(default_factory=dict)
+    seconds: dict[str, float] = field(default_factory=dict)
+
+    def throughput(self) -> float:
+        """
+        Returns the number of converted rows per second over all collections.
+        :return: the rate
+        """
+        seconds = sum(self.seconds.values())
+        return sum(self.rows.values()) / seconds if seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        """
+        Returns a human readable description of the report.
+        :return: the text
+        """
+        lines = [f"{collection}: {rows} rows in {self.seconds[collection]:.2f} s"
+                 f" ({rows / max(self.seconds[collection], 1e-9):,.0f} rows/s)"
+                 for collection, rows in self.rows.items()]
+        lines.append(f"total: {sum(self.rows.values())} rows in {sum(self.seconds.values()):.2f} s"
+                     f" ({self.throughput():,.0f} rows/s)")
+        return "\n".join(lines)
+
+
+_DONE = object()
+
+
+class _Failure:
+    """
+    Carries an exception of the producer thread to the consumer.
+    """
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def transfer(entities: Iterable[Entity], write: Callable[[Iterable[Entity]], int], batch_size: int = 10000,
+             queue_size: int = 4, progress: Callable[[int], None] = None) -> int:
+    """
+    Feeds entities to a writer through a bounded queue of batches: a producer thread reads (parses) the batches,
+    while the calling thread writes them. When the writer falls behind, the producer blocks on the full queue, so at
+    most queue_size + 2 batches are in memory at any time. An exception of the reader is raised in the calling thread;
+    if the writer fails, the producer is stopped.
+    :param entities: the entries (usually a lazy iterator)
+    :param write: the function which consumes an iterable of entries and returns their number
+    :param batch_size: the number of entries per batch
+    :param queue_size: the maximal number of batches waiting in the queue
+    :param progress: if given, it is called with the number of entries handed to the writer after every batch
+    :return: the number returned by the writer
+    """
+
+    batches = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce() -> None:
+        try:
+            for batch in batched(entities, batch_size):
+                if not put(batch):
+                    return
+            put(_DONE)
+        except BaseException as error:
+            put(_Failure(error))
+        finally:
+            # releases the resources of a lazy reader (e.g. the connection of a database cursor) in this thread
+            close = getattr(entities, "close", None)
+            if close is not None:
+                close()
+
+    def consume() -> Iterator[Entity]:
+        count = 0
+        while True:
+            item = batches.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield from item
+            count += len(item)
+            if progress is not None:
+                progress(count)
+
+    # the producer runs in a copy of the caller's context, so the reader reports to the caller's measurement
+    producer = threading.Thread(target=contextvars.copy_context().run, args=(produce,), name="convert-reader",
+                                daemon=True)
+    producer.start()
+    try:
+        return write(consume())
+    finally:
+        stop.set()
+        producer.join()
+
+
+def convert(source: Endpoint, target: Endpoint, entity_types: list[Type[Entity]], batch_size: int = 10000,
+            queue_size: int = 4, progress: Callable[[str, int, float], None] = None) -> ConversionReport:
+    """
+    Converts the collections of a dataset from one endpoint to another without materializing them: every collection
+    is streamed through transfer, the collections referred to first. The endpoints are closed at the end.
+    :param source: the endpoint which is read
+    :param target: the endpoint which is written
+    :param entity_types: the types of the collections
+    :param batch_size: the number of entries per batch
+    :param queue_size: the maximal number of batches waiting to be written
+    :param progress: if given, it is called with the name of the collection, the number of written entries and the
+                     elapsed seconds after every batch
+    :return: the report
+    """
+
+    batch_size = batch_size if batch_size is not None else 10000
+    queue_size = queue_size if queue_size is not None else 4
+    ordered = [entity_type for level in dependency_levels(entity_types) for entity_type in level]
+    report = ConversionReport()
+
+    try:
+        target.prepare(ordered)
+        for entity_type in ordered:
+            collection_name = entity_type.collection_name()
+            start = time.perf_counter()
+
+            def notify(count: int) -> None:
+                if progress is not None:
+                    progress(collection_name, count, time.perf_counter() - start)
+
+            report.rows[collection_name] = transfer(source.read(entity_type), partial(target.write, entity_type),
+                                                    batch_size, queue_size, notify)
+            report.seconds[collection_name] = time.perf_counter() - start
+    finally:
+        source.close()
+        target.close()
+
+    return report
+
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Optional
+
+import numpy as np
+from faker import Faker
+from faker.exceptions import UniquenessException
+
+
+def default_cache_dir() -> str:
+    """
+    Returns the folder where the pools are cached by default.
+    :return: the path of the folder
+    """
+    return os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+                        "data_project", "faker_pools")
+
+
+class FakerPool:
+    """
+    A vocabulary of distinct Faker values (names, addresses, company names...) which is built once per locale and
+    seed, cached on the disk, then sampled with NumPy random indices instead of calling Faker for every row.
+    """
+
+    def __init__(self, locale: str, seed: int = 0, size: int = 10000, cache_dir: str = None):
+        """
+        Creates a pool. The values are built lazily, kind by kind.
+        :param locale: the locale of Faker
+        :param seed: the seed of Faker
+        :param size: the maximal number of values built per kind
+        :param cache_dir: the folder of the cache files (None means default_cache_dir(), "" disables caching)
+        """
+        self.locale = locale
+        self.seed = seed
+        self.size = size
+        self.cache_dir = cache_dir if cache_dir is not None else default_cache_dir()
+
+        self._values: dict[str, np.ndarray] = dict()
+        self._permutations: dict[tuple, np.ndarray] = dict()
+        self._loaded = False
+
+    def cache_path(self) -> Optional[str]:
+        """
+        Returns the path of the cache file.
+        :return: the path (None if caching is disabled)
+        """
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"{self.locale}-{self.seed}-{self.size}.json")
+
+    def values(self, kind: str) -> np.ndarray:
+        """
+        Returns the distinct values of a kind, building and caching them if needed.
+        :param kind: the name of the Faker method (e.g. name_male, address, company, phone_number)
+        :return: the array of values
+        """
+        if not self._loaded:
+            self._load()
+
+        if kind not in self._values:
+            self._values[kind] = self._build(kind)
+            self._save()
+
+        return self._values[kind]
+
+    def sample(self, kind: str, rng: np.random.Generator, n: int) -> list[str]:
+        """
+        Samples values with replacement.
+        :param kind: the name of the Faker method
+        :param rng: the random generator
+        :param n: the number of values
+        :return: the list of values
+        """
+        values = self.values(kind)
+        return values[rng.integers(len(values), size=n)].tolist()
+
+    def sample_unique(self, kind: str, seed: int, start: int, n: int, total: int) -> list[str]:
+        """
+        Returns a slice of a sequence of total distinct values. The sequence is a permutation of the pool chosen by the
+        seed, so consecutive slices (e.g. chunks generated by different processes) never share a value. When the pool
+        is smaller than total, the values are combined with a running number.
+        :param kind: the name of the Faker method
+        :param seed: the seed of the permutation
+        :param start: the position of the first value
+        :param n: the number of values
+        :param total: the number of values in the whole sequence
+        :return: the list of values
+        """
+        values = self.values(kind)
+        key = (kind, seed)
+        if key not in self._permutations:
+            self._permutations[key] = np.random.default_rng([seed, len(values)]).permutation(len(values))
+
+        positions = np.arange(start, start + n)
+        picked = values[self._permutations[key][positions % len(values)]].tolist()
+        if total <= len(values):
+            return picked
+
+        rounds = (positions // len(values)).tolist()
+        return [value if r == 0 else f"{value} {r + 1}" for value, r in zip(picked, rounds)]
+
+    def _build(self, kind: str) -> np.ndarray:
+        fake = Faker(self.locale)
+        fake.seed_instance(self.seed)
+        method = getattr(fake.unique, kind)
+
+        values = []
+        try:
+            for _ in range(self.size):
+                values.append(method())
+        except UniquenessException:
+            pass
+
+        return np.array(values, dtype=object)
+
+    def _load(self) -> None:
+        self._loaded = True
+        path = self.cache_path()
+        if path is None or not os.path.exists(path):
+            return
+
+        with open(path, "r", encoding="utf-8") as file:
+            for kind, values in json.load(file).items():
+                self._values[kind] = np.array(values, dtype=object)
+
+    def _save(self) -> None:
+        path = self.cache_path()
+        if path is None:
+            return
+
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(temporary, "w", encoding="utf-8") as file:
+                json.dump({kind: values.tolist() for kind, values in self._values.items()}, file)
+            os.replace(temporary, path)
+        except OSError:
+            # the cache is only an optimization: without a writable folder the pool keeps its values in memory
+            self.cache_dir = ""
+            if os.path.exists(temporary):
+                os.remove(temporary)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Iterable, Type, Union
+
+import numpy as np
+
+from data.project.base import Dataset, Entity
+from data.project.columnar import ColumnarDataset, ColumnarTable
+
+AGGREGATES = ["count", "sum", "mean"]
+
+
+@dataclass
+class ResultTable:
+    """
+    The plain result of a query: named columns and rows of Python values.
+    """
+    columns: list[str]
+    rows: list[tuple]
+
+    def column(self, name: str) -> list[Any]:
+        """
+        Returns the values of a column.
+        :param name: the name of the column
+        :return: the list of values
+        """
+        position = self.columns.index(name)
+        return [row[position] for row in self.rows]
+
+    def to_dict(self, value: str) -> dict[Any, Any]:
+        """
+        Returns a column keyed by the first (group-by) column.
+        :param value: the name of the value column
+        :return: the dictionary
+        """
+        return dict(zip(self.column(self.columns[0]), self.column(value)))
+
+
+def table_of(source: Union[Dataset, Iterable[Entity]], entity_type: Type[Entity],
+             fields: list[str] = None) -> ColumnarTable:
+    """
+    Returns the columnar form of a collection. Columnar datasets are used as they are, datasets which cache the
+    encoded collections (see DeliveryDataset.table) are asked for the table, anything else is encoded (only the given
+    fields, if any).
+    :param source: a dataset or a collection of entities
+    :param entity_type: the type of the entities
+    :param fields: the fields needed by the query
+    :return: the table
+    """
+    if isinstance(source, ColumnarDataset):
+        return source.table(entity_type)
+    if isinstance(source, Dataset):
+        if hasattr(source, "table"):
+            return source.table(entity_type, fields)
+        source = source.entities()[entity_type]
+    return ColumnarTable.from_entities(entity_type, source, fields)
+
+
+def group_keys(table: ColumnarTable, by: str) -> tuple[np.ndarray, list[Any]]:
+    """
+    Returns a dense group number for every row and the key of every group. The None values of a column with a null
+    mask form the last group.
+    :param table: the table
+    :param by: the name of the grouping field
+    :return: the group numbers and the keys
+    """
+    if by in table.categories:
+        return table.codes(by)
+
+    column = table.columns[by]
+    mask = table.masks.get(by)
+    if column.dtype == np.bool_:
+        groups, keys = column.view(np.uint8), [False, True]
+    elif mask is None:
+        keys, inverse = np.unique(column, return_inverse=True)
+        groups, keys = inverse.reshape(-1), keys.tolist()
+    else:
+        # the zeros standing for None must not create a key of their own
+        keys = np.unique(column[~mask])
+        groups, keys = np.searchsorted(keys, column), keys.tolist()
+
+    if mask is not None:
+        groups, keys = np.where(mask, len(keys), groups), keys + [None]
+    return groups, keys
+
+
+def group_by(source: Union[Dataset, ColumnarTable, Iterable[Entity]], entity_type: Type[Entity], by: str,
+             aggregates: list[tuple[str, str]] = None) -> ResultTable:
+    """
+    Groups a collection by a field and computes aggregates per group with batched NumPy operations.
+    :param source: a dataset, a table or a collection of entities
+    :param entity_type: the type of the entities
+    :param by: the name of the grouping field
+    :param aggregates: (function, field) pairs, where function is one of count, sum and mean (the field of count is
+                       ignored); the default is a single count
+    :return: the table with the key column, then one column per aggregate (count, sum_<field>, mean_<field>)
+    """
+    aggregates = aggregates if aggregates is not None else [("count", None)]
+    for function, _ in aggregates:
+        if function not in AGGREGATES:
+            raise ValueError(f"unknown aggregate: {function}")
+
+    fields = [by] + sorted({name for function, name in aggregates if function != "count"} - {by})
+    table = table_of(source, entity_type, fields)
+    for name in fields[1:]:
+        if name in table.categories or table.columns[name].dtype == object:
+            raise ValueError(f"only numeric fields can be summed or averaged: {name}")
+    groups, keys = group_keys(table, by)
+
+    counts = np.bincount(groups, minlength=len(keys))
+    columns = [by]
+    results = []
+    for function, name in aggregates:
+        if function == "count":
+            columns.append("count")
+            results.append(counts.tolist())
+            continue
+
+        # None values are stored as zeros, so they add nothing to the sums, but they are not counted in the means
+        values = table.columns[name]
+        if values.dtype.kind in "iub":
+            # integers are summed exactly (bincount would accumulate them as float64 weights)
+            sums = np.zeros(len(keys), dtype=np.int64)
+            np.add.at(sums, groups, values)
+        else:
+            sums = np.bincount(groups, weights=values, minlength=len(keys))
+        if function == "sum":
+            columns.append(f"sum_{name}")
+            results.append(sums.tolist())
+        else:
+            columns.append(f"mean_{name}")
+            present = counts if name not in table.masks \
+                else np.bincount(groups[~table.masks[name]], minlength=len(keys))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                results.append(np.where(present > 0, sums / np.maximum(present, 1), np.nan).tolist())
+
+    return ResultTable(columns, list(zip(keys, *results)))
+
+
+def count_by(source: Union[Dataset, ColumnarTable, Iterable[Entity]], entity_type: Type[Entity],
+             by: str) -> ResultTable:
+    """
+    Counts the entities per value of a field.
+    :param source: a dataset, a table or a collection of entities
+    :param entity_type: the type of the entities
+    :param by: the name of the grouping field
+    :return: the table with the key and the count columns
+    """
+    return group_by(source, entity_type, by)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, fields, is_dataclass
+from enum import Enum
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Optional, Sequence, Type
+
+if TYPE_CHECKING:
+    from data.project.base import Entity
+
+BOOLEANS: dict[Any, bool] = {
+    True: True, False: False, "1": True, "0": False,
+    "True": True, "False": False, "true": True, "false": False, "TRUE": True, "FALSE": False
+}
+
+
+@dataclass(frozen=True)
+class Field:
+    """
+    Describes a field of an entity: its name, its Python type (an Enum type marks a categorical field which holds the
+    name of a member), and how it is stored.
+    """
+    name: str
+    type: type
+    nullable: bool = False
+    max_length: Optional[int] = None
+    primary_key: bool = False
+    references: Optional[Type[Entity]] = None
+    intern: bool = False
+
+    def sql_type(self) -> str:
+        """
+        Returns the SQL type of the column.
+        :return: the type
+        """
+        if self.type is int:
+            return "INTEGER"
+        if self.type is bool:
+            return "BOOLEAN"
+        if isinstance(self.type, type) and issubclass(self.type, Enum):
+            return f"VARCHAR({self.max_length if self.max_length is not None else 50})"
+        return f"VARCHAR({self.max_length if self.max_length is not None else 255})"
+
+
+def parse_bool(value: Any) -> bool:
+    """
+    Parses a boolean written as True/False, true/false or 1/0 (either as a number or as a text).
+    :param value: the value
+    :return: the boolean
+    """
+    try:
+        return BOOLEANS[value]
+    except (KeyError, TypeError):
+        raise ValueError(f"invalid boolean: {value!r}") from None
+
+
+def parse_optional(parse: Callable[[Any], Any], value: Any) -> Any:
+    """
+    Parses the value of a nullable field, where None and the empty text stand for NULL.
+    :param parse: the parser of the non-null values
+    :param value: the value
+    :return: the parsed value or None
+    """
+    return None if value is None or value == "" else parse(value)
+
+
+def format_optional(value: Any) -> str:
+    """
+    Formats the value of a nullable field as a text (NULL as the empty text).
+    :param value: the value
+    :return: the text
+    """
+    return "" if value is None else str(value)
+
+
+class RowCodec:
+    """
+    Converts between the entities of a type and rows. The conversions are compiled once from the schema of the type
+    into functions without loops or per-field dispatch (see row_codec):
+        decode(row) builds an entity from the values (texts or typed values) in the order of the fields,
+        decode_mapping(row) builds an entity from the values keyed by field name,
+        encode(entity) returns the values as texts (booleans as 1 or 0, NULL as the empty text),
+        values(entity) returns the typed values in the order of the fields.
+    """
+
+    def __init__(self, entity_type: Type[Entity]):
+        self.entity_type = entity_type
+        self.schema = list(entity_type.schema())
+        self.names = [f.name for f in self.schema]
+
+        namespace = {
+            "cls": entity_type, "int": int, "str": str, "intern": sys.intern, "parse_bool": parse_bool,
+            "parse_optional": parse_optional, "format_optional": format_optional
+        }
+        positional = is_dataclass(entity_type) and [f.name for f in fields(entity_type) if f.init] == self.names
+
+        def arguments(value: Callable[[int, str], str]) -> str:
+            parsed = [self._parse(f, value(position, f.name)) for position, f in enumerate(self.schema)]
+            if positional:
+                return ", ".join(parsed)
+            return ", ".join(f"{f.name}={p}" for f, p in zip(self.schema, parsed))
+
+        self.decode: Callable[[Sequence], Entity] = self._compile(
+            f"def decode(row):\n    return cls({arguments(lambda position, name: f'row[{position}]')})", namespace)
+
+        self.decode_mapping: Callable[[Mapping[str, Any]], Entity] = self._compile(
+            f"def decode_mapping(row):\n    return cls({arguments(lambda position, name: f'row[{name!r}]')})",
+            namespace)
+
+        self.encode: Callable[[Entity], list[str]] = self._compile(
+            "def encode(entity):\n    return [" + ", ".join(self._format(f) for f in self.schema) + "]", namespace)
+
+        getter = attrgetter(*self.names)
+        self.values: Callable[[Entity], tuple] = getter if len(self.names) > 1 else lambda entity: (getter(entity),)
+
+    @staticmethod
+    def _compile(source: str, namespace: dict) -> Callable:
+        local = dict()
+        exec(source, namespace, local)
+        return next(iter(local.values()))
+
+    @staticmethod
+    def _parse(f: Field, value: str) -> str:
+        if f.type is int:
+            parser = "int"
+        elif f.type is bool:
+            parser = "parse_bool"
+        elif f.intern or (isinstance(f.type, type) and issubclass(f.type, Enum)):
+            parser = "intern"
+        else:
+            return value
+
+        if f.nullable:
+            return f"parse_optional({parser}, {value})"
+        return f"{parser}({value})"
+
+    @staticmethod
+    def _format(f: Field) -> str:
+        value = f"entity.{f.name}"
+        if f.type is bool:
+            text = f"('1' if {value} else '0')"
+            return f"('' if {value} is None else {text})" if f.nullable else text
+        if f.nullable:
+            return f"format_optional({value})"
+        if f.type is int:
+            return f"str({value})"
+        return value
+
+
+_codecs: dict[type, RowCodec] = dict()
+
+
+def row_codec(entity_type: Type[Entity]) -> RowCodec:
+    """
+    Returns the codec of an entity type, which is built on first use and cached.
+    :param entity_type: the type
+    :return: the codec
+    """
+    codec = _codecs.get(entity_type)
+    if codec is None:
+        codec = _codecs[entity_type] = RowCodec(entity_type)
+    return codec
+
+
+def create_table_statement(entity_type: Type[Entity]) -> str:
+    """
+    Returns the CREATE TABLE statement of an entity type, derived from its schema.
+    :param entity_type: the type
+    :return: the statement
+    """
+    lines = []
+    for f in entity_type.schema():
+        line = f"{f.name} {f.sql_type()}"
+        if not f.nullable:
+            line += " NOT NULL"
+        if f.primary_key:
+            line += " PRIMARY KEY"
+        lines.append(line)
+
+    for f in entity_type.schema():
+        if f.references is not None:
+            lines.append(f"FOREIGN KEY ({f.name}) REFERENCES {f.references.collection_name()}"
+                         f"({f.references.primary_key()})")
+
+    return f"CREATE TABLE {entity_type.collection_name()} (\n    " + ",\n    ".join(lines) + "\n);"
@@ -1,6 +1,9 @@
-from mysql.connector import MySQLConnection
-from data.project.handler import CSVHandler, JSONHandler, XLSXHandler, SQLHandler
-from data.project.model import DeliveryDataset
+from data.project.database import ConnectionPool, MySQLPool, SQLitePool
+from data.project.handler import CSVHandler, JSONHandler, XLSXHandler, NPZHandler, SnapshotHandler, SQLHandler
+from data.project.instrumentation import PROFILES, measure, recorder
+from data.project.model import ColumnarDeliveryDataset, DeliveryDataset
+from data.project.pipeline import convert, open_endpoint
+from data.project.validation import validate
 from visualization import couriers_by_delivery_methods, clients_by_gender, number_of_restaurants_by_profile
 
 
@@ -19,34 +22,54 @@ Commands:
         You can display this message whenever you want to.
     exit
         Terminates the program.
-    generate <count-of-people> <count-of-cars> <count-of-airports> <count-of-transactions>
+    generate <count-of-people> <count-of-cars> <count-of-airports> <count-of-transactions> [<seed>]
         Generates a dataset which contains a given number of people, cars, airports
-        and transactions. Also generates their relationships.
+        and transactions. Also generates their relationships. The same seed always
+        generates the same dataset.
     read <format> <path>
         Reads the dataset in a given format, from a given place of your file system.
-        <format> is one of the following parameters: csv, json, xlsx, mysql
+        <format> is one of the following parameters: csv, json, xlsx, npz, snapshot, mysql
         <path> is a path of a folder which contains the needed file(s). The parameter 
         must be omitted when you select mysql as the format.
     write <format> <path>
         Writes the dataset in a given format, to a given place of your file system.
-        <format> is one of the following parameters: csv, json, xlsx, mysql
+        <format> is one of the following parameters: csv, json, xlsx, npz, snapshot, mysql
         <path> is a path of a folder which will contain the generated file(s).
         The parameter must be omitted when you select mysql as the format.
+    convert <from-format> <to-format> [<from-path>] [<to-path>]
+        Converts the files (or tables) of a dataset from one format to another,
+        streaming the rows in batches without loading the dataset. The paths are
+        given in the same order as the formats, and omitted for mysql.
+    validate [<sample>]
+        Checks the keys, the references and the field types of the dataset. If a
+        sample size is given, only that many random orders are checked.
     query-<id>
         Executes the queries, explains and visualizes their output.
+    stats [<count>]
+        Displays the duration, the throughput (rows/s and MiB/s) and the time spent
+        in every stage (open, parse, construct, serialize, commit) of the last
+        commands (10 by default).
+    profile <cpu|memory> <command>
+        Executes a command, then displays the functions which took the most time
+        (cpu) or the peak memory and the lines whose allocations were still held
+        at the end (memory).
 """
 
 
-def get_connection() -> MySQLConnection:
+def get_pool() -> ConnectionPool:
     """
-    Reads properties of a MySQL connection, then creates the connection.
-    :return: the connection
+    Reads properties of a database connection, then creates a connection pool. Entering sqlite:<path> as the host
+    selects a local SQLite database file instead of a MySQL server.
+    :return: the connection pool
     """
 
-    print("Enter db host:")
+    print("Enter db host (or sqlite:<path>):")
     print("$", end=" ")
     host = input()
 
+    if host.startswith("sqlite:"):
+        return SQLitePool(host[len("sqlite:"):])
+
     print("Enter db user:")
     print("$", end=" ")
     user = input()
@@ -59,7 +82,7 @@ def get_connection() -> MySQLConnection:
     print("$", end=" ")
     database = input()
 
-    return MySQLConnection(
+    return MySQLPool(
         host=host,
         user=user,
         passwd=password,
@@ -74,23 +97,35 @@ def main() -> None:
     """
     print(help_message())
 
-    connection = get_connection()
+    pool = get_pool()
 
     dataset = None
     dataset_type = DeliveryDataset
+    # the columnar form of the dataset, which the queries aggregate with NumPy; it is built by the first query
+    columnar = None
 
     writers = {
         "csv": lambda t: CSVHandler.write_dataset(dataset, t[2]),
         "xlsx": lambda t: XLSXHandler.write_dataset(dataset, t[2]),
         "json": lambda t: JSONHandler.write_dataset(dataset, t[2]),
-        "mysql": lambda t: SQLHandler.write_dataset(dataset, connection)
+        "npz": lambda t: NPZHandler.write_dataset(dataset, t[2]),
+        "snapshot": lambda t: SnapshotHandler.write_dataset(dataset, t[2]),
+        "mysql": lambda t: SQLHandler.write_dataset(dataset, pool)
     }
 
     readers = {
         "csv": lambda t: CSVHandler.read_dataset(dataset_type, t[2]),
         "xlsx": lambda t: XLSXHandler.read_dataset(dataset_type, t[2]),
         "json": lambda t: JSONHandler.read_dataset(dataset_type, t[2]),
-        "mysql": lambda t: SQLHandler.read_dataset(dataset_type, connection)
+        "npz": lambda t: NPZHandler.read_dataset(dataset_type, t[2]),
+        "snapshot": lambda t: SnapshotHandler.read_dataset(dataset_type, t[2]),
+        "mysql": lambda t: SQLHandler.read_dataset(dataset_type, pool)
+    }
+
+    queries = {
+        "query-1": couriers_by_delivery_methods,
+        "query-2": clients_by_gender,
+        "query-3": number_of_restaurants_by_profile
     }
 
     while True:
@@ -98,27 +133,52 @@ def main() -> None:
             print("$", end=" ")
             line = input()
             tokens = line.split(" ")
+            profile = None
+            if len(tokens) > 2 and tokens[0] == "profile" and tokens[1] in PROFILES:
+                profile, tokens = tokens[1], tokens[2:]
+
             if tokens[0] == "exit":
-                connection.close()
+                pool.close()
                 break
-            elif tokens[0] == "help":
-                print(help_message())
-            elif len(tokens) == 5 and tokens[0] == "generate":
-                dataset = dataset_type.generate(int(tokens[1]), int(tokens[2]), int(tokens[3]), int(tokens[4]))
-            elif tokens[0] == "write":
-                writers[tokens[1]](tokens)
-            elif tokens[0] == "read":
-                dataset = readers[tokens[1]](tokens)
-            elif tokens[0] == "query-1":
-                couriers_by_delivery_methods(dataset)
-            elif tokens[0] == "query-2":
-                clients_by_gender(dataset)
-            elif tokens[0] == "query-3":
-                number_of_restaurants_by_profile(dataset)
-            else:
-                raise RuntimeError("unknown command")
-        except Exception:
-            print("command cannot be executed")
+            elif len(tokens) in [1, 2] and tokens[0] == "stats":
+                for measurement in recorder.last(int(tokens[1]) if len(tokens) == 2 else 10):
+                    print(measurement.summary())
+                continue
+
+            with measure(" ".join(tokens), profile=profile) as measurement:
+                if tokens[0] == "help":
+                    print(help_message())
+                elif len(tokens) in [5, 6] and tokens[0] == "generate":
+                    dataset = dataset_type.generate(int(tokens[1]), int(tokens[2]), int(tokens[3]), int(tokens[4]),
+                                                    seed=int(tokens[5]) if len(tokens) == 6 else None)
+                    columnar = None
+                elif tokens[0] == "write":
+                    writers[tokens[1]](tokens)
+                elif tokens[0] == "read":
+                    dataset = readers[tokens[1]](tokens)
+                    columnar = None
+                elif len(tokens) in [3, 4, 5] and tokens[0] == "convert":
+                    paths = iter(tokens[3:])
+                    source = open_endpoint(tokens[1], None if tokens[1] == "mysql" else next(paths), pool)
+                    target = open_endpoint(tokens[2], None if tokens[2] == "mysql" else next(paths), pool)
+                    report = convert(source, target, dataset_type.entity_types(),
+                                     progress=lambda name, rows, seconds: print(
+                                         f"\r{name}: {rows} rows ({rows / max(seconds, 1e-9):,.0f} rows/s)", end=""))
+                    print()
+                    print(report.summary())
+                elif len(tokens) in [1, 2] and tokens[0] == "validate":
+                    print(validate(dataset, sample=int(tokens[1]) if len(tokens) == 2 else None).summary())
+                elif tokens[0] in queries:
+                    if columnar is None:
+                        columnar = ColumnarDeliveryDataset.from_dataset(dataset)
+                    queries[tokens[0]](columnar)
+                else:
+                    raise RuntimeError("unknown command")
+
+            if profile is not None:
+                print(measurement.profile)
+        except Exception as error:
+            print(f"command cannot be executed: {type(error).__name__}: {error}")
 
 
 if __name__ == "__main__":
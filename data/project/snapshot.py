@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from typing import Iterable, Iterator, Optional, Type, Union
+
+import numpy as np
+
+from data.project.base import Entity
+from data.project.schema import row_codec
+
+MAGIC = b"DPSNAP02"
+HEADER = struct.Struct("<8sQ")
+SEPARATOR = "\x1f"
+NULL = "\x00"
+
+
+def write_snapshot(entities: Iterable[Entity], file_path: str) -> int:
+    """
+    Writes entities to a snapshot file: a header (magic and row count), the uint64 offsets of the rows, then the rows
+    as UTF-8 texts whose fields (as returned by to_sequence) are separated by the unit separator character, where
+    NULL is stored as the NUL character (so it differs from the empty text). The file is replaced atomically, so
+    processes which have mapped the previous version keep reading it.
+    :param entities: the entities
+    :param file_path: the path of the file
+    :return: the number of rows
+    """
+    rows = []
+    encode = None
+    nullable = []
+    for entity in entities:
+        if encode is None:
+            codec = row_codec(type(entity))
+            encode = codec.encode
+            nullable = [(position, f.name) for position, f in enumerate(codec.schema) if f.nullable]
+        values = encode(entity)
+        for position, name in nullable:
+            # the codec writes NULL as the empty text
+            if values[position] == "" and getattr(entity, name) is None:
+                values[position] = NULL
+        row = SEPARATOR.join(values)
+        if row.count(SEPARATOR) != len(values) - 1:
+            raise ValueError(f"a value of {entity} contains the separator character")
+        rows.append(row.encode())
+
+    offsets = np.zeros(len(rows) + 1, dtype="<u8")
+    np.cumsum([len(row) for row in rows], out=offsets[1:])
+
+    temporary = f"{file_path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(rows)))
+        file.write(offsets.tobytes())
+        file.write(b"".join(rows))
+    os.replace(temporary, file_path)
+
+    return len(rows)
+
+
+class SnapshotTable(Sequence):
+    """
+    A read-only list of entities backed by a memory-mapped snapshot file. Opening only reads the header; a row is
+    decoded when it is accessed, and the pages of the file are shared by every process which maps it.
+    """
+
+    def __init__(self, entity_type: Type[Entity], file_path: str):
+        """
+        Maps a snapshot file.
+        :param entity_type: the type of the entities
+        :param file_path: the path of the file
+        """
+        self.entity_type = entity_type
+        self.file_path = file_path
+
+        with open(file_path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._length = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"not a snapshot file: {file_path}")
+
+        self._offsets = np.frombuffer(self._mmap, dtype="<u8", count=self._length + 1, offset=HEADER.size)
+        self._data = HEADER.size + self._offsets.nbytes
+        self._decode = row_codec(entity_type).decode
+
+    def row(self, position: int) -> list[Optional[str]]:
+        """
+        Returns the stored values of a row.
+        :param position: the position of the row
+        :return: the values in the order of the field names (as returned by to_sequence), None for NULL
+        """
+        start = self._data + int(self._offsets[position])
+        stop = self._data + int(self._offsets[position + 1])
+        text = self._mmap[start:stop].decode()
+        if NULL not in text:
+            return text.split(SEPARATOR)
+        return [None if value == NULL else value for value in text.split(SEPARATOR)]
+
+    def close(self) -> None:
+        """
+        Unmaps the file. The table cannot be used afterwards.
+        :return: nothing
+        """
+        self._offsets = None
+        self._mmap.close()
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Entity]:
+        return (self._decode(self.row(position)) for position in range(self._length))
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[Entity, list[Entity]]:
+        if isinstance(item, slice):
+            return [self._decode(self.row(position)) for position in range(*item.indices(len(self)))]
+
+        position = item + self._length if item < 0 else item
+        if not 0 <= position < self._length:
+            raise IndexError("snapshot index out of range")
+        return self._decode(self.row(position))
@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from itertools import islice
+from operator import attrgetter
+from typing import Any, Callable, Iterable, Iterator, Optional, Type, Union
+
+import numpy as np
+
+from data.project.base import Dataset, Entity, dependency_levels
+from data.project.columnar import is_categorical
+from data.project.schema import parse_bool, parse_optional, row_codec
+
+DUPLICATE_KEY = "duplicate key"
+MISSING_REFERENCE = "missing reference"
+WRONG_TYPE = "wrong type"
+TOO_LONG = "too long"
+UNPARSABLE = "unparsable"
+
+
+@dataclass
+class Violation:
+    """
+    A problem found in a row.
+    """
+    collection: str
+    position: int
+    field_name: str
+    kind: str
+    value: Any
+
+    def __str__(self) -> str:
+        return f"{self.collection}[{self.position}].{self.field_name}: {self.kind} ({self.value!r})"
+
+
+@dataclass
+class ValidationReport:
+    """
+    The result of a validation: the number of checked rows and violations per collection, and the first violations.
+    """
+    checked: dict[str, int] = field(default_factory=dict)
+    counts: dict[str, int] = field(default_factory=dict)
+    violations: list[Violation] = field(default_factory=list)
+    sampled: bool = False
+
+    @property
+    def ok(self) -> bool:
+        """
+        Tells whether no violation was found.
+        :return: the answer
+        """
+        return sum(self.counts.values()) == 0
+
+    def summary(self) -> str:
+        """
+        Returns a human readable description of the report.
+        :return: the text
+        """
+        lines = [f"{collection}: {self.checked[collection]} rows checked{' (sample)' if self.sampled else ''}, "
+                 f"{self.counts.get(collection, 0)} violations" for collection in self.checked]
+        lines.extend(str(violation) for violation in self.violations)
+        hidden = sum(self.counts.values()) - len(self.violations)
+        if hidden > 0:
+            lines.append(f"... and {hidden} more")
+        return "\n".join(lines)
+
+
+class ValidationError(ValueError):
+    """
+    Raised when a dataset which is about to be written violates its keys or types.
+    """
+
+    def __init__(self, report: ValidationReport):
+        super().__init__(report.summary())
+        self.report = report
+
+
+def field_checks(entity_type: Type[Entity]) -> tuple[Callable[[tuple], bool],
+                                                     list[tuple[int, str, Callable[[Any], bool]]]]:
+    """
+    Returns the checks derived from the schema: the type of every field (NULL is allowed in nullable fields), the
+    members of categorical fields and the maximal length of texts. Besides the checks of the single fields, a
+    predicate tells whether a whole row passes all of them, which is much faster for the (usual) valid rows.
+    :param entity_type: the type of the entities
+    :return: the predicate of the rows and the (position, kind, predicate) triples of the fields
+    """
+    types = []
+    checks = []
+    categorical = []
+    lengths = []
+    for position, f in enumerate(entity_type.schema()):
+        expected = str if is_categorical(f.type) else f.type
+        types.append(expected)
+        checks.append((position, WRONG_TYPE, lambda value, t=expected, n=f.nullable:
+                       type(value) is t or (n and value is None)))
+        if is_categorical(f.type):
+            names = frozenset(member.name for member in f.type)
+            categorical.append((position, names))
+            checks.append((position, WRONG_TYPE, lambda value, n=names: value is None or value in n))
+        if f.max_length is not None and expected is str:
+            lengths.append((position, f.max_length))
+            checks.append((position, TOO_LONG, lambda value, n=f.max_length: value is None or len(value) <= n))
+
+    # the predicate of the rows is compiled into a single expression (like the row codecs of the schema)
+    namespace = {"type": type, "len": len}
+    conditions = []
+    for position, expected in enumerate(types):
+        namespace[f"t{position}"] = expected
+        conditions.append(f"type(v[{position}]) is t{position}")
+    for position, names in categorical:
+        namespace[f"c{position}"] = names
+        conditions.append(f"v[{position}] in c{position}")
+    for position, limit in lengths:
+        conditions.append(f"len(v[{position}]) <= {limit}")
+    local = dict()
+    exec(f"def valid(v):\n    return {' and '.join(conditions) or 'True'}", namespace, local)
+    valid = local["valid"]
+
+    return valid, checks
+
+
+def row_decoder(entity_type: Type[Entity]) -> Callable[[Any], Entity]:
+    """
+    Returns the function which builds an entity from a raw row (see CSVHandler.iter_rows and JSONHandler.iter_rows):
+    a sequence of texts in the order of the fields, a mapping of values by field name, or the text of a JSON object.
+    The function raises ValueError, TypeError, KeyError or IndexError for a row which cannot be decoded.
+    :param entity_type: the type of the entities
+    :return: the function
+    """
+    codec = row_codec(entity_type)
+
+    def decode(row: Any) -> Entity:
+        if isinstance(row, (str, bytes)):
+            row = json.loads(row)
+        if isinstance(row, Mapping):
+            return codec.decode_mapping(row)
+        if len(row) != len(codec.names):
+            raise ValueError(f"{len(row)} values instead of {len(codec.names)}")
+        return codec.decode(row)
+
+    return decode
+
+
+def unparsable_field(entity_type: Type[Entity], row: Any) -> tuple[str, Any]:
+    """
+    Finds the field of a raw row which cannot be decoded (see row_decoder).
+    :param entity_type: the type of the entities
+    :param row: the raw row
+    :return: the name of the field and its value ("*" and the row if the row as a whole is malformed)
+    """
+    if isinstance(row, (str, bytes)):
+        try:
+            row = json.loads(row)
+        except ValueError:
+            return "*", row
+    schema = entity_type.schema()
+    if isinstance(row, Mapping):
+        missing = next((f.name for f in schema if f.name not in row), None)
+        if missing is not None:
+            return missing, None
+        values = [row[f.name] for f in schema]
+    elif isinstance(row, Sequence) and len(row) == len(schema):
+        values = list(row)
+    else:
+        return "*", row
+
+    for f, value in zip(schema, values):
+        parse = int if f.type is int else parse_bool if f.type is bool else None
+        if parse is None:
+            continue
+        try:
+            parse_optional(parse, value) if f.nullable else parse(value)
+        except (ValueError, TypeError):
+            return f.name, value
+    return "*", row
+
+
+def validate(source: Union[Dataset, dict[Type[Entity], Iterable[Entity]]], entity_types: list[Type[Entity]] = None,
+             sample: int = None, seed: int = 0, max_violations: int = 1000) -> ValidationReport:
+    """
+    Checks the primary key uniqueness, the foreign key existence and the fields (see field_checks) in one
+    streaming pass: the collections are visited in foreign key order, and the keys of every referenced collection are
+    collected in a set, which the referring collections are checked against. Raw rows (see row_decoder) are decoded
+    one by one, and a row which cannot be decoded is reported as unparsable; documents which may hold such rows should
+    be read with the iter_rows method of their handler, because the iter_entities methods stop at the first one (it
+    is reported, and the rest of the collection is skipped).
+    :param source: a dataset, or iterables of entities or raw rows (e.g. a handler's iter_rows) by type
+    :param entity_types: the types in the source (the types of the dataset by default)
+    :param sample: if given, at most this many random rows (the first ones of a plain iterable) of every collection
+                   which is not referenced by another one are checked; referenced collections are always checked in
+                   full, because their keys are needed
+    :param seed: the seed of the sample
+    :param max_violations: the number of violations kept in the report (all of them are counted)
+    :return: the report
+    """
+    if isinstance(source, Dataset):
+        entity_types = entity_types if entity_types is not None else source.entity_types()
+        source = source.entities()
+    entity_types = entity_types if entity_types is not None else list(source)
+
+    referenced = {t for entity_type in entity_types for t in entity_type.foreign_keys().values()}
+    keys: dict[Type[Entity], set] = dict()
+    report = ValidationReport(sampled=sample is not None)
+    rng = np.random.default_rng(seed)
+
+    for level in dependency_levels(entity_types):
+        for entity_type in level:
+            collection_name = entity_type.collection_name()
+            rows = source[entity_type]
+            positions: Optional[Iterable[int]] = None
+            if sample is not None and entity_type not in referenced:
+                if isinstance(rows, Sequence):
+                    positions = np.sort(rng.choice(len(rows), size=min(sample, len(rows)), replace=False)).tolist()
+                    rows = [rows[position] for position in positions]
+                else:
+                    rows = islice(rows, sample)
+
+            def report_violation(position: int, field_name: str, kind: str, value: Any) -> None:
+                report.counts[collection_name] = report.counts.get(collection_name, 0) + 1
+                if len(report.violations) < max_violations:
+                    report.violations.append(Violation(collection_name, position, field_name, kind, value))
+
+            names = entity_type.field_names()
+            getter = attrgetter(*names)
+            valid, checks = field_checks(entity_type)
+            key_position = names.index(entity_type.primary_key())
+            references = [(names.index(name), keys.get(t)) for name, t in entity_type.foreign_keys().items()]
+            decode = row_decoder(entity_type)
+            seen = set()
+            failures = []
+
+            def guarded(items: Iterable) -> Iterator:
+                # a reader which cannot decode a row (e.g. iter_entities) fails, so the rest of the collection is lost
+                try:
+                    yield from items
+                except ValueError as error:
+                    failures.append(error)
+
+            count = 0
+            for position, entity in zip(positions if positions is not None else range(2 ** 63), guarded(rows)):
+                count += 1
+                # (the exact type is checked first, because isinstance is slow for the abstract entity classes)
+                if type(entity) is not entity_type and not isinstance(entity, entity_type):
+                    try:
+                        entity = decode(entity)
+                    except (ValueError, TypeError, KeyError, IndexError):
+                        field_name, value = unparsable_field(entity_type, entity)
+                        report_violation(position, field_name, UNPARSABLE, value)
+                        continue
+                values = getter(entity)
+
+                if not valid(values):
+                    for value_position, kind, check in checks:
+                        if not check(values[value_position]):
+                            report_violation(position, names[value_position], kind, values[value_position])
+
+                key = values[key_position]
+                if key in seen:
+                    report_violation(position, names[key_position], DUPLICATE_KEY, key)
+                else:
+                    seen.add(key)
+
+                for value_position, existing in references:
+                    if existing is not None and values[value_position] not in existing:
+                        report_violation(position, names[value_position], MISSING_REFERENCE, values[value_position])
+
+            for error in failures:
+                report_violation(count, "*", UNPARSABLE, str(error))
+            report.checked[collection_name] = count
+            if entity_type in referenced:
+                keys[entity_type] = seen
+
+    return report
@@ -1,24 +1,19 @@
-from data.project.model import DeliveryDataset, DeliveryMethod, FoodType
+from data.project.base import Dataset
+from data.project.model import DeliveryMethod, FoodType, Courier, Person, Restaurant
+from data.project.query import count_by
 import numpy as np
 import matplotlib.pyplot as plt
 
 
-def couriers_by_delivery_methods(dataset: DeliveryDataset) -> None:
-    properties = ["DeliveryMethod.Car", "DeliveryMethod.Motorcycle", "DeliveryMethod.Bicycle"]
-
-    delivery_methods = [
-        DeliveryMethod.Car.name, DeliveryMethod.Motorcycle.name, DeliveryMethod.Bicycle.name
-    ]
-
-    values = [
-        0, 0, 0
-    ]
-
-    for courier in dataset.couriers:
-        for delivery_method in delivery_methods:
-            if courier.delivery_method == delivery_method:
-                values[delivery_methods.index(delivery_method)] += 1
-
+def bar_chart(properties: list[str], values: list[int], y_label: str, title: str) -> None:
+    """
+    Draws a bar chart.
+    :param properties: the labels of the bars
+    :param values: the heights of the bars
+    :param y_label: the label of the y axis
+    :param title: the title of the chart
+    :return: nothing
+    """
     x = np.arange(len(properties))
 
     plt.style.use('_mpl-gallery')
@@ -26,8 +21,8 @@ def couriers_by_delivery_methods(dataset: DeliveryDataset) -> None:
     fig, ax = plt.subplots()
 
     ax.bar(x, values, width=1, edgecolor="white", linewidth=1)
-    ax.set_ylabel("Number of couriers")
-    ax.set_title("Number of couriers by DeliveryMethods")
+    ax.set_ylabel(y_label)
+    ax.set_title(title)
     ax.set_xticks(x)
     ax.set_xticklabels(properties)
 
@@ -36,62 +31,36 @@ def couriers_by_delivery_methods(dataset: DeliveryDataset) -> None:
     plt.show()
 
 
-def clients_by_gender(dataset: DeliveryDataset) -> None:
-    properties = ["Person.Male", "Person.Female"]
+def couriers_by_delivery_methods(dataset: Dataset) -> None:
+    properties = ["DeliveryMethod.Car", "DeliveryMethod.Motorcycle", "DeliveryMethod.Bicycle"]
 
-    values = [
-        0, 0
+    delivery_methods = [
+        DeliveryMethod.Car.name, DeliveryMethod.Motorcycle.name, DeliveryMethod.Bicycle.name
     ]
 
-    for person in dataset.people:
-        if person.male:
-            values[0] += 1
-        else:
-            values[1] += 1
+    counts = count_by(dataset, Courier, "delivery_method").to_dict("count")
+    values = [counts.get(delivery_method, 0) for delivery_method in delivery_methods]
 
-    x = np.arange(len(properties))
+    bar_chart(properties, values, "Number of couriers", "Number of couriers by DeliveryMethods")
 
-    plt.style.use('_mpl-gallery')
 
-    fig, ax = plt.subplots()
-
-    ax.bar(x, values, width=1, edgecolor="white", linewidth=1)
-    ax.set_ylabel("Number of clients")
-    ax.set_title("Number of clients by gender")
-    ax.set_xticks(x)
-    ax.set_xticklabels(properties)
+def clients_by_gender(dataset: Dataset) -> None:
+    properties = ["Person.Male", "Person.Female"]
 
-    fig.tight_layout()
+    counts = count_by(dataset, Person, "male").to_dict("count")
+    values = [counts.get(True, 0), counts.get(False, 0)]
 
-    plt.show()
+    bar_chart(properties, values, "Number of clients", "Number of clients by gender")
 
 
-def number_of_restaurants_by_profile(dataset: DeliveryDataset) -> None:
+def number_of_restaurants_by_profile(dataset: Dataset) -> None:
     properties = ["FoodType.Pizza", "FoodType.HotDog", "FoodType.Soup", "FoodType.Hamburger", "FoodType.Sausage"]
 
     food_types = [
         FoodType.Pizza.name, FoodType.HotDog.name, FoodType.Soup.name, FoodType.Hamburger.name, FoodType.Sausage.name
     ]
 
-    values = [0 for _ in food_types]
-
-    for restaurant in dataset.restaurants:
-        for food_type in food_types:
-            if restaurant.profile == food_type:
-                values[food_types.index(food_type)] += 1
-
-    x = np.arange(len(properties))
-
-    plt.style.use('_mpl-gallery')
-
-    fig, ax = plt.subplots()
+    counts = count_by(dataset, Restaurant, "profile").to_dict("count")
+    values = [counts.get(food_type, 0) for food_type in food_types]
 
-    ax.bar(x, values, width=1, edgecolor="white", linewidth=1)
-    ax.set_ylabel("Number of restaurants")
-    ax.set_title("Number of restaurants by FoodType")
-    ax.set_xticks(x)
-    ax.set_xticklabels(properties)
-
-    fig.tight_layout()
-
-    plt.show()
+    bar_chart(properties, values, "Number of restaurants", "Number of restaurants by FoodType")
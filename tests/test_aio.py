@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from data.project.aio import AsyncCSVHandler, AsyncChangesHandler, AsyncNPZHandler, AsyncSnapshotHandler, \
+    AsyncXLSXHandler
+from data.project.handler import CSVHandler, XLSXHandler
+from data.project.model import DeliveryDataset, Order
+
+
+def test_write_changes_only_where_the_handler_supports_it():
+    for handler in [AsyncXLSXHandler, AsyncNPZHandler, AsyncSnapshotHandler]:
+        assert not hasattr(handler, "write_changes")
+    with pytest.raises(TypeError):
+        AsyncChangesHandler(XLSXHandler)
+
+
+def test_write_changes(tmp_path):
+    dataset = DeliveryDataset.generate(20, 5, 5, 30, seed=7)
+    path = str(tmp_path)
+
+    async def run() -> dict:
+        await AsyncCSVHandler.write_dataset(dataset, path)
+        dataset.orders.pop(0)
+        return await AsyncCSVHandler.write_changes(dataset, path)
+
+    counts = asyncio.run(run())
+    assert counts[Order] == 29
+    assert [order.to_sequence() for order in CSVHandler.read_entity(Order, path)] == \
+        [order.to_sequence() for order in dataset.orders]
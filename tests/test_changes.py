@@ -0,0 +1,110 @@
+import copy
+
+import pytest
+
+from data.project.database import SQLitePool
+from data.project.handler import CSVHandler, JSONHandler, SQLHandler
+from data.project.model import DeliveryDataset, Order
+
+
+def rows(dataset: DeliveryDataset) -> dict:
+    return {entity_type: sorted(entity.to_sequence() for entity in entities)
+            for entity_type, entities in dataset.entities().items()}
+
+
+def new_order(dataset: DeliveryDataset, order_id: str) -> Order:
+    return Order(order_id, 1, "Soup", dataset.restaurants[0].restaurant_id, "name", 7, "destination", "client",
+                 dataset.people[0].id, dataset.couriers[0].courier_id)
+
+
+@pytest.fixture
+def dataset() -> DeliveryDataset:
+    return DeliveryDataset.generate(20, 5, 5, 30, seed=7)
+
+
+@pytest.fixture
+def pool():
+    pool = SQLitePool()
+    yield pool
+    pool.close()
+
+
+def test_fresh_dataset_is_new(dataset):
+    new, changed, removed = dataset.changes()[Order]
+    assert len(new) == 30 and changed == [] and removed == []
+
+
+def test_add_after_remove(dataset):
+    dataset.mark_clean()
+    removed = dataset.orders.pop(0)
+    dataset.add(new_order(dataset, "X1"))
+
+    new, changed, keys = dataset.changes()[Order]
+    assert [order.order_id for order in new] == ["X1"]
+    assert changed == []
+    assert keys == [removed.order_id]
+
+
+def test_removing_a_new_entity_forgets_it(dataset):
+    dataset.mark_clean()
+    order = new_order(dataset, "X1")
+    dataset.add(order)
+    dataset.remove(order)
+    assert dataset.changes()[Order] == ([], [], [])
+
+
+def test_removed_and_added_again_is_changed(dataset):
+    dataset.mark_clean()
+    order = dataset.orders[3]
+    del dataset.orders[3]
+    dataset.add(order)
+    assert dataset.changes()[Order] == ([], [order], [])
+
+
+def test_replaced_collection_is_compared_with_the_stored_keys(dataset):
+    dataset.mark_clean()
+    kept = dataset.orders[:5]
+    dataset.orders = kept + [new_order(dataset, "X1")]
+
+    new, changed, removed = dataset.changes()[Order]
+    assert [order.order_id for order in new] == ["X1"]
+    assert changed == kept
+    assert len(removed) == 25
+
+
+def test_deepcopy_keeps_the_changes(dataset):
+    dataset.mark_clean()
+    dataset.orders.pop()
+    assert copy.deepcopy(dataset).changes()[Order] == dataset.changes()[Order]
+
+
+def test_sql_add_after_remove(dataset, pool):
+    SQLHandler.write_dataset(dataset, pool)
+    dataset.orders.pop(0)
+    dataset.add(new_order(dataset, "X1"))
+    SQLHandler.write_changes(dataset, pool)
+    assert rows(SQLHandler.read_dataset(DeliveryDataset, pool)) == rows(dataset)
+
+
+def test_sql_shrinking_a_collection(dataset, pool):
+    SQLHandler.write_dataset(dataset, pool)
+    del dataset.orders[5:]
+    SQLHandler.write_changes(dataset, pool)
+    assert len(SQLHandler.read_entity(Order, pool)) == 5
+    assert rows(SQLHandler.read_dataset(DeliveryDataset, pool)) == rows(dataset)
+
+
+def test_sql_replaced_collection(dataset, pool):
+    SQLHandler.write_dataset(dataset, pool)
+    dataset.orders = dataset.orders[:5]
+    SQLHandler.write_changes(dataset, pool)
+    assert rows(SQLHandler.read_dataset(DeliveryDataset, pool)) == rows(dataset)
+
+
+@pytest.mark.parametrize("handler", [CSVHandler, JSONHandler])
+def test_documents_add_after_remove(dataset, tmp_path, handler):
+    handler.write_dataset(dataset, str(tmp_path))
+    dataset.orders.pop(0)
+    dataset.add(new_order(dataset, "X1"))
+    handler.write_changes(dataset, str(tmp_path))
+    assert rows(handler.read_dataset(DeliveryDataset, str(tmp_path))) == rows(dataset)
@@ -0,0 +1,23 @@
+import os
+
+from data.project.handler import CSVHandler, line_ranges
+from data.project.model import Restaurant
+
+
+def test_parallel_reading_skips_line_breaks_in_quoted_fields(tmp_path):
+    path = str(tmp_path)
+    restaurants = [Restaurant(f"R{i}", f'"Chez" {i};', "street\n" * (i % 7 + 1) + f"{i}\r\n", None, "Soup")
+                   for i in range(60)]
+    CSVHandler.write_entities(Restaurant, restaurants, path)
+
+    file_path = os.path.join(path, "restaurants.csv")
+    with open(file_path, "rb") as file:
+        file.readline()
+        start = file.tell()
+    # splitting at plain line breaks would cut quoted fields
+    assert line_ranges(file_path, 8, start=start) != line_ranges(file_path, 8, start=start, quotechar='"')
+
+    serial = CSVHandler.read_entity(Restaurant, path)
+    parallel = CSVHandler.read_entity(Restaurant, path, workers=8)
+    assert [r.to_sequence() for r in parallel] == [r.to_sequence() for r in serial] == \
+        [r.to_sequence() for r in restaurants]
@@ -0,0 +1,126 @@
+import threading
+import time
+
+import mysql.connector
+
+from data.project.database import MySQLDialect, MySQLPool, SQLitePool, split_statements
+from data.project.handler import SQLHandler
+from data.project.model import DeliveryDataset, Order
+
+
+class FakeConnection:
+    def __init__(self, opened, broken=False):
+        self.opened = opened
+        self.broken = broken
+        self.closed = False
+        opened.append(self)
+
+    def is_connected(self):
+        return not self.closed
+
+    def rollback(self):
+        if self.broken:
+            raise mysql.connector.InterfaceError("Unread result found")
+
+    def close(self):
+        self.closed = True
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=()):
+        self.statements.append(statement)
+
+
+class StreamingConnection:
+    def __init__(self, calls):
+        self.calls = calls
+        self.unread_result = True
+
+    def consume_results(self):
+        self.calls.append("consume")
+        self.unread_result = False
+
+
+class StreamingCursor:
+    def __init__(self, connection, calls):
+        self.connection = connection
+        self.calls = calls
+
+    def close(self):
+        if self.connection.unread_result:
+            raise RuntimeError("Unread result found")
+        self.calls.append("close")
+
+
+def test_split_statements():
+    assert split_statements("CREATE TABLE a (x INT);\nCREATE TABLE b (y INT);\n") == \
+        ["CREATE TABLE a (x INT)", "CREATE TABLE b (y INT)"]
+
+
+def test_split_statements_skips_empty_statements():
+    assert split_statements(" ; SELECT 1;; ") == ["SELECT 1"]
+    assert split_statements("") == []
+
+
+def test_split_statements_keeps_quoted_semicolons():
+    assert split_statements("INSERT INTO t VALUES ('a;b', \"c;d\", 'it''s; \\' ;'); SELECT `x;y` FROM t") == \
+        ["INSERT INTO t VALUES ('a;b', \"c;d\", 'it''s; \\' ;')", "SELECT `x;y` FROM t"]
+
+
+def test_mysql_execute_script_runs_every_statement():
+    dialect = MySQLDialect()
+    cursor = RecordingCursor()
+    script = "".join(dialect.create_table(entity_type) for entity_type in DeliveryDataset.entity_types())
+
+    dialect.execute_script(cursor, script)
+    assert len(cursor.statements) == len(DeliveryDataset.entity_types())
+    assert all(statement.startswith("CREATE TABLE") and ";" not in statement for statement in cursor.statements)
+
+
+def test_mysql_close_cursor_discards_unread_rows():
+    calls = []
+    connection = StreamingConnection(calls)
+    MySQLDialect().close_cursor(connection, StreamingCursor(connection, calls))
+    assert calls == ["consume", "close"]
+
+
+def test_iter_entities_stopped_early_releases_the_connection():
+    pool = SQLitePool(size=1)
+    dataset = DeliveryDataset.generate(20, 5, 5, 30, seed=7)
+    SQLHandler.write_dataset(dataset, pool)
+
+    entities = SQLHandler.iter_entities(Order, pool)
+    next(entities)
+    entities.close()
+    assert len(SQLHandler.read_entity(Order, pool)) == 30
+    pool.close()
+
+
+def test_mysql_pool_waits_for_a_connection(monkeypatch):
+    opened = []
+    monkeypatch.setattr(mysql.connector, "connect", lambda **config: FakeConnection(opened))
+    pool = MySQLPool(size=2, host="localhost")
+    lent = []
+    most = []
+
+    def borrow():
+        with pool.connection() as connection:
+            lent.append(connection)
+            most.append(len(lent))
+            time.sleep(0.01)
+            lent.remove(connection)
+
+    threads = [threading.Thread(target=borrow) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(most) <= 2 and len(opened) <= 2
+
+    with pool.connection() as connection:
+        connection.broken = True
+    pool.close()
+    assert all(connection.closed for connection in opened)
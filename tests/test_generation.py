@@ -0,0 +1,50 @@
+from functools import partial
+
+from data.project import model
+from data.project.model import DeliveryDataset, Restaurant, make_unique
+from data.project.pool import FakerPool
+
+
+def test_make_unique_numbers_repeated_values():
+    restaurants = [Restaurant(str(i), name, None, None, "Soup")
+                   for i, name in enumerate(["A", "B", "A", "A (2)", "A"])]
+    make_unique(restaurants, ["name"])
+    assert [restaurant.name for restaurant in restaurants] == ["A", "B", "A (3)", "A (2)", "A (4)"]
+
+
+def test_restaurants_are_unique_across_chunks(monkeypatch):
+    monkeypatch.setattr(model, "GENERATION_CHUNK_SIZE", 20)
+    dataset = DeliveryDataset.generate(10, 5, 400, 10, seed=3)
+    for name in ["name", "address", "phone_number"]:
+        assert len({getattr(restaurant, name) for restaurant in dataset.restaurants}) == 400
+
+
+def test_parallel_generation_is_deterministic(monkeypatch):
+    monkeypatch.setattr(model, "GENERATION_CHUNK_SIZE", 50)
+    serial = DeliveryDataset.generate(100, 20, 20, 1000, seed=5)
+    parallel = DeliveryDataset.generate(100, 20, 20, 1000, seed=5, workers=2)
+    for entity_type, entities in serial.entities().items():
+        assert [e.to_sequence() for e in entities] == [e.to_sequence() for e in parallel.entities()[entity_type]]
+
+
+def test_parallel_generation_stops_with_the_consumer(monkeypatch):
+    monkeypatch.setattr(model, "GENERATION_CHUNK_SIZE", 50)
+    heads = dict()
+
+    def consume(entity_type, entities):
+        heads[entity_type] = next(entities)
+        if hasattr(entities, "close"):
+            entities.close()
+
+    DeliveryDataset.generate_stream(consume, 100, 20, 20, 100000, seed=5, workers=2)
+    assert heads[model.Order].order_id == "ORDER-0000000000"
+
+
+def test_pooled_generation_without_a_writable_cache(tmp_path, monkeypatch):
+    (tmp_path / "cache").write_text("not a folder")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(model, "_pools", dict())
+    monkeypatch.setattr(model, "FakerPool", partial(FakerPool, size=50))
+    dataset = DeliveryDataset.generate(20, 5, 5, 30, seed=5, pooled=True)
+    assert len(dataset.people) == 20
+    assert all(pool.cache_dir == "" for pool in model._pools.values())
@@ -0,0 +1,41 @@
+import pytest
+
+from data.project.model import DeliveryDataset, Order
+
+
+@pytest.fixture
+def dataset() -> DeliveryDataset:
+    return DeliveryDataset.generate(20, 5, 5, 30, seed=7)
+
+
+def test_get_after_pop_and_add(dataset):
+    assert dataset.get(Order, dataset.orders[0].order_id) is dataset.orders[0]
+    removed = dataset.orders.pop(0)
+    order = Order("X1", 1, "Soup", dataset.restaurants[0].restaurant_id, "name", 7, "destination", "client",
+                  dataset.people[0].id, dataset.couriers[0].courier_id)
+    dataset.add(order)
+
+    assert dataset.get(Order, "X1") is order
+    assert dataset.get(Order, removed.order_id) is None
+
+
+def test_get_after_replacing_an_element(dataset):
+    first = dataset.orders[0]
+    assert dataset.get(Order, first.order_id) is first
+    dataset.orders[0] = dataset.orders[1]
+    assert dataset.get(Order, first.order_id) is None
+
+
+def test_references_after_sorting(dataset):
+    courier_id = dataset.orders[0].courier_id
+    assert dataset.referring(Order, "courier_id", courier_id)[0] is dataset.orders[0]
+    dataset.orders.reverse()
+    referring = dataset.referring(Order, "courier_id", courier_id)
+    assert all(order.courier_id == courier_id for order in referring)
+
+
+def test_get_after_replacing_a_collection(dataset):
+    first = dataset.orders[0]
+    assert dataset.get(Order, first.order_id) is first
+    dataset.orders = dataset.orders[1:]
+    assert dataset.get(Order, first.order_id) is None
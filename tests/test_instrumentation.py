@@ -0,0 +1,46 @@
+import pytest
+
+from data.project import instrumentation
+from data.project.instrumentation import BYTES_READ, ROWS_READ, Measurement
+
+
+def test_summary_without_elapsed_time():
+    measurement = Measurement("read")
+    measurement.add(ROWS_READ, 10)
+    measurement.add(BYTES_READ, 2 ** 20)
+    assert measurement.rate(ROWS_READ) is None
+    assert measurement.summary() == "read: 0.000 s, 10 rows read, 1.0 MiB read"
+
+    measurement.seconds = 2.0
+    assert measurement.summary() == "read: 2.000 s, 10 rows read (5/s), 1.0 MiB read (0.5 MiB/s)"
+
+
+def test_measure_collects_stages_and_counters(tmp_path):
+    file_path = tmp_path / "data.txt"
+    file_path.write_bytes(b"x" * 100)
+
+    with instrumentation.measure("parse") as measurement:
+        with instrumentation.stage("open"):
+            pass
+        rows = list(instrumentation.timed_map(int, ["1", "2", "3"]))
+        instrumentation.count_bytes(str(file_path))
+    assert rows == [1, 2, 3]
+    assert measurement.counters == {ROWS_READ: 3, BYTES_READ: 100}
+    assert set(measurement.stages) == {"open", "parse", "construct"}
+    assert measurement.seconds > 0 and measurement.error is None
+    assert instrumentation.current() is None
+    assert instrumentation.recorder.last(1)[0] is measurement
+
+
+def test_measure_records_failures():
+    with pytest.raises(KeyError):
+        with instrumentation.measure("fail"):
+            raise KeyError("x")
+    assert instrumentation.recorder.last(1)[0].error == "KeyError: 'x'"
+
+
+def test_outside_of_measure_nothing_is_recorded(tmp_path):
+    assert isinstance(instrumentation.timed_map(int, ["1"]), map)
+    with instrumentation.stage("open"):
+        instrumentation.count(ROWS_READ, 1)
+        instrumentation.count_bytes(str(tmp_path / "missing"))
@@ -0,0 +1,40 @@
+import os
+
+from data.project.handler import JSONHandler
+from data.project.model import DeliveryDataset, Order
+
+
+def rows(orders: list[Order]) -> list[tuple]:
+    return [order.to_sequence() for order in orders]
+
+
+def test_writing_removes_the_documents_of_other_formats(tmp_path):
+    dataset = DeliveryDataset.generate(20, 5, 5, 30, seed=7)
+    path = str(tmp_path)
+
+    JSONHandler.write_dataset(dataset, path, lines=False)
+    JSONHandler.write_dataset(dataset, path, lines=True, compress=True)
+    assert sorted(os.listdir(path)) == sorted(t.collection_name() + ".jsonl.gz" for t in dataset.entity_types())
+
+    JSONHandler.write_entity(dataset.orders[:5], path)
+    assert JSONHandler.find_extension(Order, path) == ".json"
+    assert not os.path.exists(os.path.join(path, "orders.jsonl.gz"))
+    assert rows(JSONHandler.read_collection(Order, path)) == rows(dataset.orders[:5])
+
+
+def test_appending_keeps_the_document(tmp_path):
+    dataset = DeliveryDataset.generate(20, 5, 5, 30, seed=7)
+    path = str(tmp_path)
+
+    JSONHandler.write_entities(Order, dataset.orders[:10], path)
+    JSONHandler.write_entities(Order, dataset.orders[10:], path, append=True)
+    assert rows(JSONHandler.read_collection(Order, path)) == rows(dataset.orders)
+
+
+def test_extension_preference_does_not_depend_on_the_clock(tmp_path):
+    path = str(tmp_path)
+    for extension in [".jsonl", ".json"]:
+        with open(os.path.join(path, "orders" + extension), "w") as file:
+            file.write("[]" if extension == ".json" else "")
+    os.utime(os.path.join(path, "orders.jsonl"), (0, 0))
+    assert JSONHandler.find_extension(Order, path) == ".jsonl"
@@ -0,0 +1,46 @@
+import json
+import os
+
+from data.project.handler import NPZHandler
+from data.project.model import Courier, Restaurant
+from data.project.schema import row_codec
+
+
+def test_null_fields_are_kept(tmp_path):
+    path = str(tmp_path)
+    restaurants = [Restaurant("R1", "a", "street 1", "+36 1", "Pizza"), Restaurant("R2", None, None, None, None),
+                   Restaurant("R3", "c", None, "+36 3", "Soup")]
+    couriers = [Courier("C1", "a", 20, True, "Car"), Courier("C2", None, None, None, None)]
+
+    # to_sequence writes NULL as the empty text, so the typed values are compared
+    for entity_type, entities in [(Restaurant, restaurants), (Courier, couriers)]:
+        values = row_codec(entity_type).values
+        NPZHandler.write_entities(entity_type, entities, path)
+        assert [values(e) for e in NPZHandler.read_entity(entity_type, path)] == [values(e) for e in entities]
+
+    table = NPZHandler.read_table(Courier, path, columns=["courier_id"], filters=[("age", "<", 30)])
+    assert table.column("courier_id").tolist() == ["C1"]
+
+
+def test_row_groups_are_skipped_and_projected(tmp_path, monkeypatch):
+    monkeypatch.setattr(NPZHandler, "ROW_GROUP_SIZE", 5)
+    path = str(tmp_path)
+    couriers = [Courier(f"C{i:02d}", f"name {i}", 20 + i, i % 2 == 0, ["Car", "Bicycle"][i // 10]) for i in range(20)]
+    assert NPZHandler.write_entities(Courier, couriers, path) == 20
+
+    folder = os.path.join(path, "couriers")
+    with open(os.path.join(folder, "meta.json"), encoding="utf-8") as file:
+        groups = json.load(file)["groups"]
+    assert [group["stats"]["age"] for group in groups] == [[20, 24], [25, 29], [30, 34], [35, 39]]
+
+    # the groups which cannot match are not even opened
+    for group in groups[:2]:
+        os.remove(os.path.join(folder, group["file"]))
+    table = NPZHandler.read_table(Courier, path, columns=["courier_id", "age"],
+                                  filters=[("delivery_method", "==", "Bicycle"), ("male", "==", True)])
+    assert table.column("age").tolist() == [30, 32, 34, 36, 38]
+
+    os.remove(os.path.join(folder, groups[2]["file"]))
+    table = NPZHandler.read_table(Courier, path, columns=["courier_id"], filters=[("age", ">=", 37)])
+    assert list(table.columns) == ["courier_id"]
+    assert table.column("courier_id").tolist() == ["C17", "C18", "C19"]
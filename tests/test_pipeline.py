@@ -0,0 +1,62 @@
+import itertools
+
+import pytest
+
+from data.project.database import SQLitePool
+from data.project.handler import CSVHandler
+from data.project.model import DeliveryDataset, Person
+from data.project.pipeline import convert, open_endpoint, transfer
+
+
+def test_convert_through_every_format(tmp_path):
+    dataset = DeliveryDataset.generate(20, 5, 5, 30, seed=7)
+    chain = ["csv", "json", "xlsx", "npz", "snapshot", "mysql", "csv"]
+    folders = [tmp_path / f"{step}-{name}" for step, name in enumerate(chain)]
+    folders[0].mkdir()
+    CSVHandler.write_dataset(dataset, str(folders[0]))
+
+    pool = SQLitePool(str(tmp_path / "dataset.db"))
+    for step in range(1, len(chain)):
+        source = open_endpoint(chain[step - 1], str(folders[step - 1]), pool=pool)
+        target = open_endpoint(chain[step], str(folders[step]), pool=pool)
+        report = convert(source, target, dataset.entity_types(), batch_size=7)
+        assert report.rows == {t.collection_name(): len(e) for t, e in dataset.entities().items()}
+    pool.close()
+
+    read = CSVHandler.read_dataset(DeliveryDataset, str(folders[-1]))
+    for entity_type, entities in dataset.entities().items():
+        assert sorted(e.to_sequence() for e in read.entities()[entity_type]) == \
+            sorted(e.to_sequence() for e in entities)
+
+
+def test_reader_errors_are_raised():
+    def read():
+        yield from DeliveryDataset.generate(20, 5, 5, 30, seed=7).people
+        raise ValueError("broken row")
+
+    with pytest.raises(ValueError, match="broken row"):
+        transfer(read(), list, batch_size=3)
+
+
+def test_writer_errors_stop_the_reader():
+    read = []
+    closed = []
+
+    def people():
+        try:
+            for i in itertools.count():
+                read.append(i)
+                yield Person(str(i), None, None, None, None)
+        finally:
+            closed.append(True)
+
+    def write(entities):
+        for i, _ in enumerate(entities):
+            if i == 10:
+                raise OSError("disk full")
+
+    with pytest.raises(OSError, match="disk full"):
+        transfer(people(), write, batch_size=5, queue_size=2)
+    assert closed == [True]
+    # the three batches given to the writer, the two in the queue and the one waiting to be put
+    assert len(read) <= (3 + 2 + 1) * 5
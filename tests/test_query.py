@@ -0,0 +1,46 @@
+import pytest
+
+from data.project.columnar import ColumnarTable
+from data.project.model import ColumnarDeliveryDataset, Courier, DeliveryDataset, Order
+from data.project.query import count_by, group_by, table_of
+
+
+def test_table_is_cached_until_the_collection_changes():
+    dataset = DeliveryDataset.generate(20, 5, 5, 300, seed=7)
+    table = table_of(dataset, Order, ["food_type"])
+    assert table_of(dataset, Order, ["food_type"]) is table
+
+    order = dataset.orders.pop(0)
+    dataset.add(Order("X1", 1, "Soup", order.restaurant_id, "name", 7, "destination", "client", order.client_id,
+                      order.courier_id))
+    counts = count_by(dataset, Order, "food_type").to_dict("count")
+    assert table_of(dataset, Order, ["food_type"]) is not table
+    assert counts == count_by(dataset.orders, Order, "food_type").to_dict("count")
+
+
+def test_list_and_columnar_datasets_agree():
+    dataset = DeliveryDataset.generate(20, 5, 5, 300, seed=7)
+    columnar = ColumnarDeliveryDataset.from_dataset(dataset)
+    aggregates = [("count", None), ("sum", "amount")]
+    assert group_by(dataset, Order, "food_type", aggregates) == group_by(columnar, Order, "food_type", aggregates)
+
+
+def test_null_numbers_and_booleans_are_kept():
+    couriers = [Courier("C1", "a", 20, True, "Car"), Courier("C2", None, None, None, None),
+                Courier("C3", "c", 30, False, "Bicycle"), Courier("C4", "d", None, True, None)]
+    table = ColumnarTable.from_entities(Courier, couriers)
+    assert [courier.to_sequence() for courier in table] == [courier.to_sequence() for courier in couriers]
+    assert [courier.to_sequence() for courier in table[1:3]] == [courier.to_sequence() for courier in couriers[1:3]]
+
+    assert count_by(table, Courier, "male").to_dict("count") == {False: 1, True: 2, None: 1}
+    assert count_by(table, Courier, "age").to_dict("count") == {20: 1, 30: 1, None: 2}
+    means = group_by(couriers, Courier, "male", [("mean", "age")]).to_dict("mean_age")
+    assert means[True] == 20 and means[False] == 30
+
+
+def test_sums_are_exact_and_need_numbers():
+    orders = [Order(str(i), 2 ** 60 + i, "Soup", "R", "name", 1, "destination", "client", "P", "C") for i in range(4)]
+    assert group_by(orders, Order, "food_type", [("sum", "amount")]).to_dict("sum_amount")["Soup"] == 4 * 2 ** 60 + 6
+    for name in ["food_type", "destination"]:
+        with pytest.raises(ValueError):
+            group_by(orders, Order, "courier_id", [("mean", name)])
@@ -0,0 +1,34 @@
+import pytest
+
+from data.project.model import Courier, Order
+from data.project.schema import create_table_statement, parse_bool, row_codec
+
+
+def test_parse_bool_is_strict():
+    for value in [True, 1, "1", "True", "true", "TRUE"]:
+        assert parse_bool(value) is True
+    for value in [False, 0, "0", "False", "false", "FALSE"]:
+        assert parse_bool(value) is False
+    for value in ["", "yes", "2", 2, None, []]:
+        with pytest.raises(ValueError):
+            parse_bool(value)
+
+    courier = row_codec(Courier).decode(["C1", "a", "20", "0", "Car"])
+    assert courier.male is False and courier.age == 20
+
+
+def test_create_table_statement():
+    assert create_table_statement(Courier) == (
+        "CREATE TABLE couriers (\n"
+        "    courier_id VARCHAR(50) NOT NULL PRIMARY KEY,\n"
+        "    name VARCHAR(100),\n"
+        "    age INTEGER,\n"
+        "    male BOOLEAN,\n"
+        "    delivery_method VARCHAR(50)\n"
+        ");")
+
+    lines = create_table_statement(Order).splitlines()
+    for line in ["amount INTEGER NOT NULL,", "delivery_fee INTEGER NOT NULL,", "food_type VARCHAR(50) NOT NULL,",
+                 "restaurant_name VARCHAR(100) NOT NULL,", "destination VARCHAR(100) NOT NULL,",
+                 "FOREIGN KEY (courier_id) REFERENCES couriers(courier_id)"]:
+        assert "    " + line in lines
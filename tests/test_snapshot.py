@@ -0,0 +1,19 @@
+import os
+
+from data.project.model import Courier, Restaurant
+from data.project.schema import row_codec
+from data.project.snapshot import SnapshotTable, write_snapshot
+
+
+def test_null_and_empty_texts_are_kept(tmp_path):
+    restaurants = [Restaurant("R1", "a", "", "+36 1", "Pizza"), Restaurant("R2", None, None, None, None)]
+    couriers = [Courier("C1", "", 20, False, "Car"), Courier("C2", None, None, None, None)]
+
+    for entity_type, entities in [(Restaurant, restaurants), (Courier, couriers)]:
+        # to_sequence writes NULL as the empty text, so the typed values are compared
+        values = row_codec(entity_type).values
+        file_path = os.path.join(str(tmp_path), entity_type.collection_name())
+        assert write_snapshot(entities, file_path) == len(entities)
+        table = SnapshotTable(entity_type, file_path)
+        assert [values(e) for e in table] == [values(e) for e in entities]
+        table.close()
@@ -0,0 +1,80 @@
+import sqlite3
+from typing import Iterable
+
+import pytest
+
+from data.project.database import SQLitePool
+from data.project.handler import SQLHandler
+from data.project.model import Courier, DeliveryDataset, Person
+
+
+@pytest.fixture
+def pool():
+    pool = SQLitePool()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def people() -> list[Person]:
+    return DeliveryDataset.generate(20, 5, 5, 10, seed=7).people
+
+
+def rows(people: Iterable[Person]) -> list[tuple]:
+    return sorted(person.to_sequence() for person in people)
+
+
+class LoadingCursor:
+    def __init__(self):
+        self.statement = None
+        self.lines = None
+
+    def execute(self, statement, params=()):
+        self.statement = statement
+        with open(statement.split("'")[1], encoding="utf-8", newline="") as file:
+            self.lines = file.read().splitlines(keepends=True)
+
+
+def test_load_data_row_writes_null_as_escaped_n():
+    assert SQLHandler.load_data_row(("P-1", None, 'a"b\\c\nd', 3, True, False)) == \
+        '"P-1",\\N,"a\\"b\\\\c\\nd","3","1","0"\n'
+
+
+def test_load_batch_writes_one_line_per_entity():
+    couriers = [Courier("C-1", None, None, None, None), Courier("C-2", "Kovács \"Kid\"", 20, True, "Car")]
+    cursor = LoadingCursor()
+    SQLHandler.load_batch(cursor, couriers, "couriers", "courier_id, name, age, male, delivery_method")
+
+    assert "ESCAPED BY '\\\\'" in cursor.statement
+    assert cursor.lines == ['"C-1",\\N,\\N,\\N,\\N\n', '"C-2","Kovács \\"Kid\\"","20","1","Car"\n']
+
+
+def test_load_is_not_supported_by_sqlite(pool, people):
+    with pytest.raises(ValueError):
+        SQLHandler.write_entities(Person, people, pool, method="load")
+
+
+def test_insert(pool, people):
+    people[0].name = None
+    people[1].male = None
+    assert SQLHandler.write_entities(Person, people, pool, batch_size=7) == len(people)
+    read = {person.id: person for person in SQLHandler.read_entity(Person, pool)}
+    assert rows(read.values()) == rows(people)
+    assert read[people[0].id].name is None and read[people[1].id].male is None
+
+
+def test_insert_fails_on_an_existing_key(pool, people):
+    SQLHandler.write_entities(Person, people, pool)
+    with pytest.raises(sqlite3.IntegrityError):
+        SQLHandler.write_entities(Person, people[:1], pool, create=False)
+
+
+def test_upsert_updates_and_inserts(pool, people):
+    SQLHandler.write_entities(Person, people[:10], pool)
+    people[0].age = 99
+    people[1].address = None
+
+    assert SQLHandler.write_entities(Person, people, pool, create=False, method="upsert", batch_size=6) == len(people)
+    read = {person.id: person for person in SQLHandler.read_entity(Person, pool)}
+    assert rows(read.values()) == rows(people)
+    assert read[people[0].id].age == 99 and read[people[1].id].address is None
@@ -0,0 +1,63 @@
+import csv
+
+import pytest
+
+from data.project.handler import CSVHandler, JSONHandler
+from data.project.model import DeliveryDataset
+from data.project.validation import UNPARSABLE, validate
+
+
+@pytest.fixture
+def path(tmp_path) -> str:
+    dataset = DeliveryDataset.generate(20, 5, 5, 30, seed=7)
+    CSVHandler.write_dataset(dataset, str(tmp_path))
+    JSONHandler.write_dataset(dataset, str(tmp_path), lines=True)
+    return str(tmp_path)
+
+
+def replace_line(file_path: str, number: int, replace) -> None:
+    with open(file_path, "r", encoding="utf-8") as file:
+        lines = file.readlines()
+    lines[number] = replace(lines[number])
+    with open(file_path, "w", encoding="utf-8") as file:
+        file.writelines(lines)
+
+
+def replace_row(file_path: str, position: int, replace) -> None:
+    with open(file_path, "r", newline="", encoding="utf-8") as file:
+        rows = list(csv.reader(file, delimiter=";"))
+    rows[position + 1] = replace(rows[position + 1])
+    with open(file_path, "w", newline="", encoding="utf-8") as file:
+        csv.writer(file, delimiter=";").writerows(rows)
+
+
+def unparsable(report) -> list:
+    return [(v.collection, v.position, v.field_name) for v in report.violations if v.kind == UNPARSABLE]
+
+
+def test_csv_rows_which_cannot_be_decoded_are_reported(path):
+    # the second field of an order is its amount
+    replace_row(f"{path}/orders.csv", 2, lambda row: row[:1] + ["many"] + row[2:])
+    replace_row(f"{path}/orders.csv", 4, lambda row: row[:1])
+
+    report = validate({t: CSVHandler.iter_rows(t, path) for t in DeliveryDataset.entity_types()})
+    assert unparsable(report) == [("orders", 2, "amount"), ("orders", 4, "*")]
+    assert report.checked["orders"] == 30
+
+
+def test_json_lines_which_cannot_be_decoded_are_reported(path):
+    replace_line(f"{path}/orders.jsonl", 0, lambda line: line[:10] + "\n")
+    replace_line(f"{path}/orders.jsonl", 7, lambda line: line.replace('"amount":', '"amount":"x", "other":', 1))
+
+    report = validate({t: JSONHandler.iter_rows(t, path) for t in DeliveryDataset.entity_types()})
+    assert unparsable(report) == [("orders", 0, "*"), ("orders", 7, "amount")]
+    assert report.checked["orders"] == 30
+
+
+def test_failing_reader_is_reported(path):
+    replace_line(f"{path}/orders.jsonl", 7, lambda line: line.replace('"amount":', '"amount":"x", "other":', 1))
+
+    report = validate({t: JSONHandler.iter_entities(t, path) for t in DeliveryDataset.entity_types()})
+    assert unparsable(report) == [("orders", 7, "*")]
+    assert report.checked["orders"] == 7
+
@@ -0,0 +1,21 @@
+import openpyxl
+
+from data.project.handler import XLSXHandler
+from data.project.model import DeliveryDataset
+
+
+def test_collections_are_split_across_worksheets(tmp_path, monkeypatch):
+    monkeypatch.setattr(XLSXHandler, "MAX_ROWS", 8)
+    dataset = DeliveryDataset.generate(20, 7, 5, 30, seed=7)
+    path = str(tmp_path)
+
+    XLSXHandler.write_dataset(dataset, path)
+    workbook = openpyxl.load_workbook(tmp_path / "dataset.xlsx", read_only=True)
+    assert [name for name in workbook.sheetnames if name.startswith("people")] == ["people", "people_2", "people_3"]
+    assert [name for name in workbook.sheetnames if name.startswith("couriers")] == ["couriers"]
+    assert len(list(workbook["people_3"].iter_rows())) == 7
+    workbook.close()
+
+    read = XLSXHandler.read_dataset(DeliveryDataset, path)
+    for entity_type, entities in dataset.entities().items():
+        assert [e.to_sequence() for e in read.entities()[entity_type]] == [e.to_sequence() for e in entities]